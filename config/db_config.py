@@ -9,4 +9,77 @@ DB_CONFIG = {
     'password': 'cisco',#Se debe cambiar
     'host': 'localhost',
     'port': 5432
-}
\ No newline at end of file
+}
+
+# Pool de conexiones SQLite (utils/db_connection.py)
+SQLITE_POOL = {
+    'max_conexiones': 4,    # conexiones simultáneas como máximo
+    'timeout': 30.0         # segundos de espera por una conexión libre
+}
+
+# Perfil de PRAGMAs aplicado a cada conexión nueva del pool
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',          # lectores y escritor sin bloquearse
+    'synchronous': 'NORMAL',        # en WAL no hace fsync en cada commit
+    'cache_size': -16000,           # negativo = KiB (~16 MB por conexión)
+    'mmap_size': 134217728,         # 128 MB de lectura mapeada en memoria
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,           # ms de espera si la base está ocupada
+    'journal_size_limit': 67108864, # tamaño máximo del WAL tras un checkpoint
+    'foreign_keys': 'ON'
+}
+
+# Checkpoint periódico del WAL (main.py)
+SQLITE_CHECKPOINT = {
+    'intervalo_ms': 300000,         # cada 5 minutos
+    'modo': 'PASSIVE'               # no bloquea a lectores ni escritores
+}
+
+# Instrumentación de consultas (utils/instrumentacion.py)
+SQLITE_INSTRUMENTACION = {
+    'activa': True,
+    'umbral_lenta_ms': 100,         # a partir de aquí se escribe en el log
+    'archivo_log': 'logs/consultas_lentas.log',
+    'max_bytes_log': 1048576,       # 1 MB por archivo antes de rotar
+    'respaldos_log': 3,
+    'max_huellas': 500              # consultas distintas con estadísticas
+}
+
+# Auditor de planes de consulta (utils/auditor_consultas.py)
+# También se activa con la variable de entorno CARUMA_AUDITAR_SQL=1
+SQLITE_AUDITOR = {
+    'activo': False,
+    'max_planes': 500               # consultas distintas auditadas
+}
+
+# Caché de catálogos en memoria (utils/cache.py)
+SQLITE_CACHE = {
+    'activa': True,
+    'max_entradas': 32              # listados distintos guardados (LRU)
+}
+
+# Escáner de alertas (utils/escaner_alertas.py); también pasa el día del estado de alertas
+SQLITE_ESCANER_ALERTAS = {
+    'intervalo_ms': 60000,          # cada minuto
+    'lote': 2000,                   # umbrales pendientes por escaneo
+    'retencion_dias': 365,          # historial más viejo que esto se purga (0 = nunca)
+    'lote_purga': 500               # alertas borradas por transacción al purgar
+}
+
+# Libro de movimientos de stock (utils/movimientos.py)
+SQLITE_MOVIMIENTOS = {
+    'meses_vivos': 3,               # meses recientes que se guardan movimiento por movimiento
+    'lote_compactar': 5000,         # movimientos compactados por transacción
+    'intervalo_ms': 21600000        # cada 6 horas
+}
+
+# Historial de alertas (ventanas/alertas.py)
+SQLITE_HISTORIAL_ALERTAS = {
+    'pagina': 100                   # filas por página (se piden más al bajar)
+}
+
+# Consultas en segundo plano (utils/ejecutor.py)
+SQLITE_EJECUTOR = {
+    'hilos': 2,                     # hilos de trabajo (cada uno con su conexión)
+    'intervalo_sondeo_ms': 30       # cada cuánto revisa Tk si llegaron resultados
+}
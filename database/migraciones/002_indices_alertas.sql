@@ -0,0 +1,28 @@
+-- Índices para los filtros de caducidad, stock bajo y búsqueda por nombre
+
+-- Las fechas se comparan sin date(): se normalizan a YYYY-MM-DD
+UPDATE insumos SET fecha_caducidad = date(fecha_caducidad)
+WHERE fecha_caducidad IS NOT NULL
+  AND date(fecha_caducidad) IS NOT NULL
+  AND fecha_caducidad <> date(fecha_caducidad);
+
+-- Rangos de caducidad (por caducar, caducados) y orden por fecha
+CREATE INDEX IF NOT EXISTS idx_insumos_caducidad ON insumos(fecha_caducidad);
+
+-- Índice parcial: solo contiene los insumos en stock bajo
+CREATE INDEX IF NOT EXISTS idx_insumos_stock_bajo ON insumos(nombre COLLATE NOCASE)
+WHERE piezas <= alerta_piezas AND alerta_piezas > 0;
+
+-- Índice parcial: insumos sin stock
+CREATE INDEX IF NOT EXISTS idx_insumos_sin_stock ON insumos(nombre COLLATE NOCASE)
+WHERE piezas = 0;
+
+-- Orden alfabético sin distinguir mayúsculas y LIKE 'texto%'
+CREATE INDEX IF NOT EXISTS idx_insumos_nombre_nocase ON insumos(nombre COLLATE NOCASE);
+
+-- Filtro por categoría ya ordenado por nombre (sustituye al índice de la FK)
+CREATE INDEX IF NOT EXISTS idx_insumos_categoria_nombre ON insumos(id_categoria, nombre COLLATE NOCASE);
+DROP INDEX IF EXISTS idx_insumos_categoria;
+
+-- Historial de alertas ordenado por fecha
+CREATE INDEX IF NOT EXISTS idx_alertas_fecha ON alertas(fecha_alerta);
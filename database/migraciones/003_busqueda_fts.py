@@ -0,0 +1,90 @@
+"""
+Índices de búsqueda de texto completo (FTS5) para insumos, categorías y
+servicios, sincronizados con triggers.
+
+Si la versión de SQLite no trae FTS5 la migración no crea nada y la
+búsqueda sigue usando LIKE (utils/busqueda.py lo detecta).
+"""
+
+import sqlite3
+
+
+# Sin acentos ni mayúsculas: "platano" encuentra "Plátano"
+TOKENIZADOR = "unicode61 remove_diacritics 2"
+
+SENTENCIAS = [
+    f"""CREATE VIRTUAL TABLE insumos_fts USING fts5(
+        nombre, categoria, tokenize = '{TOKENIZADOR}', prefix = '2 3'
+    )""",
+    f"""CREATE VIRTUAL TABLE categorias_fts USING fts5(
+        nombre, tokenize = '{TOKENIZADOR}', prefix = '2 3'
+    )""",
+    f"""CREATE VIRTUAL TABLE servicios_fts USING fts5(
+        nombre, tokenize = '{TOKENIZADOR}', prefix = '2 3'
+    )""",
+    
+    # Insumos (la categoría se guarda por nombre para poder buscarla)
+    """CREATE TRIGGER trg_insumos_fts_insert AFTER INSERT ON insumos BEGIN
+        INSERT INTO insumos_fts (rowid, nombre, categoria)
+        VALUES (NEW.id, NEW.nombre,
+                COALESCE((SELECT nombre FROM categorias WHERE id = NEW.id_categoria), ''));
+    END""",
+    """CREATE TRIGGER trg_insumos_fts_update AFTER UPDATE OF nombre, id_categoria ON insumos BEGIN
+        UPDATE insumos_fts SET
+            nombre = NEW.nombre,
+            categoria = COALESCE((SELECT nombre FROM categorias WHERE id = NEW.id_categoria), '')
+        WHERE rowid = NEW.id;
+    END""",
+    """CREATE TRIGGER trg_insumos_fts_delete AFTER DELETE ON insumos BEGIN
+        DELETE FROM insumos_fts WHERE rowid = OLD.id;
+    END""",
+    
+    # Categorías
+    """CREATE TRIGGER trg_categorias_fts_insert AFTER INSERT ON categorias BEGIN
+        INSERT INTO categorias_fts (rowid, nombre) VALUES (NEW.id, NEW.nombre);
+    END""",
+    """CREATE TRIGGER trg_categorias_fts_update AFTER UPDATE OF nombre ON categorias BEGIN
+        UPDATE categorias_fts SET nombre = NEW.nombre WHERE rowid = NEW.id;
+        UPDATE insumos_fts SET categoria = NEW.nombre
+        WHERE rowid IN (SELECT id FROM insumos WHERE id_categoria = NEW.id);
+    END""",
+    """CREATE TRIGGER trg_categorias_fts_delete AFTER DELETE ON categorias BEGIN
+        DELETE FROM categorias_fts WHERE rowid = OLD.id;
+    END""",
+    
+    # Servicios
+    """CREATE TRIGGER trg_servicios_fts_insert AFTER INSERT ON servicios BEGIN
+        INSERT INTO servicios_fts (rowid, nombre) VALUES (NEW.id, NEW.nombre);
+    END""",
+    """CREATE TRIGGER trg_servicios_fts_update AFTER UPDATE OF nombre ON servicios BEGIN
+        UPDATE servicios_fts SET nombre = NEW.nombre WHERE rowid = NEW.id;
+    END""",
+    """CREATE TRIGGER trg_servicios_fts_delete AFTER DELETE ON servicios BEGIN
+        DELETE FROM servicios_fts WHERE rowid = OLD.id;
+    END""",
+    
+    # Carga inicial
+    """INSERT INTO insumos_fts (rowid, nombre, categoria)
+       SELECT i.id, i.nombre, COALESCE(c.nombre, '')
+       FROM insumos i LEFT JOIN categorias c ON i.id_categoria = c.id""",
+    "INSERT INTO categorias_fts (rowid, nombre) SELECT id, nombre FROM categorias",
+    "INSERT INTO servicios_fts (rowid, nombre) SELECT id, nombre FROM servicios",
+]
+
+
+def fts5_disponible(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.prueba_fts5 USING fts5(x)")
+        conn.execute("DROP TABLE temp.prueba_fts5")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def aplicar(conn):
+    if not fts5_disponible(conn):
+        print("⚠ SQLite sin FTS5: la búsqueda seguirá usando LIKE")
+        return
+    
+    for sentencia in SENTENCIAS:
+        conn.execute(sentencia)
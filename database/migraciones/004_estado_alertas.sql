@@ -0,0 +1,110 @@
+-- Estado de alertas materializado y mantenido con triggers
+-- alerta_estado: una fila por insumo con su clasificación
+-- alerta_contadores: una sola fila (id = 1) con los totales de las tarjetas
+--
+-- La caducidad se clasifica contra fecha_corte (el día de la última
+-- revisión), no contra date('now'): así todas las filas usan el mismo día
+-- y EstadoAlertas.rolar_dia() solo reclasifica las que cambian al pasar
+-- la fecha (utils/estado_alertas.py)
+
+CREATE TABLE IF NOT EXISTS alerta_contadores (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    fecha_corte TEXT NOT NULL,
+    dias_por_caducar INTEGER NOT NULL DEFAULT 7,
+    total_insumos INTEGER NOT NULL DEFAULT 0,
+    total_piezas INTEGER NOT NULL DEFAULT 0,
+    stock_bajo INTEGER NOT NULL DEFAULT 0,
+    por_caducar INTEGER NOT NULL DEFAULT 0,
+    caducados INTEGER NOT NULL DEFAULT 0
+);
+
+-- caducidad: 'ok' | 'por_caducar' | 'caducado'
+CREATE TABLE IF NOT EXISTS alerta_estado (
+    id_insumo INTEGER PRIMARY KEY REFERENCES insumos(id) ON DELETE CASCADE,
+    stock_bajo INTEGER NOT NULL DEFAULT 0,
+    caducidad TEXT NOT NULL DEFAULT 'ok'
+);
+
+INSERT OR IGNORE INTO alerta_contadores (id, fecha_corte) VALUES (1, date('now', 'localtime'));
+
+-- Contadores: cada cambio en alerta_estado suma lo nuevo y resta lo viejo
+CREATE TRIGGER IF NOT EXISTS trg_alerta_estado_insert AFTER INSERT ON alerta_estado BEGIN
+    UPDATE alerta_contadores SET
+        stock_bajo = stock_bajo + NEW.stock_bajo,
+        por_caducar = por_caducar + (NEW.caducidad = 'por_caducar'),
+        caducados = caducados + (NEW.caducidad = 'caducado')
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alerta_estado_update AFTER UPDATE ON alerta_estado BEGIN
+    UPDATE alerta_contadores SET
+        stock_bajo = stock_bajo + NEW.stock_bajo - OLD.stock_bajo,
+        por_caducar = por_caducar + (NEW.caducidad = 'por_caducar') - (OLD.caducidad = 'por_caducar'),
+        caducados = caducados + (NEW.caducidad = 'caducado') - (OLD.caducidad = 'caducado')
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alerta_estado_delete AFTER DELETE ON alerta_estado BEGIN
+    UPDATE alerta_contadores SET
+        stock_bajo = stock_bajo - OLD.stock_bajo,
+        por_caducar = por_caducar - (OLD.caducidad = 'por_caducar'),
+        caducados = caducados - (OLD.caducidad = 'caducado')
+    WHERE id = 1;
+END;
+
+-- Carga inicial (los triggers de arriba llenan los contadores)
+INSERT INTO alerta_estado (id_insumo, stock_bajo, caducidad)
+SELECT i.id,
+       CASE WHEN i.alerta_piezas > 0 AND i.piezas <= i.alerta_piezas THEN 1 ELSE 0 END,
+       CASE WHEN i.fecha_caducidad IS NULL THEN 'ok'
+            WHEN i.fecha_caducidad < k.fecha_corte THEN 'caducado'
+            WHEN i.fecha_caducidad <= date(k.fecha_corte, '+' || k.dias_por_caducar || ' days') THEN 'por_caducar'
+            ELSE 'ok' END
+FROM insumos i, alerta_contadores k
+WHERE k.id = 1;
+
+UPDATE alerta_contadores SET
+    total_insumos = (SELECT COUNT(*) FROM insumos),
+    total_piezas = (SELECT COALESCE(SUM(piezas), 0) FROM insumos)
+WHERE id = 1;
+
+-- Insumos -> alerta_estado
+CREATE TRIGGER IF NOT EXISTS trg_insumos_alerta_insert AFTER INSERT ON insumos BEGIN
+    INSERT INTO alerta_estado (id_insumo, stock_bajo, caducidad)
+    SELECT NEW.id,
+           CASE WHEN NEW.alerta_piezas > 0 AND NEW.piezas <= NEW.alerta_piezas THEN 1 ELSE 0 END,
+           CASE WHEN NEW.fecha_caducidad IS NULL THEN 'ok'
+                WHEN NEW.fecha_caducidad < k.fecha_corte THEN 'caducado'
+                WHEN NEW.fecha_caducidad <= date(k.fecha_corte, '+' || k.dias_por_caducar || ' days') THEN 'por_caducar'
+                ELSE 'ok' END
+    FROM alerta_contadores k WHERE k.id = 1;
+    UPDATE alerta_contadores SET
+        total_insumos = total_insumos + 1,
+        total_piezas = total_piezas + COALESCE(NEW.piezas, 0)
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_insumos_alerta_update
+AFTER UPDATE OF piezas, alerta_piezas, fecha_caducidad ON insumos BEGIN
+    UPDATE alerta_estado SET
+        stock_bajo = CASE WHEN NEW.alerta_piezas > 0 AND NEW.piezas <= NEW.alerta_piezas THEN 1 ELSE 0 END,
+        caducidad = (
+            SELECT CASE WHEN NEW.fecha_caducidad IS NULL THEN 'ok'
+                        WHEN NEW.fecha_caducidad < k.fecha_corte THEN 'caducado'
+                        WHEN NEW.fecha_caducidad <= date(k.fecha_corte, '+' || k.dias_por_caducar || ' days') THEN 'por_caducar'
+                        ELSE 'ok' END
+            FROM alerta_contadores k WHERE k.id = 1
+        )
+    WHERE id_insumo = NEW.id;
+    UPDATE alerta_contadores SET
+        total_piezas = total_piezas + COALESCE(NEW.piezas, 0) - COALESCE(OLD.piezas, 0)
+    WHERE id = 1 AND COALESCE(NEW.piezas, 0) <> COALESCE(OLD.piezas, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_insumos_alerta_delete AFTER DELETE ON insumos BEGIN
+    DELETE FROM alerta_estado WHERE id_insumo = OLD.id;
+    UPDATE alerta_contadores SET
+        total_insumos = total_insumos - 1,
+        total_piezas = total_piezas - COALESCE(OLD.piezas, 0)
+    WHERE id = 1;
+END;
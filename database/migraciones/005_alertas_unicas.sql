@@ -0,0 +1,32 @@
+-- Registro automático de alertas sin duplicados
+-- alerta_pendientes: insumos cuyo estado empeoró desde el último escaneo
+-- (los llena un trigger de alerta_estado; los vacía utils/escaner_alertas.py)
+
+-- Una alerta por insumo, tipo y día: se conserva la primera
+DELETE FROM alertas
+WHERE id NOT IN (SELECT MIN(id) FROM alertas GROUP BY id_insumo, tipo, fecha_alerta);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_alertas_unica ON alertas(id_insumo, tipo, fecha_alerta);
+
+-- Cubierto por idx_alertas_unica (mismo primer campo)
+DROP INDEX IF EXISTS idx_alertas_insumo;
+
+CREATE TABLE IF NOT EXISTS alerta_pendientes (
+    id_insumo INTEGER PRIMARY KEY
+);
+
+-- Solo cuando se cruza un umbral: pasar a stock bajo o a otro estado de caducidad
+CREATE TRIGGER IF NOT EXISTS trg_alerta_estado_pendiente_insert AFTER INSERT ON alerta_estado
+WHEN NEW.stock_bajo = 1 OR NEW.caducidad <> 'ok' BEGIN
+    INSERT OR IGNORE INTO alerta_pendientes (id_insumo) VALUES (NEW.id_insumo);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alerta_estado_pendiente_update AFTER UPDATE ON alerta_estado
+WHEN (NEW.stock_bajo = 1 AND OLD.stock_bajo = 0)
+  OR (NEW.caducidad <> 'ok' AND NEW.caducidad <> OLD.caducidad) BEGIN
+    INSERT OR IGNORE INTO alerta_pendientes (id_insumo) VALUES (NEW.id_insumo);
+END;
+
+-- Las alertas vigentes al migrar se registran en el primer escaneo
+INSERT OR IGNORE INTO alerta_pendientes (id_insumo)
+SELECT id_insumo FROM alerta_estado WHERE stock_bajo = 1 OR caducidad <> 'ok';
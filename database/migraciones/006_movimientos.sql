@@ -0,0 +1,70 @@
+-- Libro de movimientos de stock (solo se agregan filas)
+-- movimientos: cada cambio de piezas con su tipo; cantidad es el cambio
+-- aplicado (con signo) y piezas_resultantes el stock que quedó
+-- movimientos_mes: movimientos viejos compactados por insumo y mes
+-- (utils/movimientos.py)
+--
+-- Insertar un movimiento es lo que cambia insumos.piezas (trigger). Los
+-- cambios de piezas hechos directo sobre insumos (alta, formulario de
+-- edición) se anotan solos como 'entrega' o 'ajuste', así el último
+-- piezas_resultantes de cada insumo siempre es su stock actual.
+
+CREATE TABLE IF NOT EXISTS movimientos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_insumo INTEGER NOT NULL REFERENCES insumos(id) ON DELETE CASCADE,
+    tipo TEXT NOT NULL CHECK (tipo IN ('entrega', 'consumo', 'ajuste', 'merma')),
+    cantidad INTEGER NOT NULL,
+    piezas_resultantes INTEGER NOT NULL,
+    fecha TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+    nota TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_movimientos_insumo ON movimientos(id_insumo);
+CREATE INDEX IF NOT EXISTS idx_movimientos_fecha ON movimientos(fecha);
+
+CREATE TABLE IF NOT EXISTS movimientos_mes (
+    id_insumo INTEGER NOT NULL REFERENCES insumos(id) ON DELETE CASCADE,
+    mes TEXT NOT NULL,
+    entregas INTEGER NOT NULL DEFAULT 0,
+    consumos INTEGER NOT NULL DEFAULT 0,
+    ajustes INTEGER NOT NULL DEFAULT 0,
+    mermas INTEGER NOT NULL DEFAULT 0,
+    movimientos INTEGER NOT NULL DEFAULT 0,
+    piezas_cierre INTEGER NOT NULL,
+    PRIMARY KEY (id_insumo, mes)
+) WITHOUT ROWID;
+
+-- Saldo inicial de lo que ya había en stock
+INSERT INTO movimientos (id_insumo, tipo, cantidad, piezas_resultantes, nota)
+SELECT id, 'ajuste', piezas, piezas, 'Saldo inicial'
+FROM insumos
+WHERE COALESCE(piezas, 0) <> 0;
+
+-- Solo agregar: las filas se borran únicamente al compactar o al borrar el insumo
+CREATE TRIGGER IF NOT EXISTS trg_movimientos_sin_update BEFORE UPDATE ON movimientos BEGIN
+    SELECT RAISE(ABORT, 'movimientos no se modifica; registre un ajuste');
+END;
+
+-- Movimiento -> stock
+CREATE TRIGGER IF NOT EXISTS trg_movimientos_aplicar AFTER INSERT ON movimientos
+WHEN NEW.piezas_resultantes IS NOT (SELECT piezas FROM insumos WHERE id = NEW.id_insumo) BEGIN
+    UPDATE insumos SET piezas = NEW.piezas_resultantes WHERE id = NEW.id_insumo;
+END;
+
+-- Stock cambiado fuera del libro -> movimiento
+CREATE TRIGGER IF NOT EXISTS trg_insumos_movimiento_insert AFTER INSERT ON insumos
+WHEN COALESCE(NEW.piezas, 0) <> 0 BEGIN
+    INSERT INTO movimientos (id_insumo, tipo, cantidad, piezas_resultantes, nota)
+    VALUES (NEW.id, 'entrega', NEW.piezas, NEW.piezas, 'Alta del insumo');
+END;
+
+-- Si el último movimiento del insumo ya dejó este stock, el cambio vino del libro
+CREATE TRIGGER IF NOT EXISTS trg_insumos_movimiento_update AFTER UPDATE OF piezas ON insumos
+WHEN COALESCE(NEW.piezas, 0) <> COALESCE(OLD.piezas, 0)
+ AND NOT EXISTS (SELECT 1 FROM movimientos
+                 WHERE id = (SELECT MAX(id) FROM movimientos WHERE id_insumo = NEW.id)
+                 AND piezas_resultantes = COALESCE(NEW.piezas, 0)) BEGIN
+    INSERT INTO movimientos (id_insumo, tipo, cantidad, piezas_resultantes, nota)
+    VALUES (NEW.id, 'ajuste', COALESCE(NEW.piezas, 0) - COALESCE(OLD.piezas, 0), COALESCE(NEW.piezas, 0),
+            'Edición del insumo');
+END;
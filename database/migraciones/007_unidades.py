@@ -0,0 +1,130 @@
+"""
+Registro de unidades y cantidades normalizadas.
+
+- unidades: cada unidad conocida con su unidad base y factor. Los
+  renglones están escritos aquí (los de Unidades.FACTORES al crear la
+  migración) para que una base nueva y una ya migrada tengan el mismo
+  registro; una unidad nueva se agrega con otra migración, junto con
+  FACTORES
+- insumos.unidad_base / contenido_base: contenido de una pieza en la
+  unidad base ("1 kg" y "1000 g" quedan iguales). Una unidad que no está
+  en el registro se guarda tal cual con factor 1
+- servicio_insumo.piezas_normalizadas: piezas del insumo que usa un
+  servicio, con las mismas reglas que Consumo (piezas si se capturaron,
+  si no contenido convertido / contenido por pieza). NULL si no se puede
+  convertir
+
+Los triggers las recalculan al cambiar la unidad o el contenido, así que
+los totales y el consumo se calculan con SUM sin convertir renglón por
+renglón en Python.
+"""
+
+def normalizada(columna):
+    """Misma regla que Unidades.normalizar, en SQL"""
+    return f"NULLIF(lower(rtrim(trim({columna}), '.')), '')"
+
+
+UNIDAD_INSUMO = normalizada("insumos.unidad_contenido")
+UNIDAD_RECETA = normalizada("servicio_insumo.unidad_contenido")
+
+# SET de insumos (unidad_base, contenido_base)
+SET_INSUMO = f"""
+    unidad_base = COALESCE((SELECT base FROM unidades WHERE clave = {UNIDAD_INSUMO}), {UNIDAD_INSUMO}),
+    contenido_base = CASE WHEN {UNIDAD_INSUMO} IS NULL THEN NULL
+        ELSE COALESCE(insumos.contenido_por_pieza, 1)
+             * COALESCE((SELECT factor FROM unidades WHERE clave = {UNIDAD_INSUMO}), 1) END"""
+
+# Piezas por servicio de un renglón de servicio_insumo (i = su insumo).
+# Sin unidad en la receta se entiende la del insumo.
+PIEZAS_RECETA = f"""(
+    SELECT CASE
+        WHEN servicio_insumo.piezas_por_servicio THEN servicio_insumo.piezas_por_servicio
+        WHEN NOT COALESCE(servicio_insumo.contenido_por_servicio, 0) THEN 0
+        WHEN NOT COALESCE(i.contenido_por_pieza, 0) THEN NULL
+        WHEN COALESCE({UNIDAD_RECETA}, {normalizada("i.unidad_contenido")})
+             IS COALESCE({normalizada("i.unidad_contenido")}, {UNIDAD_RECETA})
+            THEN servicio_insumo.contenido_por_servicio / i.contenido_por_pieza
+        ELSE (SELECT servicio_insumo.contenido_por_servicio * u.factor / i.contenido_base
+              FROM unidades u WHERE u.clave = {UNIDAD_RECETA} AND u.base = i.unidad_base)
+    END
+    FROM insumos i WHERE i.id = servicio_insumo.id_insumo
+)"""
+
+TABLA_UNIDADES = """CREATE TABLE IF NOT EXISTS unidades (
+    clave TEXT PRIMARY KEY,
+    base TEXT NOT NULL,
+    factor REAL NOT NULL CHECK (factor > 0)
+) WITHOUT ROWID"""
+
+# (clave, base, factor)
+REGISTRO = [
+    ("bolsa", "bolsa", 1.0),
+    ("botella", "botella", 1.0),
+    ("caja", "caja", 1.0),
+    ("g", "g", 1.0),
+    ("gr", "g", 1.0),
+    ("gramo", "g", 1.0),
+    ("gramos", "g", 1.0),
+    ("kg", "g", 1000.0),
+    ("kilo", "g", 1000.0),
+    ("kilogramo", "g", 1000.0),
+    ("kilogramos", "g", 1000.0),
+    ("kilos", "g", 1000.0),
+    ("l", "ml", 1000.0),
+    ("lata", "lata", 1.0),
+    ("litro", "ml", 1000.0),
+    ("litros", "ml", 1000.0),
+    ("lt", "ml", 1000.0),
+    ("mg", "g", 0.001),
+    ("mililitro", "ml", 1.0),
+    ("mililitros", "ml", 1.0),
+    ("ml", "ml", 1.0),
+    ("paq", "paq", 1.0),
+    ("pieza", "pza", 1.0),
+    ("piezas", "pza", 1.0),
+    ("pza", "pza", 1.0),
+]
+
+SENTENCIAS = [
+    "ALTER TABLE insumos ADD COLUMN unidad_base TEXT",
+    "ALTER TABLE insumos ADD COLUMN contenido_base REAL",
+    "ALTER TABLE servicio_insumo ADD COLUMN piezas_normalizadas REAL",
+    
+    # Insumos: al darse de alta y al cambiar su unidad o contenido (junto
+    # con las recetas que lo usan)
+    f"""CREATE TRIGGER IF NOT EXISTS trg_insumos_unidad_insert AFTER INSERT ON insumos BEGIN
+        UPDATE insumos SET {SET_INSUMO}
+        WHERE id = NEW.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_insumos_unidad_update
+    AFTER UPDATE OF contenido_por_pieza, unidad_contenido ON insumos BEGIN
+        UPDATE insumos SET {SET_INSUMO}
+        WHERE id = NEW.id;
+        UPDATE servicio_insumo SET piezas_normalizadas = {PIEZAS_RECETA}
+        WHERE id_insumo = NEW.id;
+    END""",
+    
+    # Recetas
+    f"""CREATE TRIGGER IF NOT EXISTS trg_servicio_insumo_unidad_insert AFTER INSERT ON servicio_insumo BEGIN
+        UPDATE servicio_insumo SET piezas_normalizadas = {PIEZAS_RECETA}
+        WHERE id = NEW.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_servicio_insumo_unidad_update
+    AFTER UPDATE OF id_insumo, piezas_por_servicio, contenido_por_servicio, unidad_contenido
+    ON servicio_insumo BEGIN
+        UPDATE servicio_insumo SET piezas_normalizadas = {PIEZAS_RECETA}
+        WHERE id = NEW.id;
+    END""",
+    
+    # Carga inicial (primero los insumos: las recetas usan su contenido_base)
+    f"UPDATE insumos SET {SET_INSUMO}",
+    f"UPDATE servicio_insumo SET piezas_normalizadas = {PIEZAS_RECETA}",
+]
+
+
+def aplicar(conn):
+    conn.execute(TABLA_UNIDADES)
+    conn.executemany("INSERT OR REPLACE INTO unidades (clave, base, factor) VALUES (?, ?, ?)",
+                     REGISTRO)
+    for sentencia in SENTENCIAS:
+        conn.execute(sentencia)
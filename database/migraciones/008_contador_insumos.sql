@@ -0,0 +1,24 @@
+-- Número de insumos de cada servicio guardado en servicios.num_insumos
+-- (lo mantienen los triggers de servicio_insumo; el listado de servicios
+-- ya no cuenta la receta de cada renglón). ServiciosCRUD.reparar_contadores()
+-- corrige cualquier diferencia con un conteo completo.
+
+ALTER TABLE servicios ADD COLUMN num_insumos INTEGER NOT NULL DEFAULT 0;
+
+UPDATE servicios
+SET num_insumos = (SELECT COUNT(*) FROM servicio_insumo si WHERE si.id_servicio = servicios.id);
+
+CREATE TRIGGER IF NOT EXISTS trg_servicio_insumo_contador_insert AFTER INSERT ON servicio_insumo BEGIN
+    UPDATE servicios SET num_insumos = num_insumos + 1 WHERE id = NEW.id_servicio;
+END;
+
+-- También corre por ON DELETE CASCADE al borrar un insumo o un servicio
+CREATE TRIGGER IF NOT EXISTS trg_servicio_insumo_contador_delete AFTER DELETE ON servicio_insumo BEGIN
+    UPDATE servicios SET num_insumos = num_insumos - 1 WHERE id = OLD.id_servicio;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_servicio_insumo_contador_update AFTER UPDATE OF id_servicio ON servicio_insumo
+WHEN NEW.id_servicio IS NOT OLD.id_servicio BEGIN
+    UPDATE servicios SET num_insumos = num_insumos - 1 WHERE id = OLD.id_servicio;
+    UPDATE servicios SET num_insumos = num_insumos + 1 WHERE id = NEW.id_servicio;
+END;
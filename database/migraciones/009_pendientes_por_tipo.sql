@@ -0,0 +1,46 @@
+-- alerta_pendientes por umbral: (id_insumo, tipo) en lugar de solo el insumo.
+-- El escáner registra únicamente los tipos anotados, así que un cambio de
+-- caducidad ya no vuelve a registrar el stock bajo de un insumo que seguía
+-- bajo (ni al revés).
+
+DROP TRIGGER IF EXISTS trg_alerta_estado_pendiente_insert;
+DROP TRIGGER IF EXISTS trg_alerta_estado_pendiente_update;
+
+ALTER TABLE alerta_pendientes RENAME TO alerta_pendientes_005;
+
+CREATE TABLE alerta_pendientes (
+    id_insumo INTEGER NOT NULL,
+    tipo TEXT NOT NULL,
+    PRIMARY KEY (id_insumo, tipo)
+) WITHOUT ROWID;
+
+-- Los pendientes anteriores no guardaban el umbral: se conservan los tipos vigentes
+INSERT OR IGNORE INTO alerta_pendientes (id_insumo, tipo)
+SELECT p.id_insumo, 'stock_bajo' FROM alerta_pendientes_005 p
+JOIN alerta_estado e ON e.id_insumo = p.id_insumo
+WHERE e.stock_bajo = 1;
+
+INSERT OR IGNORE INTO alerta_pendientes (id_insumo, tipo)
+SELECT p.id_insumo, e.caducidad FROM alerta_pendientes_005 p
+JOIN alerta_estado e ON e.id_insumo = p.id_insumo
+WHERE e.caducidad <> 'ok';
+
+DROP TABLE alerta_pendientes_005;
+
+-- Un renglón por umbral cruzado: pasar a stock bajo o a otro estado de caducidad
+CREATE TRIGGER IF NOT EXISTS trg_alerta_estado_pendiente_insert AFTER INSERT ON alerta_estado
+WHEN NEW.stock_bajo = 1 OR NEW.caducidad <> 'ok' BEGIN
+    INSERT OR IGNORE INTO alerta_pendientes (id_insumo, tipo)
+    SELECT NEW.id_insumo, 'stock_bajo' WHERE NEW.stock_bajo = 1;
+    INSERT OR IGNORE INTO alerta_pendientes (id_insumo, tipo)
+    SELECT NEW.id_insumo, NEW.caducidad WHERE NEW.caducidad <> 'ok';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alerta_estado_pendiente_update AFTER UPDATE ON alerta_estado
+WHEN (NEW.stock_bajo = 1 AND OLD.stock_bajo = 0)
+  OR (NEW.caducidad <> 'ok' AND NEW.caducidad <> OLD.caducidad) BEGIN
+    INSERT OR IGNORE INTO alerta_pendientes (id_insumo, tipo)
+    SELECT NEW.id_insumo, 'stock_bajo' WHERE NEW.stock_bajo = 1 AND OLD.stock_bajo = 0;
+    INSERT OR IGNORE INTO alerta_pendientes (id_insumo, tipo)
+    SELECT NEW.id_insumo, NEW.caducidad WHERE NEW.caducidad <> 'ok' AND NEW.caducidad <> OLD.caducidad;
+END;
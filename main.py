@@ -12,11 +12,17 @@ import sys
 
 # Importaciones del proyecto
 from config.constantes import *
+from config.db_config import SQLITE_CHECKPOINT, SQLITE_ESCANER_ALERTAS, SQLITE_MOVIMIENTOS
 from estilos.colores import PaletaColores
 from estilos.fuentes import Fuentes
+from utils.auditor_consultas import AuditorPlanes
 from utils.db_connection import Database
+from utils.ejecutor import EjecutorConsultas
+from utils.escaner_alertas import EscanerAlertas
+from utils.movimientos import Movimientos
 from utils.posiciones import Posiciones
 from ventanas.formularios import GestorFormularios
+from ventanas.servicios import ServiciosCRUD
 
 
 class AplicacionCaruma(tk.Tk):
@@ -32,8 +38,22 @@ class AplicacionCaruma(tk.Tk):
         # Centrar ventana
         self.centrar_ventana()
         
-        # Inicializar base de datos
-        self.inicializar_bd()
+        # Inicializar base de datos (si falla la ventana ya se cerró)
+        self.iniciada = self.inicializar_bd()
+        if not self.iniciada:
+            return
+        
+        # Checkpoint periódico del WAL
+        self.after(SQLITE_CHECKPOINT['intervalo_ms'], self.checkpoint_periodico)
+        
+        # Registro de alertas nuevas (al arrancar y después cada minuto)
+        self.escanear_alertas()
+        
+        # Compactación del libro de movimientos (al arrancar y cada 6 horas)
+        self.compactar_movimientos()
+        
+        # Revisión de los contadores de insumos por servicio (al arrancar)
+        self.reparar_contadores()
         
         # Crear interfaz
         self.crear_interfaz()
@@ -51,17 +71,53 @@ class AplicacionCaruma(tk.Tk):
         self.geometry(f'{ancho}x{alto}+{x}+{y}')
     
     def inicializar_bd(self):
-        """Inicializa la conexión a la base de datos"""
+        """Inicializa la conexión a la base de datos. Retorna False si no se pudo"""
         try:
             Database.initialize()
             print("✓ Conexión a base de datos establecida")
+            AuditorPlanes.activar_si_configurado()
+            EjecutorConsultas.configurar(self)
+            return True
         except Exception as e:
             messagebox.showerror(
                 "Error de Conexión",
-                f"No se pudo conectar a la base de datos:\n{str(e)}\n\n" +
-                "Verifique que PostgreSQL esté ejecutándose y las credenciales sean correctas."
+                f"No se pudo abrir la base de datos:\n{str(e)}\n\n" +
+                "Verifique que el archivo database/caruma.db exista y se pueda escribir."
             )
             self.destroy()
+            return False
+    
+    def checkpoint_periodico(self):
+        """Vuelca el WAL periódicamente para que no crezca sin límite"""
+        try:
+            Database.checkpoint_wal(SQLITE_CHECKPOINT['modo'])
+        except Exception as e:
+            print(f"Error en checkpoint del WAL: {e}")
+        self.after(SQLITE_CHECKPOINT['intervalo_ms'], self.checkpoint_periodico)
+    
+    def escanear_alertas(self):
+        """Registra en segundo plano los umbrales cruzados desde el último escaneo"""
+        EjecutorConsultas.submit(EscanerAlertas.escanear, lambda resultado: None,
+                                 al_error=lambda e: print(f"Error en el escáner de alertas: {e}"),
+                                 clave="escaner_alertas")
+        self.after(SQLITE_ESCANER_ALERTAS['intervalo_ms'], self.escanear_alertas)
+    
+    def compactar_movimientos(self):
+        """Pasa a movimientos_mes, en segundo plano, los movimientos de meses viejos"""
+        EjecutorConsultas.submit(Movimientos.compactar, lambda compactados: None,
+                                 al_error=lambda e: print(f"Error al compactar movimientos: {e}"),
+                                 clave="compactar_movimientos")
+        self.after(SQLITE_MOVIMIENTOS['intervalo_ms'], self.compactar_movimientos)
+    
+    def reparar_contadores(self):
+        """Corrige en segundo plano los num_insumos de servicios que no coincidan con su receta"""
+        def avisar(resultado):
+            exito, mensaje = resultado
+            if not exito:
+                print(f"Error al reparar contadores de insumos: {mensaje}")
+        EjecutorConsultas.submit(ServiciosCRUD.reparar_contadores, avisar,
+                                 al_error=lambda e: print(f"Error al reparar contadores de insumos: {e}"),
+                                 clave="reparar_contadores")
     
     def crear_interfaz(self):
         """Crea la interfaz principal"""
@@ -108,11 +164,13 @@ class AplicacionCaruma(tk.Tk):
         menubar.add_cascade(label="Operaciones", menu=menu_operaciones)
         menu_operaciones.add_command(label="Gestión de Inventario", command=self.abrir_inventario)
         menu_operaciones.add_command(label="Alertas", command=self.abrir_alertas)
+        menu_operaciones.add_command(label="Planeación de Eventos", command=self.abrir_planeacion)
         
         # Menú Ayuda
         menu_ayuda = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Ayuda", menu=menu_ayuda)
         menu_ayuda.add_command(label="Manual de Usuario", command=self.mostrar_manual)
+        menu_ayuda.add_command(label="Diagnóstico", command=self.abrir_diagnostico)
         menu_ayuda.add_command(label="Acerca de", command=self.mostrar_acerca_de)
     
     def mostrar_pantalla_inicio(self):
@@ -151,6 +209,7 @@ class AplicacionCaruma(tk.Tk):
             ("Gestionar Servicios", self.abrir_servicios),
             ("Ver Inventario", self.abrir_inventario),
             ("Ver Alertas", self.abrir_alertas),
+            ("Planear Eventos", self.abrir_planeacion),
         ]
         
         for i, (texto, comando) in enumerate(botones):
@@ -195,6 +254,18 @@ class AplicacionCaruma(tk.Tk):
         from ventanas.alertas import abrir_ventana_alertas
         abrir_ventana_alertas(self)
     
+    # ~~~~~~~~~~~~~~~~~~~ MÓDULO DE PLANEACIÓN ~~~~~~~~~~~~~~~~~~~
+    def abrir_planeacion(self):
+        """Abre el módulo de planeación de eventos"""
+        from ventanas.planeacion import abrir_ventana_planeacion
+        abrir_ventana_planeacion(self)
+    
+    # ~~~~~~~~~~~~~~~~~~~ MÓDULO DE DIAGNÓSTICO ~~~~~~~~~~~~~~~~~~~
+    def abrir_diagnostico(self):
+        """Abre la vista de diagnóstico de consultas"""
+        from ventanas.diagnostico import abrir_ventana_diagnostico
+        abrir_ventana_diagnostico(self)
+    
     # ~~~~~~~~~~~~~~~~~~~ AYUDA ~~~~~~~~~~~~~~~~~~~
     def mostrar_manual(self):
         """Abre el manual de usuario en PDF"""
@@ -236,6 +307,7 @@ class AplicacionCaruma(tk.Tk):
         """Cierra la aplicación de forma segura"""
         if messagebox.askokcancel("Salir", "¿Desea cerrar la aplicación?"):
             try:
+                EjecutorConsultas.cerrar()
                 Database.close_all_connections()
             except:
                 pass
@@ -246,7 +318,8 @@ def main():
     """Función principal"""
     try:
         app = AplicacionCaruma()
-        app.mainloop()
+        if app.iniciada:
+            app.mainloop()
     except Exception as e:
         print(f"Error fatal: {e}")
         messagebox.showerror("Error", f"Error al iniciar la aplicación:\n{str(e)}")
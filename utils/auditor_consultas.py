@@ -0,0 +1,346 @@
+"""
+Auditor de planes de consulta
+Ejecuta EXPLAIN QUERY PLAN sobre cada consulta distinta que pasa por Database
+y señala los recorridos completos (SCAN) y los ordenamientos temporales
+(USE TEMP B-TREE).
+
+Uso como guarda de regresión sobre una base sintética grande:
+    python -m utils.auditor_consultas [n_insumos]
+"""
+
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+from config.db_config import SQLITE_AUDITOR
+from utils.cache import CacheCatalogo
+from utils.db_connection import Database
+from utils.instrumentacion import Instrumentacion
+
+
+class AuditorPlanes:
+    """Se suscribe a Instrumentacion y explica una sola vez cada huella"""
+    
+    activo = False
+    
+    _planes = OrderedDict()
+    _candado = threading.Lock()
+    
+    # Hallazgos que se aceptan a propósito: (origen, línea del plan) ->
+    # motivo. Cada línea señalada de cada consulta tiene que estar aquí; una
+    # línea nueva en el plan de un origen ya listado también es regresión.
+    ESCANEOS_ESPERADOS = {
+        ("InsumosCRUD.obtener_todos", "SCAN i USING INDEX idx_insumos_nombre_nocase"):
+            "listado completo del catálogo, ya en orden alfabético",
+        ("InsumosCRUD.buscar", "USE TEMP B-TREE FOR ORDER BY"):
+            "orden por relevancia (bm25) de lo que encontró MATCH",
+        ("InsumosCRUD.buscar", "SCAN i USING INDEX idx_insumos_nombre_nocase"):
+            "respaldo LIKE '%texto%' cuando no hay FTS5",
+        ("InsumosCRUD.obtener_stock_bajo", "USE TEMP B-TREE FOR ORDER BY"):
+            "ordena por piezas lo que dio el índice parcial de stock bajo",
+        ("CategoriasCRUD.obtener_todas", "SCAN categorias USING COVERING INDEX sqlite_autoindex_categorias_1"):
+            "listado completo de categorías",
+        ("CategoriasCRUD.buscar", "USE TEMP B-TREE FOR ORDER BY"):
+            "orden por relevancia (bm25) de lo que encontró MATCH",
+        ("CategoriasCRUD.buscar", "SCAN categorias USING COVERING INDEX sqlite_autoindex_categorias_1"):
+            "respaldo LIKE '%texto%' cuando no hay FTS5",
+        ("ServiciosCRUD.obtener_todos", "SCAN s USING INDEX sqlite_autoindex_servicios_1"):
+            "listado completo de servicios, ya en orden alfabético",
+        ("ServiciosCRUD.buscar", "USE TEMP B-TREE FOR ORDER BY"):
+            "orden por relevancia (bm25) de lo que encontró MATCH",
+        ("ServiciosCRUD.buscar", "SCAN s USING INDEX sqlite_autoindex_servicios_1"):
+            "respaldo LIKE '%texto%' cuando no hay FTS5",
+        ("ServiciosCRUD.verificar_contadores", "SCAN s"):
+            "revisión completa de los contadores de insumos",
+        ("ServicioInsumoCRUD.obtener_insumos_servicio", "USE TEMP B-TREE FOR ORDER BY"):
+            "ordena por nombre la receta de un servicio",
+        ("ServicioInsumoCRUD.obtener_insumos_disponibles", "SCAN insumos USING INDEX sqlite_autoindex_insumos_1"):
+            "combo con todo el catálogo",
+        ("InventarioCRUD.obtener_por_categoria", "SCAN i"):
+            "totales por categoría de todo el inventario",
+        ("InventarioCRUD.obtener_por_categoria", "USE TEMP B-TREE FOR GROUP BY"):
+            "totales por categoría de todo el inventario",
+        ("InventarioCRUD.obtener_por_categoria", "USE TEMP B-TREE FOR ORDER BY"):
+            "ordena las categorías ya agrupadas",
+        ("InventarioCRUD.obtener_inventario_completo", "SCAN i USING INDEX idx_insumos_nombre_nocase"):
+            "inventario sin filtro en orden alfabético",
+        ("InventarioCRUD.obtener_inventario_completo", "SCAN i USING INDEX idx_insumos_categoria_nombre"):
+            "inventario sin filtro ordenado por categoría",
+        ("InventarioCRUD.obtener_inventario_completo", "SCAN i"):
+            "inventario sin filtro ordenado por piezas o caducidad",
+        ("InventarioCRUD.obtener_inventario_completo", "USE TEMP B-TREE FOR ORDER BY"):
+            "orden elegido por el usuario (piezas, caducidad, categoría)",
+        ("InventarioCRUD.obtener_valor_inventario", "SCAN insumos"):
+            "totales de contenido de todo el inventario",
+        ("InventarioCRUD.obtener_valor_inventario", "USE TEMP B-TREE FOR GROUP BY"):
+            "totales de contenido por unidad base",
+        ("InventarioCRUD.obtener_insumos_mas_usados", "SCAN i USING INDEX sqlite_autoindex_insumos_1"):
+            "agregado de todas las recetas",
+        ("InventarioCRUD.obtener_insumos_mas_usados", "USE TEMP B-TREE FOR ORDER BY"):
+            "top 10 de todas las recetas",
+        ("AlertasCRUD.obtener_historial_alertas", "SCAN a USING INDEX idx_alertas_fecha"):
+            "página del historial: recorre el índice de fecha hasta el LIMIT",
+        ("movimientos.py:Movimientos.resumen", "SCAN movimientos_mes"):
+            "totales de todo el libro de movimientos",
+        ("movimientos.py:Movimientos.resumen", "SCAN movimientos USING INDEX idx_movimientos_insumo"):
+            "totales de todo el libro de movimientos",
+        ("movimientos.py:Movimientos.resumen", "SCAN (subquery-2)"):
+            "totales de todo el libro de movimientos",
+        ("movimientos.py:Movimientos.resumen", "USE TEMP B-TREE FOR GROUP BY"):
+            "totales por insumo de todo el libro de movimientos",
+        ("movimientos.py:Movimientos.verificar", "SCAN i"):
+            "revisión completa del stock contra el libro",
+    }
+    
+    _SENTENCIAS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+    _RE_CADENAS = re.compile(r"'(?:[^']|'')*'")
+    _RE_INDICE = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+    _RE_FTS_MATCH = re.compile(r"VIRTUAL TABLE INDEX \d+:\S*M")
+    
+    @classmethod
+    def activar(cls):
+        cls.activo = True
+        Instrumentacion.agregar_hook(cls.auditar)
+        print("✓ Auditor de planes de consulta activo")
+    
+    @classmethod
+    def desactivar(cls):
+        cls.activo = False
+        Instrumentacion.quitar_hook(cls.auditar)
+    
+    @classmethod
+    def activar_si_configurado(cls):
+        """Activa el auditor según SQLITE_AUDITOR o CARUMA_AUDITAR_SQL"""
+        if SQLITE_AUDITOR['activo'] or os.environ.get("CARUMA_AUDITAR_SQL") == "1":
+            cls.activar()
+    
+    @classmethod
+    def auditar(cls, registro):
+        """Hook de Instrumentacion: explica la consulta si su huella es nueva"""
+        if registro["error"]:
+            return
+        
+        query = registro["query"].strip()
+        if not query.upper().startswith(cls._SENTENCIAS):
+            return
+        
+        huella = registro["huella"]
+        with cls._candado:
+            if huella in cls._planes:
+                return
+            # Se reserva la huella para no explicarla dos veces desde otro hilo
+            cls._planes[huella] = None
+        
+        try:
+            detalles, parciales = cls.explicar(query, registro["params"])
+            resultado = {
+                "huella": huella,
+                "origen": registro["origen"],
+                "plan": detalles,
+                "hallazgos": cls.clasificar(detalles, parciales),
+                "error": None
+            }
+        except Exception as e:
+            resultado = {"huella": huella, "origen": registro["origen"],
+                         "plan": [], "hallazgos": [], "error": str(e)}
+        
+        with cls._candado:
+            cls._planes[huella] = resultado
+            while len(cls._planes) > SQLITE_AUDITOR['max_planes']:
+                cls._planes.popitem(last=False)
+    
+    @classmethod
+    def explicar(cls, query, params=None):
+        """
+        Retorna las líneas de EXPLAIN QUERY PLAN de la consulta y los nombres
+        de los índices parciales de la base. Va directo a la conexión (no a
+        ejecutar_query) para no volver a pasar por la instrumentación.
+        """
+        if not isinstance(params, (tuple, list, dict)):
+            # Lotes y consultas sin parámetros: basta con NULL en cada marcador
+            params = (None,) * cls._RE_CADENAS.sub("", query).count("?")
+        
+        with Database.conexion() as conn:
+            filas = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+            parciales = {fila[0] for fila in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND sql LIKE '%WHERE%'"
+            )}
+        return [fila[3] for fila in filas], parciales
+    
+    @classmethod
+    def clasificar(cls, detalles, parciales=()):
+        """
+        Líneas del plan que indican un recorrido completo o un ordenamiento
+        temporal. No cuentan: recorrer un índice parcial (solo contiene las
+        filas que cumplen su WHERE), una tabla FTS5 filtrada con MATCH y el
+        catálogo sqlite_master.
+        """
+        hallazgos = []
+        for detalle in detalles:
+            if detalle.startswith("SCAN ") and detalle not in ("SCAN CONSTANT ROW", "SCAN sqlite_master"):
+                if cls._RE_FTS_MATCH.search(detalle):
+                    continue
+                indice = cls._RE_INDICE.search(detalle)
+                if indice and indice.group(1) in parciales:
+                    continue
+                hallazgos.append(detalle)
+            elif "USE TEMP B-TREE" in detalle:
+                hallazgos.append(detalle)
+        return hallazgos
+    
+    @classmethod
+    def resultados(cls):
+        """Consultas auditadas, con y sin hallazgos"""
+        with cls._candado:
+            return [dict(r) for r in cls._planes.values() if r is not None]
+    
+    @classmethod
+    def justificacion(cls, origen, hallazgo):
+        """Motivo por el que se acepta ese hallazgo en ese origen (None = regresión)"""
+        return cls.ESCANEOS_ESPERADOS.get((origen, hallazgo))
+    
+    @classmethod
+    def es_esperado(cls, resultado):
+        """True si cada hallazgo de la consulta está justificado"""
+        return all(cls.justificacion(resultado["origen"], h) for h in resultado["hallazgos"])
+    
+    @classmethod
+    def regresiones(cls):
+        """Consultas con hallazgos que no están justificados"""
+        return [r for r in cls.resultados() if r["hallazgos"] and not cls.es_esperado(r)]
+    
+    @classmethod
+    def reporte(cls):
+        """Reporte de texto con el plan de cada consulta señalada"""
+        resultados = cls.resultados()
+        señaladas = [r for r in resultados if r["hallazgos"] or r["error"]]
+        señaladas.sort(key=lambda r: (cls.es_esperado(r), r["origen"]))
+        hallazgos = [(r["origen"], h) for r in resultados for h in r["hallazgos"]]
+        
+        lineas = [
+            "REPORTE DE PLANES DE CONSULTA - CARUMA",
+            "=" * 60,
+            f"Consultas auditadas: {len(resultados)}",
+            f"Con hallazgos: {sum(1 for r in resultados if r['hallazgos'])}",
+            f"Hallazgos justificados: {sum(1 for h in hallazgos if cls.justificacion(*h))} de {len(hallazgos)}",
+            f"Regresiones: {len(cls.regresiones())}",
+            ""
+        ]
+        
+        for r in señaladas:
+            if r["error"]:
+                estado = "ERROR"
+            elif cls.es_esperado(r):
+                estado = "esperado"
+            else:
+                estado = "REGRESIÓN"
+            
+            lineas.append(f"[{estado}] {r['origen']}")
+            lineas.append(f"  {r['huella'][:160]}")
+            if r["error"]:
+                lineas.append(f"  ! {r['error']}")
+            for detalle in r["plan"]:
+                if detalle not in r["hallazgos"]:
+                    lineas.append(f"    {detalle}")
+                    continue
+                motivo = cls.justificacion(r["origen"], detalle)
+                lineas.append(f"  ~ {detalle}  ({motivo})" if motivo else f"  ! {detalle}")
+            lineas.append("")
+        
+        return "\n".join(lineas)
+    
+    @classmethod
+    def reiniciar(cls):
+        with cls._candado:
+            cls._planes.clear()
+
+
+def ejercitar_consultas():
+    """Llama a todas las consultas de lectura de las ventanas (y a la purga del historial)"""
+    from datetime import date
+    from utils.escaner_alertas import EscanerAlertas
+    from utils.movimientos import Movimientos
+    from ventanas.alertas import AlertasCRUD
+    from ventanas.categorias import CategoriasCRUD
+    from ventanas.insumos import InsumosCRUD
+    from ventanas.inventario import InventarioCRUD
+    from ventanas.servicios import ServiciosCRUD, ServicioInsumoCRUD
+    
+    # Sin caché: cada listado tiene que llegar a SQLite para auditar su plan
+    CacheCatalogo.invalidar()
+    
+    InsumosCRUD.obtener_todos()
+    InsumosCRUD.obtener_por_id(1)
+    InsumosCRUD.buscar("lim")
+    InsumosCRUD.filtrar_por_categoria(1)
+    InsumosCRUD.obtener_stock_bajo()
+    InsumosCRUD.obtener_por_caducar(7)
+    
+    CategoriasCRUD.obtener_todas()
+    CategoriasCRUD.obtener_por_id(1)
+    CategoriasCRUD.buscar("cat")
+    
+    ServiciosCRUD.obtener_todos()
+    ServiciosCRUD.obtener_por_id(1)
+    ServiciosCRUD.buscar("serv")
+    ServiciosCRUD.verificar_contadores()
+    ServicioInsumoCRUD.obtener_insumos_servicio(1)
+    ServicioInsumoCRUD.obtener_insumos_disponibles()
+    
+    InventarioCRUD.obtener_resumen()
+    InventarioCRUD.obtener_por_categoria()
+    for filtro in (None, "stock_bajo", "por_caducar", "caducados", "sin_stock"):
+        InventarioCRUD.obtener_inventario_completo(filtro)
+    for orden in ("categoria", "piezas_asc", "piezas_desc", "caducidad"):
+        InventarioCRUD.obtener_inventario_completo(None, orden)
+    InventarioCRUD.obtener_valor_inventario()
+    InventarioCRUD.obtener_insumos_mas_usados()
+    
+    AlertasCRUD.obtener_snapshot(7)
+    AlertasCRUD.obtener_resumen_alertas()
+    pagina = AlertasCRUD.obtener_historial_alertas(50)
+    if pagina:
+        AlertasCRUD.obtener_historial_alertas(50, (pagina[-1][1], pagina[-1][0]))
+    
+    # Fecha anterior a cualquier alerta: recorre el plan de la purga sin borrar nada
+    EscanerAlertas.purgar(date(2000, 1, 1))
+    
+    movimientos = Movimientos.historial(1, 50)
+    if movimientos:
+        Movimientos.historial(1, 50, movimientos[-1][0])
+    Movimientos.resumen()
+    Movimientos.resumen(date.today())
+    Movimientos.verificar()
+
+
+def auditar_base_sintetica(n_insumos=20000, ruta=None):
+    """
+    Genera una base sintética, ejercita todas las consultas con el auditor
+    activo y retorna las regresiones encontradas
+    """
+    from utils.datos_sinteticos import preparar_base_sintetica
+    
+    if ruta is None:
+        ruta = os.path.join(tempfile.mkdtemp(prefix="caruma_auditor_"), "sintetica.db")
+    
+    preparar_base_sintetica(ruta, n_insumos=n_insumos)
+    
+    AuditorPlanes.reiniciar()
+    AuditorPlanes.activar()
+    try:
+        ejercitar_consultas()
+    finally:
+        AuditorPlanes.desactivar()
+    
+    return AuditorPlanes.regresiones()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    regresiones = auditar_base_sintetica(n)
+    print(AuditorPlanes.reporte())
+    Database.close_all_connections()
+    sys.exit(1 if regresiones else 0)
@@ -0,0 +1,154 @@
+"""
+Benchmark de consultas de alertas e inventario
+Compara las consultas anteriores (date() sobre la columna, sin índices) con
+las actuales (fechas sin envolver + índices de la migración 002) sobre una
+base sintética.
+
+Uso:
+    python -m utils.benchmark_consultas [n_insumos] [repeticiones]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from config.db_config import SQLITE_PRAGMAS
+from utils.db_connection import Database
+
+
+# Índices creados por la migración 002 (se quitan en la copia "antes")
+INDICES_002 = [
+    "idx_insumos_caducidad", "idx_insumos_stock_bajo", "idx_insumos_sin_stock",
+    "idx_insumos_nombre_nocase", "idx_insumos_categoria_nombre", "idx_alertas_fecha"
+]
+
+_COLUMNAS = """i.id, i.nombre, COALESCE(c.nombre, 'Sin categoría'), i.piezas,
+    i.contenido_por_pieza, i.unidad_contenido, i.fecha_caducidad, i.alerta_piezas"""
+
+_FROM = "FROM insumos i LEFT JOIN categorias c ON i.id_categoria = c.id"
+
+# (nombre, consulta anterior, consulta actual)
+CONSULTAS = [
+    ("Alertas por caducar",
+     f"""SELECT {_COLUMNAS} {_FROM}
+         WHERE i.fecha_caducidad IS NOT NULL
+         AND date(i.fecha_caducidad) >= date('now')
+         AND date(i.fecha_caducidad) <= date('now', '+7 days')
+         ORDER BY date(i.fecha_caducidad) ASC""",
+     f"""SELECT {_COLUMNAS} {_FROM}
+         WHERE i.fecha_caducidad >= date('now')
+         AND i.fecha_caducidad <= date('now', '+7 days')
+         ORDER BY i.fecha_caducidad ASC"""),
+    ("Alertas caducados",
+     f"""SELECT {_COLUMNAS} {_FROM}
+         WHERE i.fecha_caducidad IS NOT NULL AND date(i.fecha_caducidad) < date('now')
+         ORDER BY date(i.fecha_caducidad) ASC""",
+     f"""SELECT {_COLUMNAS} {_FROM}
+         WHERE i.fecha_caducidad IS NOT NULL AND i.fecha_caducidad < date('now')
+         ORDER BY i.fecha_caducidad ASC"""),
+    ("Resumen de alertas",
+     """SELECT
+            SUM(CASE WHEN piezas <= alerta_piezas AND alerta_piezas > 0 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN fecha_caducidad IS NOT NULL AND date(fecha_caducidad) >= date('now')
+                AND date(fecha_caducidad) <= date('now', '+7 days') THEN 1 ELSE 0 END),
+            SUM(CASE WHEN fecha_caducidad IS NOT NULL
+                AND date(fecha_caducidad) < date('now') THEN 1 ELSE 0 END)
+        FROM insumos""",
+     """SELECT
+            (SELECT COUNT(*) FROM insumos WHERE piezas <= alerta_piezas AND alerta_piezas > 0),
+            (SELECT COUNT(*) FROM insumos WHERE fecha_caducidad >= date('now')
+             AND fecha_caducidad <= date('now', '+7 days')),
+            (SELECT COUNT(*) FROM insumos WHERE fecha_caducidad < date('now'))"""),
+    ("Inventario stock bajo",
+     f"""SELECT {_COLUMNAS} {_FROM}
+         WHERE i.piezas <= i.alerta_piezas AND i.alerta_piezas > 0 ORDER BY i.nombre""",
+     f"""SELECT {_COLUMNAS} {_FROM}
+         WHERE i.piezas <= i.alerta_piezas AND i.alerta_piezas > 0
+         ORDER BY i.nombre COLLATE NOCASE"""),
+    ("Inventario sin stock",
+     f"SELECT {_COLUMNAS} {_FROM} WHERE i.piezas = 0 ORDER BY i.nombre",
+     f"SELECT {_COLUMNAS} {_FROM} WHERE i.piezas = 0 ORDER BY i.nombre COLLATE NOCASE"),
+    ("Insumos por categoría",
+     f"SELECT {_COLUMNAS} {_FROM} WHERE i.id_categoria = 1 ORDER BY i.nombre",
+     f"SELECT {_COLUMNAS} {_FROM} WHERE i.id_categoria = 1 ORDER BY i.nombre COLLATE NOCASE"),
+    ("Historial de alertas",
+     """SELECT a.id, a.fecha_alerta, i.nombre, a.tipo, a.mensaje
+        FROM alertas a JOIN insumos i ON a.id_insumo = i.id
+        ORDER BY date(a.fecha_alerta) DESC, a.id DESC LIMIT 50""",
+     """SELECT a.id, a.fecha_alerta, i.nombre, a.tipo, a.mensaje
+        FROM alertas a JOIN insumos i ON a.id_insumo = i.id
+        ORDER BY a.fecha_alerta DESC, a.id DESC LIMIT 50"""),
+]
+
+
+def _conectar(ruta):
+    conn = sqlite3.connect(ruta, isolation_level=None)
+    for nombre, valor in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {nombre} = {valor}")
+    return conn
+
+
+def _medir(conn, query, repeticiones):
+    """Mejor tiempo en ms de varias ejecuciones y número de filas"""
+    mejor = None
+    filas = 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        filas = len(conn.execute(query).fetchall())
+        ms = (time.perf_counter() - inicio) * 1000
+        mejor = ms if mejor is None else min(mejor, ms)
+    return mejor, filas
+
+
+def ejecutar_benchmark(n_insumos=50000, repeticiones=5, directorio=None):
+    """
+    Retorna [(nombre, ms_antes, ms_despues, filas_antes, filas_despues)]
+    """
+    from utils.datos_sinteticos import preparar_base_sintetica
+    
+    directorio = directorio or tempfile.mkdtemp(prefix="caruma_benchmark_")
+    ruta_despues = os.path.join(directorio, "despues.db")
+    ruta_antes = os.path.join(directorio, "antes.db")
+    
+    preparar_base_sintetica(ruta_despues, n_insumos=n_insumos)
+    Database.close_all_connections()
+    
+    # Copia sin los índices de la migración 002
+    despues = _conectar(ruta_despues)
+    antes = sqlite3.connect(ruta_antes, isolation_level=None)
+    despues.backup(antes)
+    antes.close()
+    
+    antes = _conectar(ruta_antes)
+    for indice in INDICES_002:
+        antes.execute(f"DROP INDEX IF EXISTS {indice}")
+    antes.execute("CREATE INDEX IF NOT EXISTS idx_insumos_categoria ON insumos(id_categoria)")
+    
+    resultados = []
+    for nombre, query_antes, query_despues in CONSULTAS:
+        ms_antes, filas_antes = _medir(antes, query_antes, repeticiones)
+        ms_despues, filas_despues = _medir(despues, query_despues, repeticiones)
+        resultados.append((nombre, ms_antes, ms_despues, filas_antes, filas_despues))
+    
+    antes.close()
+    despues.close()
+    return resultados
+
+
+def imprimir_resultados(resultados, n_insumos, descripcion=None):
+    print(f"\nBENCHMARK DE CONSULTAS - {descripcion or f'{n_insumos} insumos'} (mejor de varias ejecuciones)")
+    print("=" * 78)
+    print(f"{'Consulta':<26}{'Antes ms':>11}{'Después ms':>12}{'Factor':>9}{'Filas':>10}")
+    print("-" * 78)
+    for nombre, ms_antes, ms_despues, filas_antes, filas_despues in resultados:
+        factor = ms_antes / ms_despues if ms_despues > 0 else float("inf")
+        filas = f"{filas_despues}" if filas_antes == filas_despues else f"{filas_antes}≠{filas_despues}"
+        print(f"{nombre:<26}{ms_antes:>11.2f}{ms_despues:>12.2f}{factor:>8.1f}x{filas:>10}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    imprimir_resultados(ejecutar_benchmark(n, repeticiones), n)
@@ -0,0 +1,71 @@
+"""
+Benchmark del listado de servicios
+Compara el conteo de insumos con subconsulta correlacionada (una por
+servicio) contra la columna servicios.num_insumos de la migración 008
+sobre una base sintética.
+
+Uso:
+    python -m utils.benchmark_servicios [n_servicios] [insumos_por_servicio] [repeticiones]
+"""
+
+import os
+import sys
+import tempfile
+
+from utils.benchmark_consultas import _conectar, _medir, imprimir_resultados
+from utils.db_connection import Database
+
+
+_CONTEO = "(SELECT COUNT(*) FROM servicio_insumo si WHERE si.id_servicio = s.id)"
+
+# (nombre, consulta anterior, consulta actual)
+CONSULTAS = [
+    ("Listado de servicios",
+     f"SELECT s.id, s.nombre, {_CONTEO} as num_insumos FROM servicios s ORDER BY s.nombre",
+     "SELECT s.id, s.nombre, s.num_insumos FROM servicios s ORDER BY s.nombre"),
+    ("Búsqueda LIKE",
+     f"""SELECT s.id, s.nombre, {_CONTEO} as num_insumos FROM servicios s
+         WHERE s.nombre LIKE '%1%' COLLATE NOCASE ORDER BY s.nombre""",
+     """SELECT s.id, s.nombre, s.num_insumos FROM servicios s
+        WHERE s.nombre LIKE '%1%' COLLATE NOCASE ORDER BY s.nombre"""),
+    ("Servicios con receta",
+     f"SELECT COUNT(*) FROM servicios s WHERE {_CONTEO} > 0",
+     "SELECT COUNT(*) FROM servicios s WHERE s.num_insumos > 0"),
+]
+
+
+def ejecutar_benchmark(n_servicios=5000, insumos_por_servicio=50, repeticiones=5, directorio=None):
+    """
+    Retorna [(nombre, ms_antes, ms_despues, filas_antes, filas_despues)]
+    Las dos versiones corren sobre la misma base (la subconsulta sigue siendo válida).
+    """
+    from utils.datos_sinteticos import preparar_base_sintetica
+    from ventanas.servicios import ServiciosCRUD
+    
+    directorio = directorio or tempfile.mkdtemp(prefix="caruma_benchmark_")
+    ruta = os.path.join(directorio, "servicios.db")
+    
+    preparar_base_sintetica(ruta, n_insumos=max(5000, insumos_por_servicio), n_servicios=n_servicios,
+                            insumos_por_servicio=insumos_por_servicio, n_alertas=0)
+    diferencias = ServiciosCRUD.verificar_contadores()
+    if diferencias:
+        raise RuntimeError(f"{len(diferencias)} contadores de insumos no coinciden con la receta")
+    Database.close_all_connections()
+    
+    conn = _conectar(ruta)
+    resultados = []
+    for nombre, query_antes, query_despues in CONSULTAS:
+        ms_antes, filas_antes = _medir(conn, query_antes, repeticiones)
+        ms_despues, filas_despues = _medir(conn, query_despues, repeticiones)
+        resultados.append((nombre, ms_antes, ms_despues, filas_antes, filas_despues))
+    
+    conn.close()
+    return resultados
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    por_servicio = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    repeticiones = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    imprimir_resultados(ejecutar_benchmark(n, por_servicio, repeticiones), max(5000, por_servicio),
+                        descripcion=f"{n} servicios x {por_servicio} insumos")
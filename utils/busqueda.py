@@ -0,0 +1,45 @@
+"""
+Búsqueda de texto completo
+Convierte lo que escribe el usuario en una expresión MATCH de FTS5 y
+detecta si la base tiene los índices *_fts (migración 003)
+"""
+
+import re
+
+from utils.db_connection import Database
+
+
+class Busqueda:
+    """Apoyo para las búsquedas de los CRUD con FTS5 y respaldo en LIKE"""
+    
+    _RE_PALABRAS = re.compile(r"\w+", re.UNICODE)
+    
+    # {ruta de la base: {tabla_fts: existe}}
+    _disponibles = {}
+    
+    @staticmethod
+    def expresion(termino):
+        """
+        "plat ver" -> '"plat"* "ver"*': cada palabra como prefijo y todas
+        obligatorias. Retorna None si no hay palabras que buscar.
+        """
+        palabras = Busqueda._RE_PALABRAS.findall(termino or "")
+        if not palabras:
+            return None
+        return " ".join(f'"{p}"*' for p in palabras)
+    
+    @staticmethod
+    def disponible(tabla_fts):
+        """True si la base activa tiene la tabla FTS5 indicada"""
+        ruta = Database.get_db_path()
+        tablas = Busqueda._disponibles.setdefault(ruta, {})
+        if tabla_fts not in tablas:
+            try:
+                resultado = Database.ejecutar_query(
+                    "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?",
+                    (tabla_fts,)
+                )
+                tablas[tabla_fts] = resultado[0][0] > 0
+            except Exception:
+                tablas[tabla_fts] = False
+        return tablas[tabla_fts]
@@ -0,0 +1,146 @@
+"""
+Caché de catálogos en memoria
+Guarda los listados que casi no cambian (categorías, insumos, servicios) y
+los invalida con contadores de versión por tabla que se incrementan después
+del COMMIT de cada escritura hecha con Database
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+from config.db_config import SQLITE_CACHE
+
+
+class CacheCatalogo:
+    """
+    Caché LRU de resultados de consultas, compartida por todo el proceso.
+
+    - Cada entrada declara las tablas de las que depende y guarda la
+      versión que tenían al leerse; si alguna cambió, la entrada ya no sirve
+    - Database.ejecutar_comando y ejecutar_lote llaman a
+      invalidar_por_sentencia() al confirmar la transacción
+    - Una sentencia que no se reconoce (DDL, PRAGMA...) invalida todo
+    - EFECTOS_TRIGGERS: lo que escriben los triggers también se invalida
+    - Se retorna una copia de la lista para que nadie modifique la guardada
+
+    Uso:
+        return CacheCatalogo.obtener("categorias.todas", ("categorias",),
+                                     lambda: Database.ejecutar_query(query))
+    """
+    
+    activa = SQLITE_CACHE['activa']
+    max_entradas = SQLITE_CACHE['max_entradas']
+    
+    _entradas = OrderedDict()
+    _versiones = {}
+    _version_global = 0
+    _candado = threading.Lock()
+    
+    # Estadísticas
+    _aciertos = 0
+    _fallos = 0
+    _desalojos = 0
+    _invalidaciones = 0
+    
+    # Tablas que los triggers de las migraciones escriben al modificar otra
+    EFECTOS_TRIGGERS = {
+        "insumos": ("alerta_estado", "movimientos", "servicio_insumo"),
+        "alerta_estado": ("alerta_contadores", "alerta_pendientes"),
+        "movimientos": ("insumos",),
+        "servicio_insumo": ("servicios",),
+    }
+    
+    _RE_ESCRITURA = re.compile(
+        r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)"
+        r"\s+[\"'`\[]?(\w+)",
+        re.IGNORECASE
+    )
+    
+    @classmethod
+    def _firma(cls, tablas):
+        return (cls._version_global,) + tuple(cls._versiones.get(t, 0) for t in tablas)
+    
+    @classmethod
+    def version(cls, *tablas):
+        """Firma de las versiones de esas tablas: cambia con cada COMMIT que las toque"""
+        with cls._candado:
+            return cls._firma(tablas)
+    
+    @classmethod
+    def obtener(cls, clave, tablas, cargar):
+        """
+        Valor guardado para clave si ninguna de sus tablas cambió desde que
+        se leyó; si no, llama a cargar() y lo guarda. Los errores de cargar()
+        se propagan y no se guarda nada.
+        """
+        if not cls.activa:
+            return cargar()
+        
+        with cls._candado:
+            firma = cls._firma(tablas)
+            entrada = cls._entradas.get(clave)
+            if entrada is not None and entrada[0] == firma:
+                cls._entradas.move_to_end(clave)
+                cls._aciertos += 1
+                return list(entrada[1])
+            cls._fallos += 1
+        
+        valor = cargar()
+        
+        with cls._candado:
+            # Si hubo un COMMIT mientras se leía, el resultado puede ser viejo
+            if cls._firma(tablas) == firma:
+                cls._entradas[clave] = (firma, tuple(valor))
+                cls._entradas.move_to_end(clave)
+                while len(cls._entradas) > cls.max_entradas:
+                    cls._entradas.popitem(last=False)
+                    cls._desalojos += 1
+        return list(valor)
+    
+    @classmethod
+    def invalidar(cls, *tablas):
+        """Invalida las entradas que dependen de esas tablas (sin tablas: todas)"""
+        with cls._candado:
+            cls._invalidaciones += 1
+            if not tablas:
+                cls._version_global += 1
+                cls._entradas.clear()
+                return
+            for tabla in tablas:
+                tabla = tabla.lower()
+                cls._versiones[tabla] = cls._versiones.get(tabla, 0) + 1
+    
+    @classmethod
+    def invalidar_por_sentencia(cls, query):
+        """Invalida la tabla que modifica un INSERT/UPDATE/DELETE"""
+        m = cls._RE_ESCRITURA.match(query)
+        if m:
+            tablas = [m.group(1).lower()]
+            for tabla in tablas:
+                tablas.extend(t for t in cls.EFECTOS_TRIGGERS.get(tabla, ()) if t not in tablas)
+            cls.invalidar(*tablas)
+        else:
+            cls.invalidar()
+    
+    @classmethod
+    def estadisticas(cls):
+        with cls._candado:
+            consultas = cls._aciertos + cls._fallos
+            return {
+                "entradas": len(cls._entradas),
+                "max_entradas": cls.max_entradas,
+                "aciertos": cls._aciertos,
+                "fallos": cls._fallos,
+                "tasa_aciertos": cls._aciertos / consultas if consultas else 0.0,
+                "desalojos": cls._desalojos,
+                "invalidaciones": cls._invalidaciones
+            }
+    
+    @classmethod
+    def reiniciar(cls):
+        """Vacía la caché y sus estadísticas"""
+        with cls._candado:
+            cls._entradas.clear()
+            cls._version_global += 1
+            cls._aciertos = cls._fallos = cls._desalojos = cls._invalidaciones = 0
@@ -0,0 +1,85 @@
+"""
+Capacidad de producción
+Cuántas veces se puede realizar cada servicio con el stock actual y qué
+insumo lo limita, calculado para todos los servicios en una sola pasada
+"""
+
+import math
+import time
+
+from utils.cache import CacheCatalogo
+from utils.consumo import Consumo
+from utils.db_connection import Database
+
+
+class Capacidad:
+    """
+    Carga de una vez la matriz servicio x insumo (servicio_insumo con el
+    stock de cada insumo, ya en piezas normalizadas) y calcula por servicio
+        alcanza = min(piezas en stock / piezas por servicio)
+    con el mismo redondeo que Consumo, así que
+    registrar "alcanza" servicios nunca deja stock negativo.
+
+    El resultado se guarda en CacheCatalogo: cualquier COMMIT sobre
+    insumos, servicio_insumo o movimientos lo invalida.
+
+    Uso:
+        Capacidad.obtener()[id_servicio]  # (alcanza, id_insumo, nombre_insumo)
+    """
+    
+    # Servicio sin receta o con un renglón que no se puede convertir
+    SIN_DATOS = (None, None, None)
+    
+    _ultimo_calculo = None
+    
+    @staticmethod
+    def cargar_matriz():
+        """Renglones (id_servicio, id_insumo, nombre, stock, piezas por servicio, sin_conversion)"""
+        return Database.ejecutar_query("""
+            SELECT si.id_servicio, si.id_insumo, i.nombre, COALESCE(i.piezas, 0),
+                   SUM(si.piezas_normalizadas), COUNT(*) - COUNT(si.piezas_normalizadas)
+            FROM servicio_insumo si
+            JOIN insumos i ON i.id = si.id_insumo
+            GROUP BY si.id_servicio, si.id_insumo
+        """)
+    
+    @classmethod
+    def calcular(cls, filas=None):
+        """
+        {id_servicio: (alcanza, id_insumo_limitante, nombre_limitante)}.
+        Servicios con un renglón sin conversión posible: SIN_DATOS.
+        """
+        inicio = time.perf_counter()
+        filas = cls.cargar_matriz() if filas is None else filas
+        
+        resultado = {}
+        invalidos = set()
+        for id_servicio, id_insumo, nombre, stock, por_servicio, sin_conversion in filas:
+            if id_servicio in invalidos:
+                continue
+            if sin_conversion:
+                invalidos.add(id_servicio)
+                resultado[id_servicio] = cls.SIN_DATOS
+                continue
+            if por_servicio <= Consumo.TOLERANCIA:
+                resultado.setdefault(id_servicio, cls.SIN_DATOS)
+                continue
+            alcanza = max(0, math.floor(stock / por_servicio + Consumo.TOLERANCIA))
+            actual = resultado.get(id_servicio, cls.SIN_DATOS)
+            if actual[0] is None or alcanza < actual[0] or (alcanza == actual[0] and nombre < actual[2]):
+                resultado[id_servicio] = (alcanza, id_insumo, nombre)
+        
+        cls._ultimo_calculo = {"servicios": len(resultado), "renglones": len(filas),
+                               "segundos": time.perf_counter() - inicio}
+        return resultado
+    
+    @classmethod
+    def obtener(cls):
+        """calcular() guardado en caché hasta que cambie el stock o alguna receta"""
+        return dict(CacheCatalogo.obtener("servicios.capacidad",
+                                          ("servicio_insumo", "insumos", "movimientos"),
+                                          lambda: list(cls.calcular().items())))
+    
+    @classmethod
+    def estadisticas(cls):
+        return cls._ultimo_calculo
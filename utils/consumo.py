@@ -0,0 +1,115 @@
+"""
+Consumo de insumos por servicios realizados
+Expande la receta (servicio_insumo) de los servicios realizados, suma lo
+que se usa de cada insumo y lo descuenta como un solo movimiento de
+consumo por insumo, en una sola transacción
+"""
+
+import math
+import time
+from collections import defaultdict
+
+from utils.db_connection import Database
+from utils.movimientos import Movimientos
+
+
+class Consumo:
+    """
+    Cada renglón de la receta se captura en piezas O en contenido
+    (formulario de servicios); servicio_insumo.piezas_normalizadas ya trae
+    las piezas del insumo por servicio (migración 007), así que la demanda
+    es un SUM por insumo. El total por insumo se redondea hacia arriba
+    (una pieza abierta ya no está en stock).
+    
+    Política: nunca se deja stock negativo. Si a algún insumo no le alcanza
+    no se descuenta nada y se regresan los faltantes.
+    
+    Uso:
+        r = Consumo.registrar([(id_esquites, 5), (id_elote, 3)])
+        r["aplicado"], r["faltantes"]
+    """
+    
+    # Tolerancia al redondear hacia arriba (1.0000000001 sigue siendo 1 pieza)
+    TOLERANCIA = 1e-9
+    
+    @staticmethod
+    def agrupar(realizados):
+        """[(id_servicio, veces)] -> {id_servicio: veces} validado"""
+        veces_por_servicio = defaultdict(int)
+        for id_servicio, veces in realizados:
+            if int(veces) != veces or veces <= 0:
+                raise ValueError(f"Cantidad inválida de servicios: {veces}")
+            veces_por_servicio[id_servicio] += int(veces)
+        return dict(veces_por_servicio)
+    
+    @staticmethod
+    def sumar_recetas(veces_por_servicio):
+        """
+        Renglones (id_insumo, nombre, stock, piezas, sin_conversion) con las
+        piezas de cada insumo para esos servicios; sin_conversion cuenta los
+        renglones de receta cuya unidad no se pudo convertir
+        """
+        if not veces_por_servicio:
+            return []
+        valores = ", ".join("(?, ?)" for _ in veces_por_servicio)
+        parametros = tuple(x for par in veces_por_servicio.items() for x in par)
+        return Database.ejecutar_query(f"""
+            WITH realizados(id_servicio, veces) AS (VALUES {valores})
+            SELECT si.id_insumo, i.nombre, COALESCE(i.piezas, 0),
+                   SUM(si.piezas_normalizadas * r.veces),
+                   COUNT(*) - COUNT(si.piezas_normalizadas)
+            FROM realizados r
+            JOIN servicio_insumo si ON si.id_servicio = r.id_servicio
+            JOIN insumos i ON i.id = si.id_insumo
+            GROUP BY si.id_insumo
+        """, parametros)
+    
+    @classmethod
+    def demanda(cls, realizados):
+        """
+        Piezas que se necesitan de cada insumo para esos servicios.
+        Retorna {id_insumo: (nombre, piezas_necesarias, piezas_en_stock)}
+        """
+        filas = cls.sumar_recetas(cls.agrupar(realizados))
+        errores = sorted(nombre for id_insumo, nombre, stock, piezas, sin_conversion in filas if sin_conversion)
+        if errores:
+            raise ValueError("No se puede calcular el consumo de (unidades sin conversión): " + ", ".join(errores))
+        
+        return {
+            id_insumo: (nombre, math.ceil(piezas - cls.TOLERANCIA), stock)
+            for id_insumo, nombre, stock, piezas, sin_conversion in filas
+            if piezas is not None and piezas > cls.TOLERANCIA
+        }
+    
+    @classmethod
+    def registrar(cls, realizados, nota=None):
+        """
+        Descuenta del stock lo que usan los servicios realizados.
+        realizados: [(id_servicio, veces)]
+        Retorna {"aplicado", "insumos", "piezas", "faltantes", "segundos"};
+        faltantes: [(id_insumo, nombre, necesarias, en_stock)]
+        """
+        inicio = time.perf_counter()
+        nota = nota or "Servicios realizados"
+        
+        # La lectura del stock y el descuento van en la misma transacción
+        with Database.transaction():
+            demanda = cls.demanda(realizados)
+            faltantes = sorted(
+                (id_insumo, nombre, necesarias, stock)
+                for id_insumo, (nombre, necesarias, stock) in demanda.items()
+                if necesarias > stock
+            )
+            if not faltantes:
+                Movimientos.registrar_lote([
+                    (id_insumo, "consumo", necesarias, nota)
+                    for id_insumo, (nombre, necesarias, stock) in sorted(demanda.items())
+                ])
+        
+        return {
+            "aplicado": not faltantes,
+            "insumos": len(demanda),
+            "piezas": sum(necesarias for nombre, necesarias, stock in demanda.values()),
+            "faltantes": faltantes,
+            "segundos": time.perf_counter() - inicio
+        }
@@ -0,0 +1,101 @@
+"""
+Generador de bases de datos sintéticas
+Llena una base nueva con un catálogo grande para auditorías y benchmarks
+"""
+
+import os
+import random
+from datetime import date, timedelta
+
+from utils.db_connection import Database
+
+
+PRODUCTOS = [
+    "Plátano", "Limón", "Elote", "Crema", "Queso Cotija", "Mayonesa", "Chamoy",
+    "Tajín", "Cerveza", "Clamato", "Chicharrón", "Sopa Instantánea", "Chile Piquín",
+    "Salsa Valentina", "Mantequilla", "Epazote", "Vaso", "Cuchara", "Servilleta", "Hielo"
+]
+
+UNIDADES = ["kg", "g", "L", "ml", "pza", "gramos", "litro", "pieza"]
+
+
+def preparar_base_sintetica(ruta, n_insumos=50000, n_categorias=30, n_servicios=200,
+                            insumos_por_servicio=10, n_alertas=5000, semilla=2025):
+    """
+    Crea (o reemplaza) una base de datos en ruta y la deja como base activa
+    de Database con un catálogo sintético del tamaño indicado
+    """
+    rnd = random.Random(semilla)
+    
+    Database.close_all_connections()
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+    Database._db_path = ruta
+    Database.initialize()
+    
+    hoy = date.today()
+    
+    # Categorías
+    Database.ejecutar_lote(
+        "INSERT OR IGNORE INTO categorias (nombre) VALUES (?)",
+        [(f"Categoría {i:03d}",) for i in range(1, n_categorias + 1)]
+    )
+    ids_categorias = [r[0] for r in Database.ejecutar_query("SELECT id FROM categorias")]
+    
+    # Insumos
+    filas = []
+    for i in range(1, n_insumos + 1):
+        caducidad = None
+        if rnd.random() < 0.8:
+            caducidad = (hoy + timedelta(days=rnd.randint(-60, 365))).isoformat()
+        filas.append((
+            f"{rnd.choice(PRODUCTOS)} {i:06d}",
+            rnd.choice(ids_categorias),
+            rnd.randint(0, 200),
+            round(rnd.uniform(0.1, 1000), 2),
+            rnd.choice(UNIDADES),
+            caducidad,
+            rnd.randint(0, 50)
+        ))
+    Database.ejecutar_lote(
+        """INSERT INTO insumos (nombre, id_categoria, piezas, contenido_por_pieza,
+           unidad_contenido, fecha_caducidad, alerta_piezas) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        filas
+    )
+    ids_insumos = [r[0] for r in Database.ejecutar_query("SELECT id FROM insumos")]
+    
+    # Servicios y sus recetas
+    Database.ejecutar_lote(
+        "INSERT INTO servicios (nombre) VALUES (?)",
+        [(f"Servicio {i:05d}",) for i in range(1, n_servicios + 1)]
+    )
+    ids_servicios = [r[0] for r in Database.ejecutar_query("SELECT id FROM servicios")]
+    
+    relaciones = []
+    for id_servicio in ids_servicios:
+        for id_insumo in rnd.sample(ids_insumos, min(insumos_por_servicio, len(ids_insumos))):
+            relaciones.append((id_servicio, id_insumo, rnd.randint(1, 5),
+                               round(rnd.uniform(1, 250), 1), rnd.choice(UNIDADES)))
+    Database.ejecutar_lote(
+        """INSERT INTO servicio_insumo (id_servicio, id_insumo, piezas_por_servicio,
+           contenido_por_servicio, unidad_contenido) VALUES (?, ?, ?, ?, ?)""",
+        relaciones
+    )
+    
+    # Historial de alertas
+    tipos = ["stock_bajo", "por_caducar", "caducado"]
+    alertas = []
+    for _ in range(n_alertas):
+        alertas.append((
+            rnd.choice(ids_insumos),
+            rnd.choice(tipos),
+            (hoy - timedelta(days=rnd.randint(0, 400))).isoformat(),
+            "Alerta sintética"
+        ))
+    Database.ejecutar_lote(
+        "INSERT OR IGNORE INTO alertas (id_insumo, tipo, fecha_alerta, mensaje) VALUES (?, ?, ?, ?)",
+        alertas
+    )
+    
+    return ruta
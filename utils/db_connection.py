@@ -4,9 +4,234 @@ Conexión a la base de datos SQLite
 import sqlite3
 import os
 import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from config.db_config import SQLITE_POOL, SQLITE_PRAGMAS
+from utils.cache import CacheCatalogo
+from utils.instrumentacion import Instrumentacion
+from utils.migraciones import Migraciones
+
+
+# Valores numéricos con los que SQLite reporta los PRAGMAs simbólicos
+_VALORES_PRAGMA = {
+    'synchronous': {'OFF': 0, 'NORMAL': 1, 'FULL': 2, 'EXTRA': 3},
+    'temp_store': {'DEFAULT': 0, 'FILE': 1, 'MEMORY': 2},
+    'foreign_keys': {'OFF': 0, 'ON': 1}
+}
+
+
+class PoolConexiones:
+    """
+    Pool acotado de conexiones SQLite.
+
+    Cada hilo toma una conexión propia mientras dura el préstamo; los
+    préstamos anidados del mismo hilo reutilizan la misma conexión, así el
+    estado de los cursores nunca se comparte entre hilos. Las escrituras
+    se serializan con un candado aparte para que varios lectores puedan
+    trabajar al mismo tiempo que un único escritor.
+    """
+    
+    def __init__(self, db_path, max_conexiones=4, timeout=30.0, pragmas=None):
+        self.db_path = db_path
+        self.max_conexiones = max_conexiones
+        self.timeout = timeout
+        self.pragmas = dict(pragmas or {'foreign_keys': 'ON'})
+        
+        self._libres = []
+        self._creadas = 0
+        self._cerrado = False
+        self._condicion = threading.Condition()
+        self._candado_escritura = threading.RLock()
+        self._local = threading.local()
+        
+        # Estadísticas del pool
+        self._prestamos = 0
+        self._esperas = 0
+        self._tiempo_espera = 0.0
+    
+    def _crear_conexion(self):
+        """Abre una conexión nueva con la configuración de la aplicación"""
+        # isolation_level=None: las transacciones se abren de forma explícita
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=self.timeout,
+                               isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        
+        # Perfil de PRAGMAs (journal_mode, synchronous, cachés, claves foráneas...)
+        for nombre, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nombre} = {valor}")
+        return conn
+    
+    def _tomar(self):
+        """Toma una conexión libre, la crea o espera a que se libere una"""
+        with self._condicion:
+            if self._cerrado:
+                raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+            
+            self._prestamos += 1
+            if not self._libres and self._creadas >= self.max_conexiones:
+                self._esperas += 1
+                inicio = time.perf_counter()
+                hay_libre = self._condicion.wait_for(
+                    lambda: self._libres or self._creadas < self.max_conexiones or self._cerrado,
+                    timeout=self.timeout
+                )
+                self._tiempo_espera += time.perf_counter() - inicio
+                if not hay_libre:
+                    raise TimeoutError("No hay conexiones libres en el pool")
+                if self._cerrado:
+                    raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+            
+            if self._libres:
+                return self._libres.pop()
+            self._creadas += 1
+        
+        # La conexión se abre fuera del candado para no bloquear a otros hilos
+        try:
+            return self._crear_conexion()
+        except Exception:
+            with self._condicion:
+                self._creadas -= 1
+                self._condicion.notify()
+            raise
+    
+    def _devolver(self, conn):
+        """Regresa una conexión al pool dejando su transacción cerrada"""
+        if conn.in_transaction:
+            conn.rollback()
+        
+        with self._condicion:
+            if self._cerrado:
+                self._creadas -= 1
+                conn.close()
+            else:
+                self._libres.append(conn)
+            self._condicion.notify()
+    
+    @contextmanager
+    def adquirir(self):
+        """Presta una conexión al hilo actual y la libera al salir del bloque"""
+        local = self._local
+        conn = getattr(local, "conexion", None)
+        
+        # Préstamo anidado: el hilo ya tiene una conexión
+        if conn is not None:
+            local.profundidad += 1
+            try:
+                yield conn
+            finally:
+                local.profundidad -= 1
+            return
+        
+        conn = self._tomar()
+        local.conexion = conn
+        local.profundidad = 1
+        try:
+            yield conn
+        finally:
+            local.conexion = None
+            local.profundidad = 0
+            self._devolver(conn)
+    
+    @contextmanager
+    def escritura(self):
+        """Presta una conexión con acceso exclusivo de escritura"""
+        # Primero la conexión y después el candado: quien espera el candado
+        # nunca retiene la última conexión libre que necesita el escritor
+        with self.adquirir() as conn:
+            with self._candado_escritura:
+                yield conn
+    
+    @contextmanager
+    def transaccion(self):
+        """
+        Abre una transacción de escritura que hace un solo COMMIT al final.
+        Si ya hay una transacción abierta en el hilo se anida con un SAVEPOINT.
+        Cualquier excepción deshace los cambios del bloque y se propaga.
+        """
+        with self.escritura() as conn:
+            local = self._local
+            nivel = getattr(local, "nivel_transaccion", 0)
+            savepoint = f"sp_{nivel}"
+            
+            if nivel == 0:
+                conn.execute("BEGIN IMMEDIATE")
+                local.al_confirmar = []
+            else:
+                conn.execute(f"SAVEPOINT {savepoint}")
+            local.nivel_transaccion = nivel + 1
+            
+            try:
+                yield conn
+            except BaseException:
+                local.nivel_transaccion = nivel
+                if nivel == 0:
+                    local.al_confirmar = []
+                    conn.execute("ROLLBACK")
+                else:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                raise
+            
+            local.nivel_transaccion = nivel
+            if nivel == 0:
+                pendientes, local.al_confirmar = local.al_confirmar, []
+                try:
+                    conn.execute("COMMIT")
+                except Exception:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+                self._ejecutar_pendientes(pendientes)
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+    
+    def al_confirmar(self, funcion):
+        """
+        Ejecuta funcion() cuando la transacción abierta en el hilo haga COMMIT
+        (se descarta si hace ROLLBACK). Fuera de una transacción corre ya.
+        """
+        if getattr(self._local, "nivel_transaccion", 0) > 0:
+            self._local.al_confirmar.append(funcion)
+        else:
+            self._ejecutar_pendientes([funcion])
+    
+    @staticmethod
+    def _ejecutar_pendientes(funciones):
+        for funcion in funciones:
+            try:
+                funcion()
+            except Exception as e:
+                print(f"Error después del COMMIT: {e}")
+    
+    def estadisticas(self):
+        """Retorna las estadísticas de uso del pool"""
+        with self._condicion:
+            libres = len(self._libres)
+            return {
+                "max_conexiones": self.max_conexiones,
+                "creadas": self._creadas,
+                "libres": libres,
+                "en_uso": self._creadas - libres,
+                "prestamos": self._prestamos,
+                "esperas": self._esperas,
+                "tiempo_espera": self._tiempo_espera
+            }
+    
+    def cerrar(self):
+        """Cierra las conexiones libres; las prestadas se cierran al devolverse"""
+        with self._condicion:
+            self._cerrado = True
+            for conn in self._libres:
+                conn.close()
+            self._creadas -= len(self._libres)
+            self._libres = []
+            self._condicion.notify_all()
+
 
 class Database:
-    _connection = None
+    _pool = None
     _db_path = None
     
     @staticmethod
@@ -36,20 +261,25 @@ class Database:
     
     @staticmethod
     def initialize():
-        """Inicializa la conexión a la base de datos"""
+        """Inicializa el pool de conexiones a la base de datos"""
         try:
             db_path = Database.get_db_path()
             
             # Verificar si la base de datos ya existe
             db_existe = os.path.exists(db_path)
             
-            Database._connection = sqlite3.connect(db_path, check_same_thread=False)
-            Database._connection.row_factory = sqlite3.Row
+            Database._pool = PoolConexiones(
+                db_path,
+                max_conexiones=SQLITE_POOL['max_conexiones'],
+                timeout=SQLITE_POOL['timeout'],
+                pragmas=SQLITE_PRAGMAS
+            )
             
-            # Habilitar claves foráneas
-            Database._connection.execute("PRAGMA foreign_keys = ON")
+            # Lo guardado en caché puede ser de otra base
+            CacheCatalogo.invalidar()
             
             print(f"Conexión a base de datos establecida: {db_path}")
+            Database.reportar_pragmas()
             
             # Si la base de datos es nueva, crear tablas
             if not db_existe:
@@ -58,117 +288,249 @@ class Database:
             else:
                 print("Base de datos existente encontrada")
             
+            # Llevar el esquema a la última versión
+            Migraciones.aplicar_pendientes(
+                Database._pool,
+                os.path.join(Database.get_base_path(), 'database', 'migraciones')
+            )
+        
         except Exception as e:
             raise Exception(f"Error al conectar con la base de datos: {e}")
     
     @staticmethod
-    def get_connection():
-        """Obtiene la conexión a la base de datos"""
-        if Database._connection is None:
+    def get_pool():
+        """Obtiene el pool de conexiones, inicializándolo si hace falta"""
+        if Database._pool is None:
             Database.initialize()
-        return Database._connection
+        return Database._pool
     
     @staticmethod
-    def crear_tablas():
-        """Crea las tablas y carga datos iniciales desde schema.sql"""
-        conn = Database.get_connection()
-        cursor = conn.cursor()
-        
-        # Verificar si ya existen tablas
-        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='categorias'")
-        tabla_existe = cursor.fetchone()[0] > 0
-        
-        if tabla_existe:
-            print("✓ Tablas ya existen")
-            return
-        
-        # Buscar archivo schema.sql
-        base_path = Database.get_base_path()
-        schema_path = os.path.join(base_path, 'database', 'schema.sql')
-        
-        print(f"📂 Buscando schema en: {schema_path}")
-        
-        if not os.path.exists(schema_path):
-            print(f"✗ ARCHIVO NO ENCONTRADO: {schema_path}")
-            raise FileNotFoundError(f"No se encontró schema.sql en: {schema_path}")
+    def conexion():
+        """
+        Presta una conexión al hilo actual.
+
+        Uso: ``with Database.conexion() as conn: ...``
+        """
+        return Database.get_pool().adquirir()
+    
+    @staticmethod
+    def conexion_escritura():
+        """Presta una conexión con el candado de escritura tomado"""
+        return Database.get_pool().escritura()
+    
+    @staticmethod
+    def transaction():
+        """
+        Transacción explícita con un único COMMIT; admite anidación (SAVEPOINT).
         
+        Uso: ``with Database.transaction(): ...`` — ejecutar_query y
+        ejecutar_comando dentro del bloque usan la misma conexión.
+        """
+        return Database.get_pool().transaccion()
+    
+    @staticmethod
+    def estadisticas_pool():
+        """Retorna las estadísticas del pool (préstamos, esperas, libres...)"""
+        if Database._pool is None:
+            return {}
+        return Database._pool.estadisticas()
+    
+    @staticmethod
+    def verificar_pragmas():
+        """
+        Compara el perfil de PRAGMAs configurado con el que SQLite aplicó.
+        Retorna {nombre: (esperado, efectivo, aplicado)}
+        """
+        resultado = {}
+        with Database.conexion() as conn:
+            for nombre, esperado in Database.get_pool().pragmas.items():
+                efectivo = conn.execute(f"PRAGMA {nombre}").fetchone()[0]
+                
+                valor = esperado
+                if isinstance(esperado, str):
+                    valor = _VALORES_PRAGMA.get(nombre, {}).get(esperado.upper(), esperado)
+                
+                if isinstance(valor, str):
+                    aplicado = str(efectivo).lower() == valor.lower()
+                else:
+                    aplicado = efectivo == valor
+                resultado[nombre] = (esperado, efectivo, aplicado)
+        return resultado
+    
+    @staticmethod
+    def reportar_pragmas():
+        """Imprime qué ajustes del perfil de PRAGMAs tomaron efecto"""
         try:
-            with open(schema_path, 'r', encoding='utf-8') as f:
-                schema_sql = f.read()
+            for nombre, (esperado, efectivo, aplicado) in Database.verificar_pragmas().items():
+                if aplicado:
+                    print(f"✓ PRAGMA {nombre} = {efectivo}")
+                else:
+                    print(f"✗ PRAGMA {nombre}: se pidió {esperado}, SQLite reporta {efectivo}")
+        except Exception as e:
+            print(f"No se pudieron verificar los PRAGMAs: {e}")
+    
+    @staticmethod
+    def checkpoint_wal(modo="PASSIVE"):
+        """
+        Vuelca el WAL a la base de datos para mantener acotado su tamaño.
+        Retorna (ocupado, paginas_wal, paginas_copiadas)
+        """
+        with Database.conexion() as conn:
+            return tuple(conn.execute(f"PRAGMA wal_checkpoint({modo})").fetchone())
+    
+    @staticmethod
+    def crear_tablas():
+        """Crea las tablas y carga datos iniciales desde schema.sql"""
+        with Database.conexion_escritura() as conn:
+            cursor = conn.cursor()
             
-            print(f"✓ Archivo schema.sql encontrado ({len(schema_sql)} caracteres)")
+            # Verificar si ya existen tablas
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='categorias'")
+            tabla_existe = cursor.fetchone()[0] > 0
             
-            # Ejecutar el script SQL
-            cursor.executescript(schema_sql)
-            conn.commit()
+            if tabla_existe:
+                print("✓ Tablas ya existen")
+                return
             
-            # Verificar que se crearon las tablas
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tablas = cursor.fetchall()
-            print(f"✓ Tablas creadas: {[tabla[0] for tabla in tablas]}")
+            # Buscar archivo schema.sql
+            base_path = Database.get_base_path()
+            schema_path = os.path.join(base_path, 'database', 'schema.sql')
             
-            # Verificar datos de ejemplo en categorías
-            cursor.execute("SELECT COUNT(*) FROM categorias")
-            count = cursor.fetchone()[0]
-            print(f"✓ Categorías insertadas: {count}")
+            print(f"📂 Buscando schema en: {schema_path}")
             
-            # Verificar datos de ejemplo en insumos
-            cursor.execute("SELECT COUNT(*) FROM insumos")
-            count = cursor.fetchone()[0]
-            print(f"✓ Insumos insertados: {count}")
+            if not os.path.exists(schema_path):
+                print(f"✗ ARCHIVO NO ENCONTRADO: {schema_path}")
+                raise FileNotFoundError(f"No se encontró schema.sql en: {schema_path}")
             
-        except Exception as e:
-            print(f"✗ Error al cargar schema.sql: {e}")
-            import traceback
-            traceback.print_exc()
-            raise
+            try:
+                with open(schema_path, 'r', encoding='utf-8') as f:
+                    schema_sql = f.read()
+                
+                print(f"✓ Archivo schema.sql encontrado ({len(schema_sql)} caracteres)")
+                
+                # Ejecutar el script SQL
+                cursor.executescript(schema_sql)
+                conn.commit()
+                
+                # Verificar que se crearon las tablas
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+                tablas = cursor.fetchall()
+                print(f"✓ Tablas creadas: {[tabla[0] for tabla in tablas]}")
+                
+                # Verificar datos de ejemplo en categorías
+                cursor.execute("SELECT COUNT(*) FROM categorias")
+                count = cursor.fetchone()[0]
+                print(f"✓ Categorías insertadas: {count}")
+                
+                # Verificar datos de ejemplo en insumos
+                cursor.execute("SELECT COUNT(*) FROM insumos")
+                count = cursor.fetchone()[0]
+                print(f"✓ Insumos insertados: {count}")
+            
+            except Exception as e:
+                print(f"✗ Error al cargar schema.sql: {e}")
+                import traceback
+                traceback.print_exc()
+                raise
     
     @staticmethod
     def ejecutar_query(query, params=None):
         """Ejecuta una consulta SELECT y retorna los resultados"""
+        inicio = time.perf_counter()
+        filas = None
+        error = None
         try:
-            conn = Database.get_connection()
-            cursor = conn.cursor()
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            return cursor.fetchall()
+            with Database.conexion() as conn:
+                cursor = conn.cursor()
+                
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                
+                resultado = cursor.fetchall()
+                filas = len(resultado)
+                return resultado
         except Exception as e:
+            error = e
             print(f"Error al ejecutar query: {e}")
             print(f"Query: {query}")
             if params:
                 print(f"Params: {params}")
             raise
+        finally:
+            Instrumentacion.registrar(query, params, time.perf_counter() - inicio, filas, error)
     
     @staticmethod
     def ejecutar_comando(query, params=None):
         """Ejecuta un comando INSERT, UPDATE o DELETE"""
+        inicio = time.perf_counter()
+        filas = None
+        error = None
         try:
-            conn = Database.get_connection()
-            cursor = conn.cursor()
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            conn.commit()
-            return cursor.lastrowid
+            # Dentro de Database.transaction() no hace COMMIT propio
+            with Database.transaction() as conn:
+                cursor = conn.cursor()
+                
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                
+                filas = cursor.rowcount
+                # La caché se invalida cuando el cambio ya es visible (COMMIT)
+                Database.get_pool().al_confirmar(lambda: CacheCatalogo.invalidar_por_sentencia(query))
+                return cursor.lastrowid
         except Exception as e:
-            conn.rollback()
+            error = e
             print(f"Error al ejecutar comando: {e}")
             print(f"Query: {query}")
             if params:
                 print(f"Params: {params}")
             raise
+        finally:
+            Instrumentacion.registrar(query, params, time.perf_counter() - inicio, filas, error)
+    
+    @staticmethod
+    def ejecutar_lote(query, filas):
+        """
+        Ejecuta un mismo comando para muchas filas con executemany en una sola
+        transacción. Retorna {"filas", "segundos", "filas_por_segundo"}
+        """
+        filas = list(filas)
+        inicio = time.perf_counter()
+        afectadas = None
+        error = None
+        try:
+            with Database.transaction() as conn:
+                cursor = conn.executemany(query, filas)
+                afectadas = cursor.rowcount
+                Database.get_pool().al_confirmar(lambda: CacheCatalogo.invalidar_por_sentencia(query))
+        except Exception as e:
+            error = e
+            print(f"Error al ejecutar lote: {e}")
+            print(f"Query: {query}")
+            print(f"Filas: {len(filas)}")
+            raise
+        finally:
+            Instrumentacion.registrar(query, f"lote de {len(filas)} filas",
+                                      time.perf_counter() - inicio, afectadas, error)
+        
+        segundos = time.perf_counter() - inicio
+        return {
+            "filas": afectadas,
+            "segundos": segundos,
+            "filas_por_segundo": afectadas / segundos if segundos > 0 else 0.0
+        }
     
     @staticmethod
     def close_all_connections():
-        """Cierra la conexión a la base de datos"""
-        if Database._connection:
-            Database._connection.close()
-            Database._connection = None
-            print("Conexión cerrada")
\ No newline at end of file
+        """Cierra todas las conexiones del pool"""
+        if Database._pool:
+            try:
+                Database.checkpoint_wal("TRUNCATE")
+            except Exception as e:
+                print(f"Error en checkpoint final: {e}")
+            Database._pool.cerrar()
+            Database._pool = None
+            print("Conexiones cerradas")
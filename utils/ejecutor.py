@@ -0,0 +1,156 @@
+"""
+Ejecutor de consultas en segundo plano
+Corre las consultas en un pool de hilos (cada hilo toma su propia conexión
+del pool de Database) y entrega los resultados en el hilo de Tk mediante
+una cola que se revisa con after()
+"""
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from config.db_config import SQLITE_EJECUTOR
+
+
+class TokenCancelacion:
+    """Permite descartar una consulta enviada: si ya corrió, su resultado se ignora"""
+    
+    def __init__(self):
+        self.cancelado = False
+        self.futuro = None
+    
+    def cancelar(self):
+        self.cancelado = True
+        if self.futuro is not None:
+            self.futuro.cancel()
+
+
+class EjecutorConsultas:
+    """
+    submit(consulta, al_terminar) corre consulta() en un hilo de trabajo y
+    llama a al_terminar(resultado) en el hilo de Tk.
+
+    - clave: una consulta nueva con la misma clave cancela la anterior
+      (p. ej. la tabla a la que van los datos); gana siempre la última
+    - indicador: objeto con iniciar()/terminar()/vivo() (IndicadorCarga de
+      ventanas/componentes.py); si su widget ya no existe no se entrega nada
+    - Sin configurar(raiz) la consulta corre en el momento (scripts, pruebas)
+
+    Uso:
+        EjecutorConsultas.submit(InsumosCRUD.obtener_todos, self.cargar_insumos,
+                                 clave=self.tabla, indicador=self.tabla.carga)
+    """
+    
+    hilos = SQLITE_EJECUTOR['hilos']
+    intervalo_ms = SQLITE_EJECUTOR['intervalo_sondeo_ms']
+    
+    _raiz = None
+    _pool = None
+    _resultados = queue.Queue()
+    _claves = {}
+    _en_curso = 0
+    _sondeo = None
+    
+    @classmethod
+    def configurar(cls, raiz):
+        """Indica el widget raíz de Tk cuyo after() entrega los resultados"""
+        cls._raiz = raiz
+        if cls._pool is None:
+            cls._pool = ThreadPoolExecutor(max_workers=cls.hilos, thread_name_prefix="caruma-consulta")
+    
+    @classmethod
+    def submit(cls, consulta, al_terminar, al_error=None, clave=None, indicador=None):
+        """Envía consulta() al pool; retorna su TokenCancelacion"""
+        token = TokenCancelacion()
+        if clave is not None:
+            anterior = cls._claves.get(clave)
+            if anterior is not None:
+                anterior.cancelar()
+            cls._claves[clave] = token
+        
+        if cls._raiz is None or cls._pool is None:
+            cls._entregar(token, clave, indicador, al_terminar, al_error, *cls._correr(token, consulta))
+            return token
+        
+        if indicador is not None:
+            indicador.iniciar()
+        cls._en_curso += 1
+        tarea = (token, clave, indicador, al_terminar, al_error)
+        token.futuro = cls._pool.submit(cls._trabajar, tarea, consulta)
+        # Si se canceló antes de empezar, el hilo nunca pondrá nada en la cola
+        token.futuro.add_done_callback(
+            lambda f: f.cancelled() and cls._resultados.put(tarea + (None, None))
+        )
+        
+        if cls._sondeo is None:
+            cls._sondeo = cls._raiz.after(cls.intervalo_ms, cls._sondear)
+        return token
+    
+    @classmethod
+    def cancelar(cls, clave):
+        """Cancela la consulta pendiente con esa clave, si la hay"""
+        token = cls._claves.pop(clave, None)
+        if token is not None:
+            token.cancelar()
+    
+    @staticmethod
+    def _correr(token, consulta):
+        if token.cancelado:
+            return None, None
+        try:
+            return consulta(), None
+        except Exception as e:
+            return None, e
+    
+    @classmethod
+    def _trabajar(cls, tarea, consulta):
+        """Hilo de trabajo: no toca Tk"""
+        cls._resultados.put(tarea + cls._correr(tarea[0], consulta))
+    
+    @classmethod
+    def _sondear(cls):
+        cls._sondeo = None
+        while True:
+            try:
+                tarea = cls._resultados.get_nowait()
+            except queue.Empty:
+                break
+            cls._en_curso -= 1
+            token, clave, indicador = tarea[:3]
+            if indicador is not None:
+                indicador.terminar()
+            cls._entregar(*tarea)
+        
+        if cls._en_curso > 0 and cls._raiz is not None:
+            cls._sondeo = cls._raiz.after(cls.intervalo_ms, cls._sondear)
+    
+    @classmethod
+    def _entregar(cls, token, clave, indicador, al_terminar, al_error, resultado, error):
+        """Hilo de Tk: llama al callback si la consulta sigue vigente"""
+        if clave is not None and cls._claves.get(clave) is token:
+            del cls._claves[clave]
+        if token.cancelado:
+            return
+        if indicador is not None and not indicador.vivo():
+            return
+        
+        try:
+            if error is not None:
+                if al_error is not None:
+                    al_error(error)
+                else:
+                    print(f"Error en consulta en segundo plano: {error}")
+            else:
+                al_terminar(resultado)
+        except Exception as e:
+            print(f"Error al mostrar resultado de consulta: {e}")
+    
+    @classmethod
+    def cerrar(cls):
+        """Cancela lo pendiente y deja de aceptar consultas (al salir)"""
+        for token in list(cls._claves.values()):
+            token.cancelar()
+        cls._claves.clear()
+        if cls._pool is not None:
+            cls._pool.shutdown(wait=False, cancel_futures=True)
+            cls._pool = None
+        cls._raiz = None
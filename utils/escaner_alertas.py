@@ -0,0 +1,182 @@
+"""
+Escáner de alertas
+Registra en la tabla alertas los umbrales que se cruzaron desde el último
+escaneo. Los triggers de la migración 009 anotan en alerta_pendientes cada
+umbral cruzado (id_insumo, tipo); aquí se leen, se registran en una sola
+transacción y se borran. Solo se registra el tipo anotado: si cambia la
+caducidad de un insumo que ya estaba en stock bajo, no se repite su
+alerta de stock bajo.
+
+También aplica la retención del historial: las alertas más viejas que
+retencion_dias se borran por tandas (una transacción por tanda) para no
+bloquear la base con un solo DELETE enorme.
+"""
+
+import threading
+import time
+from datetime import date, timedelta
+
+from config.db_config import SQLITE_ESCANER_ALERTAS
+from utils.db_connection import Database
+from utils.estado_alertas import EstadoAlertas
+
+
+class EscanerAlertas:
+    """
+    escanear() cuesta proporcional a lo que cambió, no al tamaño del
+    catálogo. La clave única (id_insumo, tipo, fecha_alerta) y el
+    INSERT OR IGNORE hacen que repetir un escaneo el mismo día no duplique.
+
+    Uso (main.py lo programa con after() y EjecutorConsultas):
+        EscanerAlertas.escanear()
+    """
+    
+    lote = SQLITE_ESCANER_ALERTAS['lote']
+    retencion_dias = SQLITE_ESCANER_ALERTAS['retencion_dias']
+    lote_purga = SQLITE_ESCANER_ALERTAS['lote_purga']
+    
+    _candado = threading.Lock()
+    
+    # Métricas
+    _escaneos = 0
+    _registradas = 0
+    _revisadas = 0
+    _tiempo_total = 0.0
+    _tiempo_max = 0.0
+    _ultimo = None
+    _purgadas = 0
+    _dia_retencion = None
+    
+    @staticmethod
+    def mensaje(tipo, piezas, alerta_piezas, fecha):
+        if tipo == "stock_bajo":
+            return f"Stock bajo: {piezas} de {alerta_piezas} piezas"
+        if tipo == "por_caducar":
+            return f"Caduca el {fecha}"
+        return f"Caducó el {fecha}"
+    
+    @classmethod
+    def escanear(cls, hoy=None):
+        """
+        Registra las alertas pendientes (hasta lote umbrales por llamada).
+        Una vez al día aplica también la retención del historial.
+        Retorna {"revisadas", "registradas", "pendientes", "purgadas", "segundos"}.
+        """
+        hoy = hoy or date.today()
+        inicio = time.perf_counter()
+        
+        # Pasar de día también anota pendientes (caducidades nuevas)
+        EstadoAlertas.rolar_dia(hoy)
+        
+        registradas = 0
+        with Database.transaction():
+            filas = Database.ejecutar_query("""
+                SELECT p.id_insumo, p.tipo, e.stock_bajo, e.caducidad,
+                       i.piezas, i.alerta_piezas, i.fecha_caducidad
+                FROM alerta_pendientes p
+                LEFT JOIN alerta_estado e ON e.id_insumo = p.id_insumo
+                LEFT JOIN insumos i ON i.id = p.id_insumo
+                ORDER BY p.id_insumo, p.tipo
+                LIMIT ?
+            """, (cls.lote,))
+            
+            nuevas = []
+            for id_insumo, tipo, stock_bajo, caducidad, piezas, alerta_piezas, fecha in filas:
+                # Sin estado: el insumo se borró después de anotarse
+                if stock_bajo is None:
+                    continue
+                # El umbral ya no aplica (se repuso o se corrigió antes del escaneo)
+                vigente = stock_bajo if tipo == "stock_bajo" else caducidad == tipo
+                if vigente:
+                    nuevas.append((id_insumo, tipo, cls.mensaje(tipo, piezas, alerta_piezas, fecha),
+                                   hoy.isoformat()))
+            
+            if nuevas:
+                registradas = Database.ejecutar_lote(
+                    "INSERT OR IGNORE INTO alertas (id_insumo, tipo, mensaje, fecha_alerta) VALUES (?, ?, ?, ?)",
+                    nuevas
+                )["filas"]
+            if filas:
+                Database.ejecutar_comando("DELETE FROM alerta_pendientes WHERE (id_insumo, tipo) <= (?, ?)",
+                                          (filas[-1][0], filas[-1][1]))
+            pendientes = Database.ejecutar_query("SELECT COUNT(*) FROM alerta_pendientes")[0][0]
+        
+        purgadas = 0
+        if cls.retencion_dias and cls._dia_retencion != hoy:
+            purgadas = cls.purgar(hoy - timedelta(days=cls.retencion_dias))
+            cls._dia_retencion = hoy
+        
+        segundos = time.perf_counter() - inicio
+        resultado = {
+            "revisadas": len(filas),
+            "registradas": registradas,
+            "pendientes": pendientes,
+            "purgadas": purgadas,
+            "segundos": segundos
+        }
+        with cls._candado:
+            cls._escaneos += 1
+            cls._registradas += registradas
+            cls._revisadas += len(filas)
+            cls._tiempo_total += segundos
+            cls._tiempo_max = max(cls._tiempo_max, segundos)
+            cls._ultimo = resultado
+        
+        if registradas:
+            print(f"✓ Escáner de alertas: {registradas} alertas nuevas ({len(filas)} umbrales revisados)")
+        return resultado
+    
+    @classmethod
+    def purgar(cls, antes_de=None, lote=None):
+        """
+        Borra del historial las alertas con fecha anterior a antes_de (todas
+        si es None), de lote en lote y con un commit por tanda: entre tandas
+        otras escrituras pueden tomar la base. Retorna cuántas borró.
+        """
+        lote = lote or cls.lote_purga
+        if antes_de is None:
+            condicion, params = "", ()
+        else:
+            condicion, params = "WHERE fecha_alerta < ?", (antes_de.isoformat(),)
+        
+        total = 0
+        while True:
+            with Database.transaction():
+                Database.ejecutar_comando(f"""
+                    DELETE FROM alertas WHERE id IN (
+                        SELECT id FROM alertas {condicion}
+                        ORDER BY fecha_alerta, id
+                        LIMIT ?
+                    )
+                """, params + (lote,))
+                borradas = Database.ejecutar_query("SELECT changes()")[0][0]
+            total += borradas
+            if borradas < lote:
+                break
+        
+        with cls._candado:
+            cls._purgadas += total
+        if total:
+            print(f"✓ Historial de alertas: {total} alertas purgadas")
+        return total
+    
+    @classmethod
+    def estadisticas(cls):
+        with cls._candado:
+            return {
+                "escaneos": cls._escaneos,
+                "registradas": cls._registradas,
+                "revisadas": cls._revisadas,
+                "promedio_ms": cls._tiempo_total / cls._escaneos * 1000 if cls._escaneos else 0.0,
+                "max_ms": cls._tiempo_max * 1000,
+                "purgadas": cls._purgadas,
+                "ultimo": cls._ultimo
+            }
+    
+    @classmethod
+    def reiniciar(cls):
+        with cls._candado:
+            cls._escaneos = cls._registradas = cls._revisadas = 0
+            cls._tiempo_total = cls._tiempo_max = 0.0
+            cls._ultimo = None
+            cls._purgadas = 0
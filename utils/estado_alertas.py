@@ -0,0 +1,99 @@
+"""
+Estado de alertas materializado (migración 004)
+Los triggers de insumos mantienen alerta_estado y alerta_contadores; aquí
+se leen los contadores y se hace el cambio de día de la caducidad
+"""
+
+from datetime import date, timedelta
+
+from utils.db_connection import Database
+
+
+class EstadoAlertas:
+    """
+    Las tarjetas de resumen leen una sola fila (alerta_contadores, id = 1)
+    en lugar de contar sobre todo insumos.
+
+    La clasificación de caducidad depende del día: rolar_dia() mueve
+    fecha_corte a hoy y reclasifica solo los insumos cuya fecha cae entre
+    el corte anterior y el nuevo (más los días de aviso). obtener_contadores()
+    lo hace solo si el corte quedó atrás, así que nunca se leen contadores
+    de otro día.
+    """
+    
+    # Clasificación de caducidad de i.fecha_caducidad contra el corte k
+    SQL_CADUCIDAD = """
+        CASE WHEN i.fecha_caducidad IS NULL THEN 'ok'
+             WHEN i.fecha_caducidad < k.fecha_corte THEN 'caducado'
+             WHEN i.fecha_caducidad <= date(k.fecha_corte, '+' || k.dias_por_caducar || ' days') THEN 'por_caducar'
+             ELSE 'ok' END
+    """
+    
+    @staticmethod
+    def rolar_dia(hoy=None):
+        """Lleva la clasificación de caducidad al día; retorna cuántos insumos cambiaron"""
+        hoy = (hoy or date.today()).isoformat()
+        
+        with Database.transaction():
+            fila = Database.ejecutar_query(
+                "SELECT fecha_corte, dias_por_caducar FROM alerta_contadores WHERE id = 1"
+            )
+            if not fila or fila[0]['fecha_corte'] == hoy:
+                return 0
+            
+            anterior, dias = fila[0]['fecha_corte'], fila[0]['dias_por_caducar']
+            desde = min(anterior, hoy)
+            hasta = (date.fromisoformat(max(anterior, hoy)) + timedelta(days=dias)).isoformat()
+            
+            Database.ejecutar_comando("UPDATE alerta_contadores SET fecha_corte = ? WHERE id = 1", (hoy,))
+            
+            # Fuera de [desde, hasta] la clasificación es la misma con ambos cortes
+            nueva = f"""(SELECT {EstadoAlertas.SQL_CADUCIDAD}
+                         FROM insumos i, alerta_contadores k
+                         WHERE i.id = alerta_estado.id_insumo AND k.id = 1)"""
+            Database.ejecutar_comando(f"""
+                UPDATE alerta_estado SET caducidad = {nueva}
+                WHERE id_insumo IN (SELECT id FROM insumos
+                                    WHERE fecha_caducidad >= ? AND fecha_caducidad <= ?)
+                AND caducidad <> {nueva}
+            """, (desde, hasta))
+            cambios = Database.ejecutar_query("SELECT changes()")[0][0]
+        
+        print(f"✓ Alertas al día {hoy}: {cambios} insumos reclasificados")
+        return cambios
+    
+    @staticmethod
+    def obtener_contadores(hoy=None):
+        """Fila de alerta_contadores (total_insumos, total_piezas, stock_bajo, por_caducar, caducados)"""
+        hoy = hoy or date.today()
+        query = """
+            SELECT total_insumos, total_piezas, stock_bajo, por_caducar, caducados, fecha_corte
+            FROM alerta_contadores WHERE id = 1
+        """
+        fila = Database.ejecutar_query(query)
+        if fila and fila[0]['fecha_corte'] != hoy.isoformat():
+            EstadoAlertas.rolar_dia(hoy)
+            fila = Database.ejecutar_query(query)
+        return fila[0] if fila else None
+    
+    @staticmethod
+    def verificar(hoy=None):
+        """
+        Compara los contadores con un conteo completo sobre insumos.
+        Retorna {columna: (guardado, real)} con las diferencias (vacío = correcto).
+        """
+        guardado = EstadoAlertas.obtener_contadores(hoy)
+        real = Database.ejecutar_query(f"""
+            SELECT COUNT(*) AS total_insumos,
+                   COALESCE(SUM(i.piezas), 0) AS total_piezas,
+                   COALESCE(SUM(i.alerta_piezas > 0 AND i.piezas <= i.alerta_piezas), 0) AS stock_bajo,
+                   COALESCE(SUM({EstadoAlertas.SQL_CADUCIDAD} = 'por_caducar'), 0) AS por_caducar,
+                   COALESCE(SUM({EstadoAlertas.SQL_CADUCIDAD} = 'caducado'), 0) AS caducados
+            FROM insumos i, alerta_contadores k
+            WHERE k.id = 1
+        """)[0]
+        return {
+            columna: (guardado[columna], real[columna])
+            for columna in real.keys()
+            if guardado[columna] != real[columna]
+        }
@@ -0,0 +1,171 @@
+"""
+Instrumentación de consultas SQL
+Mide cada llamada a Database, acumula estadísticas por consulta y
+escribe un log rotativo con las consultas lentas
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from logging.handlers import RotatingFileHandler
+
+from config.db_config import SQLITE_INSTRUMENTACION
+
+
+class Instrumentacion:
+    """Punto único de medición para ejecutar_query, ejecutar_comando y ejecutar_lote"""
+    
+    activa = SQLITE_INSTRUMENTACION['activa']
+    umbral_lenta_ms = SQLITE_INSTRUMENTACION['umbral_lenta_ms']
+    
+    _hooks = []
+    _estadisticas = OrderedDict()
+    _candado = threading.Lock()
+    _logger = None
+    
+    # Archivos cuyos marcos se ignoran al buscar quién hizo la consulta
+    _ARCHIVOS_INTERNOS = ("db_connection.py", "instrumentacion.py")
+    
+    _RE_CADENAS = re.compile(r"'(?:[^']|'')*'")
+    _RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+    _RE_ESPACIOS = re.compile(r"\s+")
+    
+    @staticmethod
+    def huella(query):
+        """Normaliza una consulta: sin literales ni espacios repetidos"""
+        texto = Instrumentacion._RE_CADENAS.sub("?", query)
+        texto = Instrumentacion._RE_NUMEROS.sub("?", texto)
+        return Instrumentacion._RE_ESPACIOS.sub(" ", texto).strip()
+    
+    @staticmethod
+    def origen():
+        """Identifica el método (de preferencia un *CRUD) que lanzó la consulta"""
+        marco = sys._getframe(1)
+        primero = None
+        while marco is not None:
+            codigo = marco.f_code
+            if not codigo.co_filename.endswith(Instrumentacion._ARCHIVOS_INTERNOS):
+                # Una lambda dentro del método cuenta como el método
+                nombre = getattr(codigo, "co_qualname", codigo.co_name).split(".<locals>")[0]
+                if "CRUD." in nombre:
+                    return nombre
+                if primero is None:
+                    primero = f"{os.path.basename(codigo.co_filename)}:{nombre}"
+            marco = marco.f_back
+        return primero or "desconocido"
+    
+    @classmethod
+    def agregar_hook(cls, funcion):
+        """Registra funcion(registro) para que reciba cada consulta medida"""
+        if funcion not in cls._hooks:
+            cls._hooks.append(funcion)
+    
+    @classmethod
+    def quitar_hook(cls, funcion):
+        if funcion in cls._hooks:
+            cls._hooks.remove(funcion)
+    
+    @classmethod
+    def registrar(cls, query, params, segundos, filas, error=None):
+        """Registra una consulta ya ejecutada"""
+        if not cls.activa:
+            return
+        
+        registro = {
+            "huella": cls.huella(query),
+            "query": query,
+            "params": params,
+            "ms": segundos * 1000,
+            "filas": filas,
+            "origen": cls.origen(),
+            "error": str(error) if error else None
+        }
+        
+        cls._acumular(registro)
+        
+        if registro["ms"] >= cls.umbral_lenta_ms:
+            cls._log_consulta_lenta(registro)
+        
+        for hook in list(cls._hooks):
+            try:
+                hook(registro)
+            except Exception as e:
+                print(f"Error en hook de instrumentación: {e}")
+    
+    @classmethod
+    def _acumular(cls, registro):
+        """Suma la consulta a las estadísticas de su huella"""
+        with cls._candado:
+            est = cls._estadisticas.pop(registro["huella"], None)
+            if est is None:
+                est = {"huella": registro["huella"], "origen": registro["origen"],
+                       "llamadas": 0, "total_ms": 0.0, "max_ms": 0.0, "filas": 0, "errores": 0}
+            
+            est["llamadas"] += 1
+            est["total_ms"] += registro["ms"]
+            est["max_ms"] = max(est["max_ms"], registro["ms"])
+            est["filas"] += registro["filas"] or 0
+            if registro["error"]:
+                est["errores"] += 1
+            
+            # La huella usada más recientemente queda al final
+            cls._estadisticas[registro["huella"]] = est
+            while len(cls._estadisticas) > SQLITE_INSTRUMENTACION['max_huellas']:
+                cls._estadisticas.popitem(last=False)
+    
+    @classmethod
+    def _obtener_logger(cls):
+        """Crea el log rotativo de consultas lentas la primera vez que se usa"""
+        if cls._logger is None:
+            from utils.db_connection import Database
+            
+            ruta = os.path.join(Database.get_base_path(), SQLITE_INSTRUMENTACION['archivo_log'])
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            
+            handler = RotatingFileHandler(
+                ruta,
+                maxBytes=SQLITE_INSTRUMENTACION['max_bytes_log'],
+                backupCount=SQLITE_INSTRUMENTACION['respaldos_log'],
+                encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            
+            logger = logging.getLogger("caruma.consultas_lentas")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            cls._logger = logger
+        return cls._logger
+    
+    @classmethod
+    def _log_consulta_lenta(cls, registro):
+        try:
+            cls._obtener_logger().info(
+                "%.1f ms | %s filas | %s | %s | params=%r%s",
+                registro["ms"], registro["filas"], registro["origen"],
+                registro["huella"], registro["params"],
+                f" | error={registro['error']}" if registro["error"] else ""
+            )
+        except Exception as e:
+            print(f"No se pudo escribir el log de consultas lentas: {e}")
+    
+    @classmethod
+    def top_consultas(cls, limite=20):
+        """Consultas con mayor tiempo total acumulado"""
+        with cls._candado:
+            estadisticas = [dict(e) for e in cls._estadisticas.values()]
+        
+        for e in estadisticas:
+            e["promedio_ms"] = e["total_ms"] / e["llamadas"]
+        
+        estadisticas.sort(key=lambda e: e["total_ms"], reverse=True)
+        return estadisticas[:limite]
+    
+    @classmethod
+    def reiniciar(cls):
+        """Borra las estadísticas acumuladas"""
+        with cls._candado:
+            cls._estadisticas.clear()
@@ -0,0 +1,137 @@
+"""
+Migraciones del esquema SQLite
+Aplica en orden los archivos database/migraciones/NNN_nombre.sql|.py que
+todavía no estén registrados en la tabla schema_version
+"""
+
+import importlib.util
+import os
+import re
+import sqlite3
+
+
+class Migraciones:
+    """
+    Versión del esquema = PRAGMA user_version (lectura inmediata, sin
+    consultar tablas). schema_version guarda además el historial de cada
+    migración aplicada.
+
+    - schema.sql es la versión 1 (esquema base)
+    - Cada migración corre en su propia transacción junto con el cambio
+      de versión: o se aplica completa o no se aplica
+    - Las migraciones .py exponen aplicar(conn) y no deben hacer COMMIT
+    """
+    
+    VERSION_BASE = 1
+    
+    _RE_ARCHIVO = re.compile(r"^(\d{3})_(\w+)\.(sql|py)$")
+    
+    @staticmethod
+    def descubrir(directorio):
+        """Retorna [(version, nombre, ruta)] ordenado por versión"""
+        if not os.path.isdir(directorio):
+            return []
+        
+        migraciones = []
+        versiones = set()
+        for archivo in os.listdir(directorio):
+            m = Migraciones._RE_ARCHIVO.match(archivo)
+            if not m:
+                continue
+            version = int(m.group(1))
+            if version <= Migraciones.VERSION_BASE:
+                raise ValueError(f"La migración {archivo} usa una versión reservada")
+            if version in versiones:
+                raise ValueError(f"Versión de migración repetida: {version:03d}")
+            versiones.add(version)
+            migraciones.append((version, m.group(2), os.path.join(directorio, archivo)))
+        
+        migraciones.sort()
+        return migraciones
+    
+    @staticmethod
+    def version_actual(conn):
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    @staticmethod
+    def dividir_sentencias(script):
+        """Separa un script SQL en sentencias completas (respeta BEGIN...END de triggers)"""
+        sentencias = []
+        actual = ""
+        for linea in script.splitlines(keepends=True):
+            if not actual and linea.strip().startswith("--"):
+                continue
+            actual += linea
+            if sqlite3.complete_statement(actual):
+                if actual.strip():
+                    sentencias.append(actual.strip())
+                actual = ""
+        if actual.strip():
+            raise ValueError(f"Sentencia SQL incompleta al final del script: {actual.strip()[:80]}")
+        return sentencias
+    
+    @staticmethod
+    def aplicar_pendientes(pool, directorio):
+        """
+        Lleva la base a la última versión. Retorna cuántas migraciones aplicó.
+        Si ya está al día solo cuesta un PRAGMA y un listado del directorio.
+        """
+        migraciones = Migraciones.descubrir(directorio)
+        objetivo = migraciones[-1][0] if migraciones else Migraciones.VERSION_BASE
+        
+        with pool.adquirir() as conn:
+            if Migraciones.version_actual(conn) >= objetivo:
+                return 0
+        
+        Migraciones._preparar_registro(pool)
+        
+        aplicadas = 0
+        for version, nombre, ruta in migraciones:
+            with pool.transaccion() as conn:
+                # Se vuelve a leer dentro de la transacción por si otro
+                # proceso aplicó la migración mientras tanto
+                if Migraciones.version_actual(conn) >= version:
+                    continue
+                
+                print(f"Aplicando migración {version:03d}_{nombre}...")
+                if ruta.endswith(".py"):
+                    Migraciones._ejecutar_python(conn, ruta)
+                else:
+                    with open(ruta, "r", encoding="utf-8") as f:
+                        for sentencia in Migraciones.dividir_sentencias(f.read()):
+                            conn.execute(sentencia)
+                
+                conn.execute("INSERT INTO schema_version (version, nombre) VALUES (?, ?)",
+                             (version, nombre))
+                conn.execute(f"PRAGMA user_version = {version}")
+            aplicadas += 1
+            print(f"✓ Migración {version:03d}_{nombre} aplicada")
+        
+        return aplicadas
+    
+    @staticmethod
+    def _preparar_registro(pool):
+        """Crea schema_version y marca como versión 1 una base creada con schema.sql"""
+        with pool.transaccion() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    nombre TEXT NOT NULL,
+                    aplicada_en TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            if Migraciones.version_actual(conn) == 0:
+                conn.execute("INSERT OR IGNORE INTO schema_version (version, nombre) VALUES (?, ?)",
+                             (Migraciones.VERSION_BASE, "schema_base"))
+                conn.execute(f"PRAGMA user_version = {Migraciones.VERSION_BASE}")
+                print(f"✓ Esquema base registrado como versión {Migraciones.VERSION_BASE}")
+    
+    @staticmethod
+    def _ejecutar_python(conn, ruta):
+        spec = importlib.util.spec_from_file_location(
+            f"migracion_{os.path.splitext(os.path.basename(ruta))[0]}", ruta
+        )
+        modulo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(modulo)
+        modulo.aplicar(conn)
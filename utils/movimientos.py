@@ -0,0 +1,208 @@
+"""
+Libro de movimientos de stock (migración 006)
+Cada entrega, consumo, ajuste o merma se agrega a movimientos y un trigger
+lleva el nuevo stock a insumos.piezas en la misma sentencia; registrar un
+lote es un solo executemany en una sola transacción.
+"""
+
+import threading
+import time
+from datetime import date
+
+from config.db_config import SQLITE_MOVIMIENTOS
+from utils.db_connection import Database
+
+
+class Movimientos:
+    """
+    - entrega suma, ajuste fija el stock (conteo físico), consumo y merma
+      restan sin bajar de 0; se guarda el cambio que realmente se aplicó
+    - Los pedidos que no cambian el stock no se anotan
+    - compactar() suma por insumo y mes los movimientos de hace más de
+      meses_vivos meses (movimientos_mes) y los borra por tandas; resumen()
+      combina ambas tablas
+
+    Uso:
+        Movimientos.registrar(id_insumo, "entrega", 24, "Compra semanal")
+        Movimientos.registrar_lote([(id_insumo, "consumo", 3), ...])
+    """
+    
+    TIPOS = ("entrega", "consumo", "ajuste", "merma")
+    
+    meses_vivos = SQLITE_MOVIMIENTOS['meses_vivos']
+    lote_compactar = SQLITE_MOVIMIENTOS['lote_compactar']
+    
+    # nuevo: stock que deja el movimiento a partir de las piezas actuales
+    SQL_REGISTRAR = """
+        INSERT INTO movimientos (id_insumo, tipo, cantidad, piezas_resultantes, nota)
+        SELECT id, :tipo, nuevo - actual, nuevo, :nota
+        FROM (
+            SELECT id, COALESCE(piezas, 0) AS actual,
+                   CASE :tipo WHEN 'entrega' THEN COALESCE(piezas, 0) + :cantidad
+                              WHEN 'ajuste' THEN :cantidad
+                              ELSE MAX(0, COALESCE(piezas, 0) - :cantidad) END AS nuevo
+            FROM insumos WHERE id = :id_insumo
+        )
+        WHERE nuevo <> actual
+    """
+    
+    _candado = threading.Lock()
+    
+    # Métricas de compactación
+    _compactadas = 0
+    _ultima_compactacion = None
+    
+    @classmethod
+    def _fila(cls, id_insumo, tipo, cantidad, nota=None):
+        if tipo not in cls.TIPOS:
+            raise ValueError(f"Tipo de movimiento desconocido: {tipo}")
+        if cantidad < 0:
+            raise ValueError("La cantidad de un movimiento no puede ser negativa")
+        return {"id_insumo": id_insumo, "tipo": tipo, "cantidad": cantidad, "nota": nota}
+    
+    @classmethod
+    def registrar(cls, id_insumo, tipo, cantidad, nota=None):
+        """Anota un movimiento y aplica el stock; retorna las piezas que quedaron"""
+        with Database.transaction():
+            Database.ejecutar_comando(cls.SQL_REGISTRAR, cls._fila(id_insumo, tipo, cantidad, nota))
+            fila = Database.ejecutar_query("SELECT piezas FROM insumos WHERE id = ?", (id_insumo,))
+        if not fila:
+            raise ValueError(f"No existe el insumo {id_insumo}")
+        return fila[0][0]
+    
+    @classmethod
+    def registrar_lote(cls, movimientos):
+        """
+        Anota muchos movimientos en una sola transacción, en el orden dado.
+        movimientos: lista de tuplas (id_insumo, tipo, cantidad[, nota])
+        Retorna {"filas", "segundos", "filas_por_segundo"} de Database.ejecutar_lote
+        """
+        filas = [cls._fila(*m) for m in movimientos]
+        return Database.ejecutar_lote(cls.SQL_REGISTRAR, filas)
+    
+    @staticmethod
+    def historial(id_insumo, limite=50, despues=None):
+        """Movimientos de un insumo del más nuevo al más viejo; despues: id del último ya mostrado"""
+        condicion, params = "", (id_insumo,)
+        if despues is not None:
+            condicion, params = "AND id < ?", (id_insumo, despues)
+        return Database.ejecutar_query(f"""
+            SELECT id, fecha, tipo, cantidad, piezas_resultantes, nota
+            FROM movimientos
+            WHERE id_insumo = ? {condicion}
+            ORDER BY id DESC
+            LIMIT ?
+        """, params + (limite,))
+    
+    @staticmethod
+    def resumen(desde=None):
+        """
+        Totales por insumo desde una fecha (todo si es None):
+        [(id_insumo, entregas, consumos, ajustes, mermas, movimientos)].
+        Los meses compactados cuentan completos si su mes es >= al de desde.
+        """
+        desde = desde.isoformat() if desde else ""
+        return Database.ejecutar_query("""
+            SELECT id_insumo, SUM(entregas), SUM(consumos), SUM(ajustes), SUM(mermas), SUM(movimientos)
+            FROM (
+                SELECT id_insumo, entregas, consumos, ajustes, mermas, movimientos
+                FROM movimientos_mes
+                WHERE mes >= substr(?, 1, 7)
+                UNION ALL
+                SELECT id_insumo,
+                       SUM(CASE WHEN tipo = 'entrega' THEN cantidad ELSE 0 END),
+                       SUM(CASE WHEN tipo = 'consumo' THEN -cantidad ELSE 0 END),
+                       SUM(CASE WHEN tipo = 'ajuste' THEN cantidad ELSE 0 END),
+                       SUM(CASE WHEN tipo = 'merma' THEN -cantidad ELSE 0 END),
+                       COUNT(*)
+                FROM movimientos
+                WHERE fecha >= ?
+                GROUP BY id_insumo
+            )
+            GROUP BY id_insumo
+        """, (desde, desde))
+    
+    @classmethod
+    def compactar(cls, hoy=None, lote=None):
+        """
+        Pasa a movimientos_mes los movimientos anteriores al primer día de
+        hace meses_vivos meses, de lote en lote (un commit por tanda).
+        Retorna cuántos movimientos compactó.
+        """
+        hoy = hoy or date.today()
+        lote = lote or cls.lote_compactar
+        mes = hoy.year * 12 + hoy.month - 1 - cls.meses_vivos
+        corte = date(mes // 12, mes % 12 + 1, 1).isoformat()
+        
+        total = 0
+        while True:
+            with Database.transaction():
+                hasta = Database.ejecutar_query("""
+                    SELECT MAX(id) FROM (
+                        SELECT id FROM movimientos WHERE fecha < ? ORDER BY fecha, id LIMIT ?
+                    )
+                """, (corte, lote))[0][0]
+                if hasta is None:
+                    break
+                # Con MAX(id), SQLite toma piezas_resultantes de esa misma fila (cierre del mes)
+                Database.ejecutar_comando("""
+                    INSERT INTO movimientos_mes (id_insumo, mes, entregas, consumos, ajustes, mermas,
+                                                 movimientos, piezas_cierre)
+                    SELECT id_insumo, mes, entregas, consumos, ajustes, mermas, movimientos, piezas_resultantes
+                    FROM (
+                        SELECT id_insumo, substr(fecha, 1, 7) AS mes,
+                               SUM(CASE WHEN tipo = 'entrega' THEN cantidad ELSE 0 END) AS entregas,
+                               SUM(CASE WHEN tipo = 'consumo' THEN -cantidad ELSE 0 END) AS consumos,
+                               SUM(CASE WHEN tipo = 'ajuste' THEN cantidad ELSE 0 END) AS ajustes,
+                               SUM(CASE WHEN tipo = 'merma' THEN -cantidad ELSE 0 END) AS mermas,
+                               COUNT(*) AS movimientos, MAX(id), piezas_resultantes
+                        FROM movimientos
+                        WHERE fecha < ? AND id <= ?
+                        GROUP BY id_insumo, mes
+                    )
+                    WHERE true
+                    ON CONFLICT (id_insumo, mes) DO UPDATE SET
+                        entregas = entregas + excluded.entregas,
+                        consumos = consumos + excluded.consumos,
+                        ajustes = ajustes + excluded.ajustes,
+                        mermas = mermas + excluded.mermas,
+                        movimientos = movimientos + excluded.movimientos,
+                        piezas_cierre = excluded.piezas_cierre
+                """, (corte, hasta))
+                Database.ejecutar_comando("DELETE FROM movimientos WHERE fecha < ? AND id <= ?", (corte, hasta))
+                compactadas = Database.ejecutar_query("SELECT changes()")[0][0]
+            total += compactadas
+            if compactadas < lote:
+                break
+        
+        with cls._candado:
+            cls._compactadas += total
+            cls._ultima_compactacion = time.strftime("%Y-%m-%d %H:%M:%S")
+        if total:
+            print(f"✓ Movimientos: {total} compactados en movimientos_mes (antes de {corte})")
+        return total
+    
+    @staticmethod
+    def verificar():
+        """
+        Insumos cuyo stock no coincide con el último movimiento del libro.
+        Retorna [(id_insumo, piezas, piezas_libro)] (vacío = correcto).
+        """
+        return Database.ejecutar_query("""
+            SELECT i.id, COALESCE(i.piezas, 0),
+                   COALESCE((SELECT m.piezas_resultantes FROM movimientos m
+                             WHERE m.id_insumo = i.id ORDER BY m.id DESC LIMIT 1),
+                            (SELECT mm.piezas_cierre FROM movimientos_mes mm
+                             WHERE mm.id_insumo = i.id ORDER BY mm.mes DESC LIMIT 1),
+                            0) AS piezas_libro
+            FROM insumos i
+            WHERE COALESCE(i.piezas, 0) <> piezas_libro
+        """)
+    
+    @classmethod
+    def estadisticas(cls):
+        with cls._candado:
+            return {
+                "compactadas": cls._compactadas,
+                "ultima_compactacion": cls._ultima_compactacion
+            }
@@ -0,0 +1,134 @@
+"""
+Planeación de eventos
+Con una lista de reservas (servicio, cantidad, fecha) calcula la demanda
+de insumos de todos los eventos en una sola pasada, simula el stock fecha
+por fecha (lo que caduca antes del evento ya no sirve) y arma la lista de
+compras consolidada
+"""
+
+import math
+import time
+from collections import defaultdict
+from datetime import date, datetime
+
+from utils.consumo import Consumo
+from utils.db_connection import Database
+
+
+class PlaneacionEventos:
+    """
+    - Una sola consulta trae las recetas de todos los servicios reservados
+      con el stock y la caducidad de sus insumos
+    - Los eventos se recorren por fecha; el stock de un insumo sirve para
+      un evento si no caduca antes de esa fecha (fecha_caducidad >= fecha)
+    - Lo que falta en una fecha se compra para esa fecha: no sobra para
+      los eventos siguientes
+    - La demanda de cada insumo se redondea hacia arriba por fecha, igual
+      que Consumo al registrar
+
+    Uso:
+        plan = PlaneacionEventos.planear([(id_servicio, 120, date(2025, 3, 8)), ...])
+        plan["faltantes"], plan["compras"]
+    """
+    
+    @staticmethod
+    def a_fecha(valor):
+        # datetime también es date: se compara solo por día
+        if isinstance(valor, datetime):
+            return valor.date()
+        if valor is None or isinstance(valor, date):
+            return valor
+        return date.fromisoformat(str(valor)[:10])
+    
+    @staticmethod
+    def cargar_recetas(ids_servicios):
+        ids_servicios = list(ids_servicios)
+        if not ids_servicios:
+            return []
+        marcas = ", ".join("?" * len(ids_servicios))
+        return Database.ejecutar_query(f"""
+            SELECT si.id_servicio, si.id_insumo, i.nombre, COALESCE(i.piezas, 0), i.fecha_caducidad,
+                   SUM(si.piezas_normalizadas), COUNT(*) - COUNT(si.piezas_normalizadas)
+            FROM servicio_insumo si
+            JOIN insumos i ON i.id = si.id_insumo
+            WHERE si.id_servicio IN ({marcas})
+            GROUP BY si.id_servicio, si.id_insumo
+        """, tuple(ids_servicios))
+    
+    @classmethod
+    def planear(cls, reservas):
+        """
+        reservas: [(id_servicio, cantidad, fecha)]
+        Retorna {
+            "demanda": {id_insumo: piezas de toda la temporada},
+            "faltantes": [(fecha, id_insumo, nombre, necesarias, utilizables, faltan, motivo)],
+            "compras": [(id_insumo, nombre, piezas, primera_fecha)],
+            "errores": [nombre de insumo] (renglones de receta sin conversión, se omiten),
+            "eventos", "segundos"
+        }
+        motivo: "stock" o "caduca" (había piezas pero caducan antes del evento)
+        """
+        inicio = time.perf_counter()
+        reservas = list(reservas)
+        
+        # Cantidad por servicio y fecha (varias reservas iguales se suman)
+        por_fecha = defaultdict(lambda: defaultdict(int))
+        for id_servicio, cantidad, fecha in reservas:
+            if int(cantidad) != cantidad or cantidad <= 0:
+                raise ValueError(f"Cantidad inválida de servicios: {cantidad}")
+            por_fecha[cls.a_fecha(fecha)][id_servicio] += int(cantidad)
+        servicios = {s for eventos in por_fecha.values() for s in eventos}
+        
+        # Receta de cada servicio en piezas por servicio
+        recetas = defaultdict(list)
+        insumos = {}
+        errores = []
+        for (id_servicio, id_insumo, nombre, stock, caducidad,
+             por_servicio, sin_conversion) in cls.cargar_recetas(servicios):
+            insumos[id_insumo] = (nombre, stock, cls.a_fecha(caducidad))
+            if sin_conversion:
+                if nombre not in errores:
+                    errores.append(nombre)
+                continue
+            if por_servicio > Consumo.TOLERANCIA:
+                recetas[id_servicio].append((id_insumo, por_servicio))
+        
+        restante = {id_insumo: stock for id_insumo, (nombre, stock, caducidad) in insumos.items()}
+        demanda_total = defaultdict(int)
+        faltantes = []
+        compras = {}
+        
+        for fecha in sorted(por_fecha):
+            necesarias = defaultdict(float)
+            for id_servicio, cantidad in por_fecha[fecha].items():
+                for id_insumo, por_servicio in recetas[id_servicio]:
+                    necesarias[id_insumo] += por_servicio * cantidad
+            
+            for id_insumo in sorted(necesarias):
+                piezas = math.ceil(necesarias[id_insumo] - Consumo.TOLERANCIA)
+                nombre, stock, caducidad = insumos[id_insumo]
+                demanda_total[id_insumo] += piezas
+                
+                caduca = caducidad is not None and caducidad < fecha
+                utilizables = 0 if caduca else restante[id_insumo]
+                usadas = min(piezas, utilizables)
+                if not caduca:
+                    restante[id_insumo] -= usadas
+                
+                faltan = piezas - usadas
+                if faltan:
+                    motivo = "caduca" if caduca and restante[id_insumo] > 0 else "stock"
+                    faltantes.append((fecha, id_insumo, nombre, piezas, utilizables, faltan, motivo))
+                    anterior = compras.get(id_insumo, (nombre, 0, fecha))
+                    compras[id_insumo] = (nombre, anterior[1] + faltan, anterior[2])
+        
+        return {
+            "demanda": dict(demanda_total),
+            "faltantes": faltantes,
+            "compras": sorted(((id_insumo, nombre, piezas, primera)
+                               for id_insumo, (nombre, piezas, primera) in compras.items()),
+                              key=lambda c: (c[3], c[1])),
+            "errores": errores,
+            "eventos": len(reservas),
+            "segundos": time.perf_counter() - inicio
+        }
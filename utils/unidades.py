@@ -0,0 +1,81 @@
+"""
+Conversión de unidades de contenido
+Acepta tanto las abreviaturas del formulario de insumos ("kg", "L", "pza")
+como los nombres de los datos de ejemplo ("gramos", "litro", "pieza")
+"""
+
+
+class Unidades:
+    """
+    Cada unidad pertenece a una magnitud y tiene un factor a la unidad base
+    de esa magnitud (g, ml, pza). Los envases (paq, caja, bolsa...) son su
+    propia magnitud: una caja no se convierte a piezas.
+
+    Uso:
+        Unidades.convertir(1.5, "kg", "gramos")  # 1500.0
+    """
+    
+    # unidad -> (magnitud, factor a la base). La tabla unidades de la base
+    # (migración 007) es una copia fija: agregar o cambiar una unidad aquí
+    # requiere una migración nueva que haga lo mismo en la tabla
+    FACTORES = {
+        "mg": ("masa", 0.001),
+        "g": ("masa", 1.0),
+        "gr": ("masa", 1.0),
+        "gramo": ("masa", 1.0),
+        "gramos": ("masa", 1.0),
+        "kg": ("masa", 1000.0),
+        "kilo": ("masa", 1000.0),
+        "kilos": ("masa", 1000.0),
+        "kilogramo": ("masa", 1000.0),
+        "kilogramos": ("masa", 1000.0),
+        "ml": ("volumen", 1.0),
+        "mililitro": ("volumen", 1.0),
+        "mililitros": ("volumen", 1.0),
+        "l": ("volumen", 1000.0),
+        "lt": ("volumen", 1000.0),
+        "litro": ("volumen", 1000.0),
+        "litros": ("volumen", 1000.0),
+        "pza": ("pieza", 1.0),
+        "pieza": ("pieza", 1.0),
+        "piezas": ("pieza", 1.0),
+        "paq": ("paq", 1.0),
+        "caja": ("caja", 1.0),
+        "bolsa": ("bolsa", 1.0),
+        "lata": ("lata", 1.0),
+        "botella": ("botella", 1.0),
+    }
+    
+    # magnitud -> unidad base (los envases son su propia base)
+    BASES = {"masa": "g", "volumen": "ml", "pieza": "pza"}
+    
+    @classmethod
+    def base(cls, magnitud):
+        return cls.BASES.get(magnitud, magnitud)
+    
+    @staticmethod
+    def normalizar(unidad):
+        """Clave de FACTORES para una unidad escrita a mano (None si viene vacía)"""
+        if unidad is None:
+            return None
+        unidad = str(unidad).strip().lower().rstrip(".")
+        return unidad or None
+    
+    @classmethod
+    def factor(cls, unidad):
+        """(magnitud, factor) de la unidad; ValueError si no se conoce"""
+        clave = cls.normalizar(unidad)
+        if clave not in cls.FACTORES:
+            raise ValueError(f"Unidad desconocida: {unidad}")
+        return cls.FACTORES[clave]
+    
+    @classmethod
+    def convertir(cls, cantidad, de, a):
+        """Convierte cantidad de la unidad de a la unidad a; ValueError si no son compatibles"""
+        if cls.normalizar(de) == cls.normalizar(a):
+            return float(cantidad)
+        magnitud_de, factor_de = cls.factor(de)
+        magnitud_a, factor_a = cls.factor(a)
+        if magnitud_de != magnitud_a:
+            raise ValueError(f"No se puede convertir {de} a {a}")
+        return cantidad * factor_de / factor_a
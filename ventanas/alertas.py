@@ -8,123 +8,147 @@ from tkinter import ttk, messagebox
 from datetime import date, timedelta
 from estilos.colores import PaletaColores
 from estilos.fuentes import Fuentes
+from config.db_config import SQLITE_HISTORIAL_ALERTAS
 from utils.db_connection import Database
+from utils.ejecutor import EjecutorConsultas
+from utils.escaner_alertas import EscanerAlertas
+from utils.estado_alertas import EstadoAlertas
 from utils.posiciones import Posiciones
-from ventanas.formularios import GestorFormularios
+from ventanas.componentes import IndicadorCarga, ModeloLista, TablaVirtual
+from ventanas.formularios import GestorFormularios, GestorPantallas
 import ventanas.formularios as vf
 
 
+class SnapshotAlertas:
+    """
+    Clasificación de los insumos en alertas hecha en una sola pasada.
+    stock_bajo: (id, nombre, categoria, piezas, alerta_piezas, faltante)
+    por_caducar / caducados: (id, nombre, categoria, piezas, fecha_caducidad, dias)
+    """
+    
+    def __init__(self, hoy, dias):
+        self.hoy = hoy
+        self.dias = dias
+        self.stock_bajo = []
+        self.por_caducar = []
+        self.caducados = []
+    
+    @staticmethod
+    def a_fecha(valor):
+        """Fecha de SQLite (texto 'AAAA-MM-DD...') o date; None si no se entiende"""
+        if not valor:
+            return None
+        if isinstance(valor, date):
+            return valor
+        try:
+            return date.fromisoformat(str(valor)[:10])
+        except ValueError:
+            return None
+    
+    @classmethod
+    def clasificar(cls, filas, hoy, dias=7):
+        """filas: (id, nombre, categoria, piezas, alerta_piezas, fecha_caducidad)"""
+        snap = cls(hoy, dias)
+        # Días respecto a hoy de cada fecha distinta (se repiten mucho)
+        diferencias = {}
+        
+        for id_insumo, nombre, categoria, piezas, alerta, fecha in filas:
+            if piezas is not None and alerta and alerta > 0 and piezas <= alerta:
+                snap.stock_bajo.append((id_insumo, nombre, categoria, piezas, alerta, alerta - piezas))
+            
+            if not fecha:
+                continue
+            diferencia = diferencias.get(fecha)
+            if diferencia is None:
+                f = cls.a_fecha(fecha)
+                diferencia = diferencias[fecha] = (f - hoy).days if f else dias + 1
+            if diferencia < 0:
+                snap.caducados.append((id_insumo, nombre, categoria, piezas, fecha, -diferencia))
+            elif diferencia <= dias:
+                snap.por_caducar.append((id_insumo, nombre, categoria, piezas, fecha, diferencia))
+        
+        # Más faltante primero; caducidad por fecha
+        snap.stock_bajo.sort(key=lambda d: (-d[5], d[0]))
+        snap.por_caducar.sort(key=lambda d: (d[5], d[0]))
+        snap.caducados.sort(key=lambda d: (-d[5], d[0]))
+        return snap
+
+
 class AlertasCRUD:
     """Operaciones para alertas"""
     
     @staticmethod
-    def obtener_alertas_stock_bajo():
-        """Obtiene insumos con stock bajo"""
+    def obtener_snapshot(dias=7, hoy=None):
+        """
+        Las tres listas de alertas en una sola consulta (lo que la ventana
+        de alertas pedía en tres). Cada rama usa su índice de la migración
+        002; la de caducidad deja fuera los de stock bajo para no repetirlos
+        """
+        hoy = hoy or date.today()
         try:
-            query = """
+            columnas = """
                 SELECT 
                     i.id,
                     i.nombre,
                     COALESCE(c.nombre, 'Sin categoría') as categoria,
                     i.piezas,
                     i.alerta_piezas,
-                    i.alerta_piezas - i.piezas as faltante
+                    i.fecha_caducidad
                 FROM insumos i
                 LEFT JOIN categorias c ON i.id_categoria = c.id
-                WHERE i.piezas <= i.alerta_piezas AND i.alerta_piezas > 0
-                ORDER BY (i.alerta_piezas - i.piezas) DESC
             """
-            return Database.ejecutar_query(query)
-        except Exception as e:
-            print(f"Error: {e}")
-            return []
-    
-    @staticmethod
-    def obtener_alertas_por_caducar(dias=7):
-        """Obtiene insumos próximos a caducar"""
-        try:
-            query = """
-                SELECT 
-                    i.id,
-                    i.nombre,
-                    COALESCE(c.nombre, 'Sin categoría') as categoria,
-                    i.piezas,
-                    i.fecha_caducidad,
-                    CAST(julianday(i.fecha_caducidad) - julianday('now') AS INTEGER) AS dias_restantes
-                FROM insumos i
-                LEFT JOIN categorias c ON i.id_categoria = c.id
-                WHERE i.fecha_caducidad IS NOT NULL 
-                AND date(i.fecha_caducidad) >= date('now')
-                AND date(i.fecha_caducidad) <= date('now', '+' || ? || ' days')
-                ORDER BY date(i.fecha_caducidad) ASC
+            query = f"""
+                {columnas}
+                WHERE i.piezas <= i.alerta_piezas AND i.alerta_piezas > 0
+                UNION ALL
+                {columnas}
+                WHERE i.fecha_caducidad <= ?
+                AND NOT COALESCE(i.piezas <= i.alerta_piezas AND i.alerta_piezas > 0, 0)
             """
-            return Database.ejecutar_query(query, (dias,))
+            limite = (hoy + timedelta(days=dias)).isoformat()
+            filas = Database.ejecutar_query(query, (limite,))
         except Exception as e:
             print(f"Error: {e}")
-            return []
+            filas = []
+        return SnapshotAlertas.clasificar(filas, hoy, dias)
     
     @staticmethod
-    def obtener_alertas_caducados():
-        """Obtiene insumos ya caducados"""
+    def obtener_resumen_alertas():
+        """Obtiene conteo de alertas por tipo (contadores de alerta_contadores)"""
         try:
-            query = """
-                SELECT 
-                    i.id,
-                    i.nombre,
-                    COALESCE(c.nombre, 'Sin categoría') as categoria,
-                    i.piezas,
-                    i.fecha_caducidad,
-                    CAST(julianday('now') - julianday(i.fecha_caducidad) AS INTEGER) AS dias_caducado
-                FROM insumos i
-                LEFT JOIN categorias c ON i.id_categoria = c.id
-                WHERE i.fecha_caducidad IS NOT NULL 
-                AND date(i.fecha_caducidad) < date('now')
-                ORDER BY date(i.fecha_caducidad) ASC
-            """
-
-            return Database.ejecutar_query(query)
+            k = EstadoAlertas.obtener_contadores()
+            return (k['stock_bajo'], k['por_caducar'], k['caducados']) if k else (0, 0, 0)
         except Exception as e:
             print(f"Error: {e}")
-            return []
-    
-    @staticmethod
-    def obtener_resumen_alertas():
-        """Obtiene conteo de alertas por tipo"""
-        try:
-            query = """
-                SELECT 
-                    SUM(CASE WHEN piezas <= alerta_piezas AND alerta_piezas > 0 THEN 1 ELSE 0 END) AS stock_bajo,
-                    SUM(CASE WHEN fecha_caducidad IS NOT NULL
-                        AND date(fecha_caducidad) >= date('now')
-                        AND date(fecha_caducidad) <= date('now', '+7 days') THEN 1 ELSE 0 END) AS por_caducar,
-                    SUM(CASE WHEN fecha_caducidad IS NOT NULL
-                        AND date(fecha_caducidad) < date('now') THEN 1 ELSE 0 END) AS caducados
-                FROM insumos
-            """
-            resultado = Database.ejecutar_query(query)
-            return resultado[0] if resultado else (0, 0, 0)
-        except:
             return (0, 0, 0)
     
     @staticmethod
     def registrar_alerta(id_insumo, tipo, mensaje):
-        """Registra una alerta en la base de datos"""
+        """Registra una alerta en la base de datos (una por insumo, tipo y día)"""
         try:
             query = """
-                INSERT INTO alertas (id_insumo, tipo, mensaje, fecha_alerta)
-                VALUES (?, ?, ?, date('now'))
+                INSERT OR IGNORE INTO alertas (id_insumo, tipo, mensaje, fecha_alerta)
+                VALUES (?, ?, ?, date('now', 'localtime'))
             """
-
+            
             Database.ejecutar_comando(query, (id_insumo, tipo, mensaje))
             return True
         except:
             return False
     
     @staticmethod
-    def obtener_historial_alertas(limite=50):
-        """Obtiene el historial de alertas registradas"""
+    def obtener_historial_alertas(limite=50, despues=None):
+        """
+        Obtiene una página del historial, de la más reciente a la más vieja.
+        despues: (fecha_alerta, id) de la última fila de la página anterior;
+        la página sigue desde ahí por idx_alertas_fecha (fecha_alerta, rowid)
+        en lugar de saltar filas con OFFSET.
+        """
         try:
-            query = """
+            condicion, params = "", ()
+            if despues is not None:
+                condicion, params = "WHERE (a.fecha_alerta, a.id) < (?, ?)", tuple(despues)
+            query = f"""
                 SELECT 
                     a.id,
                     a.fecha_alerta,
@@ -133,19 +157,20 @@ class AlertasCRUD:
                     a.mensaje
                 FROM alertas a
                 JOIN insumos i ON a.id_insumo = i.id
-                ORDER BY date(a.fecha_alerta) DESC, a.id DESC
+                {condicion}
+                ORDER BY a.fecha_alerta DESC, a.id DESC
                 LIMIT ?
             """
-            return Database.ejecutar_query(query, (limite,))
+            return Database.ejecutar_query(query, params + (limite,))
         except:
             return []
     
     @staticmethod
     def limpiar_historial():
-        """Limpia el historial de alertas"""
+        """Limpia el historial de alertas (por tandas, ver EscanerAlertas.purgar)"""
         try:
-            Database.ejecutar_comando("DELETE FROM alertas")
-            return True, "Historial limpiado"
+            total = EscanerAlertas.purgar()
+            return True, f"Historial limpiado ({total} alertas)"
         except Exception as e:
             return False, f"Error: {e}"
 
@@ -153,8 +178,13 @@ class AlertasCRUD:
 class VentanaAlertas:
     """Ventana de gestión de alertas"""
     
+    # Al volver a la pantalla se recarga si cambió alguna o cambió el día (GestorPantallas)
+    TABLAS = ("insumos", "categorias", "alertas")
+    PAGINA_HISTORIAL = SQLITE_HISTORIAL_ALERTAS['pagina']
+    
     def __init__(self, parent):
         self.parent = parent
+        self.snapshot = None
         self.mostrar()
     
     def mostrar(self):
@@ -196,6 +226,7 @@ class VentanaAlertas:
         
         self.frame_tarjetas = tk.Frame(frame_resumen, bg=PaletaColores.COLOR_FONDO)
         self.frame_tarjetas.pack()
+        self.carga_resumen = IndicadorCarga(self.frame_tarjetas)
         
         self.tarjetas_valores = {}
     
@@ -231,6 +262,7 @@ class VentanaAlertas:
         
         self.notebook = ttk.Notebook(self.frame_principal, style="Alertas.TNotebook")
         self.notebook.pack(fill="both", expand=True)
+        self.carga = IndicadorCarga(self.notebook)
         
         # Pestaña Stock Bajo
         self.tab_stock = tk.Frame(self.notebook, bg=PaletaColores.COLOR_FONDO)
@@ -269,7 +301,7 @@ class VentanaAlertas:
         frame_tabla.pack(fill="both", expand=True, padx=10, pady=(0, 10))
         
         cols = ("id", "nombre", "categoria", "stock", "minimo", "faltante")
-        self.tabla_stock = ttk.Treeview(frame_tabla, columns=cols, show="headings", height=12)
+        self.tabla_stock = TablaVirtual(frame_tabla, columns=cols, show="headings", height=12)
         
         self.tabla_stock.heading("id", text="ID")
         self.tabla_stock.heading("nombre", text="Insumo")
@@ -288,10 +320,6 @@ class VentanaAlertas:
         self.tabla_stock.tag_configure("critico", background="#FFCDD2")
         self.tabla_stock.tag_configure("bajo", background="#FFE0B2")
         
-        sb = ttk.Scrollbar(frame_tabla, orient="vertical", command=self.tabla_stock.yview)
-        self.tabla_stock.configure(yscrollcommand=sb.set)
-        self.tabla_stock.pack(side="left", fill="both", expand=True)
-        sb.pack(side="right", fill="y")
         
         # Botón para ir a compras
         frame_acciones = tk.Frame(self.tab_stock, bg=PaletaColores.COLOR_FONDO)
@@ -318,7 +346,7 @@ class VentanaAlertas:
         frame_tabla.pack(fill="both", expand=True, padx=10, pady=(0, 10))
         
         cols = ("id", "nombre", "categoria", "stock", "caducidad", "dias")
-        self.tabla_caducar = ttk.Treeview(frame_tabla, columns=cols, show="headings", height=12)
+        self.tabla_caducar = TablaVirtual(frame_tabla, columns=cols, show="headings", height=12)
         
         self.tabla_caducar.heading("id", text="ID")
         self.tabla_caducar.heading("nombre", text="Insumo")
@@ -336,11 +364,7 @@ class VentanaAlertas:
         
         self.tabla_caducar.tag_configure("urgente", background="#FFCDD2")
         self.tabla_caducar.tag_configure("pronto", background="#FFE0B2")
-        
-        sb = ttk.Scrollbar(frame_tabla, orient="vertical", command=self.tabla_caducar.yview)
-        self.tabla_caducar.configure(yscrollcommand=sb.set)
-        self.tabla_caducar.pack(side="left", fill="both", expand=True)
-        sb.pack(side="right", fill="y")
+    
     
     def crear_tabla_caducados(self):
         """Tabla de insumos caducados"""
@@ -359,7 +383,7 @@ class VentanaAlertas:
         frame_tabla.pack(fill="both", expand=True, padx=10, pady=(0, 10))
         
         cols = ("id", "nombre", "categoria", "stock", "caducidad", "dias_caducado")
-        self.tabla_caducados = ttk.Treeview(frame_tabla, columns=cols, show="headings", height=12)
+        self.tabla_caducados = TablaVirtual(frame_tabla, columns=cols, show="headings", height=12)
         
         self.tabla_caducados.heading("id", text="ID")
         self.tabla_caducados.heading("nombre", text="Insumo")
@@ -377,10 +401,6 @@ class VentanaAlertas:
         
         self.tabla_caducados.tag_configure("caducado", background="#F8BBD0")
         
-        sb = ttk.Scrollbar(frame_tabla, orient="vertical", command=self.tabla_caducados.yview)
-        self.tabla_caducados.configure(yscrollcommand=sb.set)
-        self.tabla_caducados.pack(side="left", fill="both", expand=True)
-        sb.pack(side="right", fill="y")
         
         # Advertencia
         frame_warn = tk.Frame(self.tab_caducados, bg="#FFEBEE", padx=10, pady=8)
@@ -407,7 +427,7 @@ class VentanaAlertas:
         frame_tabla.pack(fill="both", expand=True, padx=10, pady=(0, 10))
         
         cols = ("id", "fecha", "insumo", "tipo", "mensaje")
-        self.tabla_historial = ttk.Treeview(frame_tabla, columns=cols, show="headings", height=12)
+        self.tabla_historial = TablaVirtual(frame_tabla, columns=cols, show="headings", height=12)
         
         self.tabla_historial.heading("id", text="ID")
         self.tabla_historial.heading("fecha", text="Fecha")
@@ -421,25 +441,40 @@ class VentanaAlertas:
         self.tabla_historial.column("tipo", width=100, anchor="center")
         self.tabla_historial.column("mensaje", width=300, anchor="w")
         
-        sb = ttk.Scrollbar(frame_tabla, orient="vertical", command=self.tabla_historial.yview)
-        self.tabla_historial.configure(yscrollcommand=sb.set)
-        self.tabla_historial.pack(side="left", fill="both", expand=True)
-        sb.pack(side="right", fill="y")
+        self.pidiendo_historial = False
+        self.historial_completo = False
+        self.tabla_historial.al_final = self.mas_historial
+    
     
-    def cargar_datos(self):
-        """Carga todos los datos de alertas"""
-        self.cargar_resumen()
-        self.cargar_stock_bajo()
-        self.cargar_por_caducar()
-        self.cargar_caducados()
-        self.cargar_historial()
+    def al_mostrar(self):
+        """Al volver a la pantalla (GestorPantallas)"""
+        self.cargar_datos()
+    
+    def cargar_datos(self, snapshot=None):
+        """Carga todos los datos de alertas (las pestañas salen del mismo snapshot)"""
+        if snapshot is None:
+            self.cargar_resumen()
+            EjecutorConsultas.submit(AlertasCRUD.obtener_snapshot, self.cargar_datos,
+                                     clave="alertas.snapshot", indicador=self.carga)
+            self.cargar_historial()
+            return
+        
+        self.snapshot = snapshot
+        self.cargar_stock_bajo(snapshot.stock_bajo)
+        self.cargar_por_caducar(snapshot.por_caducar)
+        self.cargar_caducados(snapshot.caducados)
     
-    def cargar_resumen(self):
+    def cargar_resumen(self, resumen=None):
         """Carga las tarjetas de resumen"""
+        if resumen is None:
+            EjecutorConsultas.submit(AlertasCRUD.obtener_resumen_alertas, self.cargar_resumen,
+                                     clave="alertas.resumen", indicador=self.carga_resumen)
+            return
+        
         for widget in self.frame_tarjetas.winfo_children():
             widget.destroy()
         
-        stock_bajo, por_caducar, caducados = AlertasCRUD.obtener_resumen_alertas()
+        stock_bajo, por_caducar, caducados = resumen
         total = stock_bajo + por_caducar + caducados
         
         tarjetas = [
@@ -454,70 +489,90 @@ class VentanaAlertas:
             frame.pack(side="left", padx=(0, 15))
             self.tarjetas_valores[titulo] = lbl
     
-    def cargar_stock_bajo(self):
+    def cargar_stock_bajo(self, datos):
         """Carga la tabla de stock bajo"""
-        for item in self.tabla_stock.get_children():
-            self.tabla_stock.delete(item)
-        
-        datos = AlertasCRUD.obtener_alertas_stock_bajo()
-        
-        for d in datos:
-            faltante = d[5] if d[5] > 0 else 0
-            tag = "critico" if d[3] == 0 else "bajo"
-            self.tabla_stock.insert("", "end", values=(
-                d[0], d[1], d[2], d[3], d[4], faltante
-            ), tags=(tag,))
-        
+        self.tabla_stock.cargar(ModeloLista(datos, self.fila_stock_bajo))
         self.lbl_count_stock.config(text=f"{len(datos)} alerta{'s' if len(datos)!=1 else ''}")
     
-    def cargar_por_caducar(self):
+    def fila_stock_bajo(self, d):
+        faltante = d[5] if d[5] > 0 else 0
+        tag = "critico" if d[3] == 0 else "bajo"
+        return (d[0], d[1], d[2], d[3], d[4], faltante), (tag,)
+    
+    def cargar_por_caducar(self, datos):
         """Carga la tabla de por caducar"""
-        for item in self.tabla_caducar.get_children():
-            self.tabla_caducar.delete(item)
-        
-        datos = AlertasCRUD.obtener_alertas_por_caducar(7)
-        
-        for d in datos:
-            dias = d[5]
-            tag = "urgente" if dias <= 2 else "pronto"
-            fecha_str = d[4].strftime("%Y-%m-%d") if d[4] else ""
-            self.tabla_caducar.insert("", "end", values=(
-                d[0], d[1], d[2], d[3], fecha_str, dias
-            ), tags=(tag,))
-        
+        self.tabla_caducar.cargar(ModeloLista(datos, self.fila_por_caducar))
         self.lbl_count_caducar.config(text=f"{len(datos)} alerta{'s' if len(datos)!=1 else ''}")
     
-    def cargar_caducados(self):
+    def fila_por_caducar(self, d):
+        dias = d[5]
+        tag = "urgente" if dias <= 2 else "pronto"
+        return (d[0], d[1], d[2], d[3], self.formato_fecha(d[4]), dias), (tag,)
+    
+    def cargar_caducados(self, datos):
         """Carga la tabla de caducados"""
-        for item in self.tabla_caducados.get_children():
-            self.tabla_caducados.delete(item)
-        
-        datos = AlertasCRUD.obtener_alertas_caducados()
-        
-        for d in datos:
-            fecha_str = d[4] if isinstance(d[4], str) else ""
-            self.tabla_caducados.insert("", "end", values=(
-                d[0], d[1], d[2], d[3], fecha_str, d[5]
-            ), tags=("caducado",))
-        
+        self.tabla_caducados.cargar(ModeloLista(datos, self.fila_caducado))
         self.lbl_count_caducados.config(text=f"{len(datos)} alerta{'s' if len(datos)!=1 else ''}")
     
-    def cargar_historial(self):
-        """Carga el historial de alertas"""
-        for item in self.tabla_historial.get_children():
-            self.tabla_historial.delete(item)
+    def fila_caducado(self, d):
+        return (d[0], d[1], d[2], d[3], self.formato_fecha(d[4]), d[5]), ("caducado",)
+    
+    def cargar_historial(self, datos=None):
+        """Carga la primera página del historial de alertas"""
+        if datos is None:
+            self.pidiendo_historial = True
+            EjecutorConsultas.submit(lambda: AlertasCRUD.obtener_historial_alertas(self.PAGINA_HISTORIAL),
+                                     self.cargar_historial, al_error=self.error_historial,
+                                     clave="alertas.historial", indicador=self.tabla_historial.carga)
+            return
         
-        datos = AlertasCRUD.obtener_historial_alertas(50)
+        self.pidiendo_historial = False
+        self.historial_completo = len(datos) < self.PAGINA_HISTORIAL
+        self.tabla_historial.cargar(ModeloLista(list(datos), self.fila_historial))
+    
+    def mas_historial(self):
+        """Pide la página siguiente al llegar al final de la tabla (TablaVirtual.al_final)"""
+        if self.pidiendo_historial or self.historial_completo or not len(self.tabla_historial.modelo):
+            return
         
-        for d in datos:
-            fecha_str = d[1].strftime("%Y-%m-%d") if d[1] else ""
-            self.tabla_historial.insert("", "end", values=(
-                d[0], fecha_str, d[2], d[3], d[4]
-            ))
+        ultima = self.tabla_historial.modelo.datos[-1]
+        despues = (ultima[1], ultima[0])
+        self.pidiendo_historial = True
+        # Misma clave: recargar desde el inicio cancela la página en curso
+        EjecutorConsultas.submit(lambda: AlertasCRUD.obtener_historial_alertas(self.PAGINA_HISTORIAL, despues),
+                                 self.agregar_historial, al_error=self.error_historial,
+                                 clave="alertas.historial", indicador=self.tabla_historial.carga)
+    
+    def agregar_historial(self, datos):
+        self.pidiendo_historial = False
+        self.historial_completo = len(datos) < self.PAGINA_HISTORIAL
+        self.tabla_historial.extender(datos)
+    
+    def error_historial(self, error):
+        self.pidiendo_historial = False
+        print(f"✗ Error al cargar historial de alertas: {error}")
+    
+    def fila_historial(self, d):
+        return (d[0], self.formato_fecha(d[1]), d[2], d[3], d[4]), ()
+    
+    def snapshot_actual(self):
+        """El snapshot que se muestra; si aún no llega (o es de otro día) se consulta aquí"""
+        if self.snapshot is None or self.snapshot.hoy != date.today():
+            self.snapshot = AlertasCRUD.obtener_snapshot()
+        return self.snapshot
+    
+    @staticmethod
+    def formato_fecha(fecha):
+        """SQLite devuelve las fechas como texto; date/datetime se formatean"""
+        if not fecha:
+            return ""
+        if isinstance(fecha, str):
+            return fecha
+        return fecha.strftime("%Y-%m-%d")
     
     def generar_lista_compras(self):
         """Genera una lista de compras basada en stock bajo"""
-        datos = AlertasCRUD.obtener_alertas_stock_bajo()
+        datos = self.snapshot_actual().stock_bajo
         
         if not datos:
             messagebox.showinfo("Lista de Compras", "No hay insumos con stock bajo")
@@ -585,9 +640,8 @@ class VentanaAlertas:
     
     def generar_reporte(self):
         """Genera un reporte completo de alertas"""
-        stock_bajo = AlertasCRUD.obtener_alertas_stock_bajo()
-        por_caducar = AlertasCRUD.obtener_alertas_por_caducar(7)
-        caducados = AlertasCRUD.obtener_alertas_caducados()
+        snap = self.snapshot_actual()
+        stock_bajo, por_caducar, caducados = snap.stock_bajo, snap.por_caducar, snap.caducados
         
         dlg = tk.Toplevel(self.parent)
         dlg.title("Reporte de Alertas")
@@ -667,16 +721,21 @@ class VentanaAlertas:
                   bg=PaletaColores.GRIS_MEDIO, fg=PaletaColores.BLANCO,
                   relief="flat", padx=15, command=dlg.destroy).pack(side="left", padx=5)
     
-    def limpiar_historial(self):
-        """Limpia el historial de alertas"""
-        if messagebox.askyesno("Confirmar", "¿Eliminar todo el historial de alertas?"):
-            ok, msg = AlertasCRUD.limpiar_historial()
-            if ok:
-                self.cargar_historial()
-                messagebox.showinfo("Éxito", msg)
-            else:
-                messagebox.showerror("Error", msg)
+    def limpiar_historial(self, resultado=None):
+        """Limpia el historial de alertas (el borrado por tandas corre en segundo plano)"""
+        if resultado is None:
+            if messagebox.askyesno("Confirmar", "¿Eliminar todo el historial de alertas?"):
+                EjecutorConsultas.submit(AlertasCRUD.limpiar_historial, self.limpiar_historial,
+                                         clave="alertas.limpiar", indicador=self.tabla_historial.carga)
+            return
+        
+        ok, msg = resultado
+        if ok:
+            self.cargar_historial()
+            messagebox.showinfo("Éxito", msg)
+        else:
+            messagebox.showerror("Error", msg)
 
 
 def abrir_ventana_alertas(parent):
-    return VentanaAlertas(parent)
\ No newline at end of file
+    return GestorPantallas.abrir("alertas", parent, VentanaAlertas)
\ No newline at end of file
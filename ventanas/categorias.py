@@ -7,9 +7,13 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from estilos.colores import PaletaColores
 from estilos.fuentes import Fuentes
+from utils.busqueda import Busqueda
+from utils.cache import CacheCatalogo
 from utils.db_connection import Database
+from utils.ejecutor import EjecutorConsultas
 from utils.posiciones import Posiciones
-from ventanas.formularios import GestorFormularios
+from ventanas.componentes import BusquedaDiferida, ReconciliadorTabla
+from ventanas.formularios import GestorFormularios, GestorPantallas
 import ventanas.formularios as vf
 
 
@@ -21,8 +25,8 @@ class CategoriasCRUD:
         """Obtiene todas las categorías de la base de datos"""
         try:
             query = "SELECT id, nombre FROM categorias ORDER BY nombre"
-            resultado = Database.ejecutar_query(query)
-            return resultado
+            return CacheCatalogo.obtener("categorias.todas", ("categorias",),
+                                         lambda: Database.ejecutar_query(query))
         except Exception as e:
             print(f"Error al obtener categorías: {e}")
             return []
@@ -66,15 +70,16 @@ class CategoriasCRUD:
     def eliminar(id_categoria):
         """Elimina una categoría"""
         try:
-            # Verificar si tiene insumos asociados
-            query_check = "SELECT COUNT(*) FROM insumos WHERE id_categoria = ?"
-            resultado = Database.ejecutar_query(query_check, (id_categoria,))
-            
-            if resultado and resultado[0][0] > 0:
-                return False, "No se puede eliminar: la categoría tiene insumos asociados"
-            
-            query = "DELETE FROM categorias WHERE id = ?"
-            Database.ejecutar_comando(query, (id_categoria,))
+            with Database.transaction():
+                # Verificar si tiene insumos asociados
+                query_check = "SELECT COUNT(*) FROM insumos WHERE id_categoria = ?"
+                resultado = Database.ejecutar_query(query_check, (id_categoria,))
+                
+                if resultado and resultado[0][0] > 0:
+                    return False, "No se puede eliminar: la categoría tiene insumos asociados"
+                
+                query = "DELETE FROM categorias WHERE id = ?"
+                Database.ejecutar_comando(query, (id_categoria,))
             return True, "Categoría eliminada exitosamente"
         except Exception as e:
             return False, f"Error al eliminar categoría: {e}"
@@ -83,6 +88,14 @@ class CategoriasCRUD:
     def buscar(termino):
         """Busca categorías por nombre"""
         try:
+            expresion = Busqueda.expresion(termino)
+            if expresion and Busqueda.disponible("categorias_fts"):
+                query = """SELECT c.id, c.nombre FROM categorias_fts
+                           JOIN categorias c ON c.id = categorias_fts.rowid
+                           WHERE categorias_fts MATCH ?
+                           ORDER BY bm25(categorias_fts), c.nombre"""
+                return Database.ejecutar_query(query, (expresion,))
+            
             query = "SELECT id, nombre FROM categorias WHERE nombre LIKE ? COLLATE NOCASE ORDER BY nombre"
             resultado = Database.ejecutar_query(query, (f"%{termino}%",))
             return resultado
@@ -94,6 +107,12 @@ class CategoriasCRUD:
 class VentanaCategorias:
     """Ventana principal para gestión de categorías"""
     
+    # Al volver a la pantalla se recarga si cambió (GestorPantallas)
+    TABLAS = ("categorias",)
+    
+    # Consultas de la tabla en EjecutorConsultas: la última cancela a la anterior
+    CLAVE_TABLA = "categorias.tabla"
+    
     def __init__(self, parent):
         self.parent = parent
         self.categoria_seleccionada = None
@@ -183,7 +202,10 @@ class VentanaCategorias:
         
         self.entrada_busqueda = GestorFormularios.crear_entrada(frame_busqueda, ancho=30)
         self.entrada_busqueda.pack(side="left", padx=(0, 10))
-        self.entrada_busqueda.bind("<KeyRelease>", self.buscar_categorias)
+        self.busqueda = BusquedaDiferida(self.entrada_busqueda, CategoriasCRUD.buscar,
+                                         self.cargar_categorias, CategoriasCRUD.obtener_todas,
+                                         clave=self.CLAVE_TABLA)
+        self.entrada_busqueda.bind("<Return>", self.buscar_categorias)
         
         # Botón limpiar búsqueda
         btn_limpiar = tk.Button(
@@ -287,6 +309,8 @@ class VentanaCategorias:
             style="Categorias.Treeview",
             selectmode="browse"
         )
+        self.filas = ReconciliadorTabla(self.tabla)
+        self.busqueda.indicador = self.filas.carga
         
         # Configurar columnas
         self.tabla.heading("id", text="ID", anchor="center")
@@ -404,27 +428,25 @@ class VentanaCategorias:
     
     def cargar_categorias(self, categorias=None):
         """Carga las categorías en la tabla"""
-        # Limpiar tabla
-        for item in self.tabla.get_children():
-            self.tabla.delete(item)
-        
-        # Obtener categorías si no se proporcionaron
+        # Sin categorías se consultan en segundo plano y se vuelve aquí con ellas
         if categorias is None:
-            categorias = CategoriasCRUD.obtener_todas()
+            EjecutorConsultas.submit(CategoriasCRUD.obtener_todas, self.cargar_categorias,
+                                     clave=self.CLAVE_TABLA, indicador=self.filas.carga)
+            return
         
-        # Insertar en tabla
-        for categoria in categorias:
-            self.tabla.insert("", "end", values=(categoria['id'], categoria['nombre'])) 
+        # Aplicar solo las diferencias (iid = id de la categoría)
+        self.filas.reconciliar([
+            (categoria['id'], (categoria['id'], categoria['nombre']), ())
+            for categoria in categorias
+        ])
         
         # Actualizar contador
         total = len(categorias)
         texto = f"{total} categoría{'s' if total != 1 else ''}"
         self.label_contador.config(text=texto)
         
-        # Resetear selección
-        self.categoria_seleccionada = None
-        self.btn_editar.config(state="disabled")
-        self.btn_eliminar.config(state="disabled")
+        # Sincronizar la selección (se conserva si la categoría sigue en la tabla)
+        self.on_seleccionar(None)
     
     def on_seleccionar(self, event):
         """Maneja el evento de selección en la tabla"""
@@ -545,22 +567,18 @@ class VentanaCategorias:
                 messagebox.showerror("Error", mensaje)
     
     def buscar_categorias(self, event=None):
-        """Busca categorías por término"""
-        termino = self.entrada_busqueda.get().strip()
-        
-        if termino:
-            categorias = CategoriasCRUD.buscar(termino)
-        else:
-            categorias = CategoriasCRUD.obtener_todas()
-        
-        self.cargar_categorias(categorias)
+        """Busca categorías por término sin esperar a que se deje de escribir"""
+        self.busqueda.buscar_ahora()
     
     def limpiar_busqueda(self):
         """Limpia el campo de búsqueda"""
-        self.entrada_busqueda.delete(0, tk.END)
-        self.cargar_categorias()
+        self.busqueda.limpiar()
+    
+    def al_mostrar(self):
+        """Recarga respetando el texto de búsqueda"""
+        self.busqueda.buscar_ahora()
 
 
 def abrir_ventana_categorias(parent):
     """Función para abrir la ventana de categorías desde el menú principal"""
-    return VentanaCategorias(parent)
\ No newline at end of file
+    return GestorPantallas.abrir("categorias", parent, VentanaCategorias)
\ No newline at end of file
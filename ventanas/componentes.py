@@ -0,0 +1,546 @@
+"""
+Componentes reutilizables de las ventanas
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+from utils.ejecutor import EjecutorConsultas
+
+
+class IndicadorCarga:
+    """
+    Aviso "Cargando..." encima de un widget mientras hay consultas en curso.
+    Lleva la cuenta de iniciar()/terminar(), así que varias consultas
+    seguidas sobre la misma tabla muestran un solo aviso.
+    """
+    
+    def __init__(self, widget, texto="Cargando..."):
+        self.widget = widget
+        self.texto = texto
+        self._pendientes = 0
+        self._etiqueta = None
+    
+    def vivo(self):
+        try:
+            return bool(self.widget.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def iniciar(self):
+        self._pendientes += 1
+        if self._pendientes > 1 or not self.vivo():
+            return
+        try:
+            if self._etiqueta is None:
+                self._etiqueta = tk.Label(self.widget.master, text=self.texto, bg="#FFF8E1",
+                                          fg="#555", font=("Arial", 10, "italic"), padx=10, pady=4)
+            self._etiqueta.place(in_=self.widget, relx=0.5, rely=0.5, anchor="center")
+            self._etiqueta.lift()
+            self.widget.configure(cursor="watch")
+        except tk.TclError:
+            pass
+    
+    def terminar(self):
+        self._pendientes = max(0, self._pendientes - 1)
+        if self._pendientes or not self.vivo():
+            return
+        try:
+            if self._etiqueta is not None:
+                self._etiqueta.place_forget()
+            self.widget.configure(cursor="")
+        except tk.TclError:
+            pass
+
+
+class BusquedaDiferida:
+    """
+    Búsqueda mientras se escribe en un Entry.
+
+    - Agrupa las teclas con after(): solo se busca cuando el usuario deja de
+      escribir durante espera_ms
+    - Ignora las teclas que no escriben (flechas, Shift, Control...) y los
+      cambios que dejan el mismo texto
+    - La consulta corre en EjecutorConsultas; si mientras tanto se pidió un
+      término más nuevo (o una recarga con la misma clave) se descarta
+
+    Uso:
+        self.busqueda = BusquedaDiferida(self.ent_buscar, InsumosCRUD.buscar,
+                                         self.cargar_insumos, InsumosCRUD.obtener_todos,
+                                         clave=self.tabla, indicador=self.tabla.carga)
+    """
+    
+    TECLAS_IGNORADAS = {
+        "Shift_L", "Shift_R", "Control_L", "Control_R", "Alt_L", "Alt_R",
+        "Meta_L", "Meta_R", "Super_L", "Super_R", "Caps_Lock", "Num_Lock",
+        "Left", "Right", "Up", "Down", "Home", "End", "Prior", "Next",
+        "Tab", "ISO_Left_Tab", "Escape", "Return", "KP_Enter", "Insert",
+        "Menu", "Print", "Scroll_Lock", "Pause"
+    }
+    
+    def __init__(self, entrada, buscar, mostrar, todos=None, espera_ms=250, clave=None, indicador=None):
+        """
+        buscar(termino) y todos() corren fuera del hilo de Tk y retornan filas;
+        mostrar(filas) corre en el hilo de Tk. Sin texto se usa todos().
+        clave: la misma que usan los cargar_* de la tabla, para que una
+        búsqueda y una recarga no se pisen.
+        """
+        self.entrada = entrada
+        self.buscar = buscar
+        self.mostrar = mostrar
+        self.todos = todos
+        self.espera_ms = espera_ms
+        self.clave = clave if clave is not None else self
+        self.indicador = indicador
+        
+        self._pendiente = None
+        self._ultimo = entrada.get().strip()
+        
+        entrada.bind("<KeyRelease>", self.al_teclear)
+        entrada.bind("<Destroy>", lambda e: self.cancelar(), add="+")
+    
+    def al_teclear(self, event=None):
+        if event is not None and event.keysym in self.TECLAS_IGNORADAS:
+            return
+        
+        if self._pendiente is not None:
+            self.entrada.after_cancel(self._pendiente)
+        self._pendiente = self.entrada.after(self.espera_ms, self._al_terminar_espera)
+    
+    def _al_terminar_espera(self):
+        self._pendiente = None
+        termino = self.entrada.get().strip()
+        if termino != self._ultimo:
+            self.buscar_ahora(termino)
+    
+    def buscar_ahora(self, termino=None):
+        """Lanza la búsqueda sin esperar (termino=None usa el texto del Entry)"""
+        if termino is None:
+            termino = self.entrada.get().strip()
+        self._ultimo = termino
+        
+        if termino or self.todos is None:
+            funcion = lambda: self.buscar(termino)
+        else:
+            funcion = self.todos
+        
+        EjecutorConsultas.submit(funcion, self.mostrar, al_error=self._al_fallar,
+                                 clave=self.clave, indicador=self.indicador)
+    
+    def _al_fallar(self, error):
+        print(f"Error en búsqueda: {error}")
+        self.mostrar([])
+    
+    def limpiar(self):
+        """Borra el texto y muestra todo"""
+        self.entrada.delete(0, "end")
+        self.buscar_ahora("")
+    
+    def cancelar(self):
+        """Descarta la búsqueda pendiente y cualquier resultado en camino"""
+        if self._pendiente is not None:
+            try:
+                self.entrada.after_cancel(self._pendiente)
+            except Exception:
+                pass
+        self._pendiente = None
+        EjecutorConsultas.cancelar(self.clave)
+
+
+class ReconciliadorTabla:
+    """
+    Mantiene un Treeview normal al día con un resultado aplicando solo las
+    diferencias: el iid de cada item es la clave primaria de la fila, así
+    que la selección y el desplazamiento no se pierden al recargar.
+
+    Uso:
+        self.filas_serv = ReconciliadorTabla(self.tabla_serv)
+        self.filas_serv.reconciliar([(s[0], (s[0], s[1], s[2]), ()) for s in datos])
+    """
+    
+    def __init__(self, tree):
+        self.tree = tree
+        self.carga = IndicadorCarga(tree)
+        self._filas = {}
+    
+    def reconciliar(self, filas):
+        """
+        filas: [(clave, valores, tags)] en el orden deseado.
+        Retorna (insertadas, actualizadas, eliminadas).
+        """
+        nuevas = {}
+        orden = []
+        for clave, valores, tags in filas:
+            iid = str(clave)
+            nuevas[iid] = (tuple(valores), tuple(tags))
+            orden.append(iid)
+        
+        sobrantes = [iid for iid in self._filas if iid not in nuevas]
+        if sobrantes:
+            self.tree.delete(*sobrantes)
+        
+        insertadas = actualizadas = 0
+        for i, iid in enumerate(orden):
+            valores, tags = nuevas[iid]
+            previa = self._filas.get(iid)
+            if previa is None:
+                self.tree.insert("", i, iid=iid, values=valores, tags=tags)
+                insertadas += 1
+            elif previa != nuevas[iid]:
+                self.tree.item(iid, values=valores, tags=tags)
+                actualizadas += 1
+        
+        # Solo se reacomoda si el orden cambió
+        if list(self.tree.get_children()) != orden:
+            for i, iid in enumerate(orden):
+                self.tree.move(iid, "", i)
+        
+        self._filas = nuevas
+        return insertadas, actualizadas, len(sobrantes)
+    
+    def actualizar_fila(self, clave, valores, tags=()):
+        """Cambia un solo item; False si la clave no está en la tabla"""
+        iid = str(clave)
+        if iid not in self._filas:
+            return False
+        fila = (tuple(valores), tuple(tags))
+        if self._filas[iid] != fila:
+            self.tree.item(iid, values=fila[0], tags=fila[1])
+            self._filas[iid] = fila
+        return True
+    
+    def quitar(self, clave):
+        iid = str(clave)
+        if iid not in self._filas:
+            return False
+        self.tree.delete(iid)
+        del self._filas[iid]
+        return True
+    
+    def limpiar(self):
+        self.reconciliar([])
+
+
+class ModeloLista:
+    """
+    Filas en memoria para TablaVirtual.
+    convertir(dato) -> (valores, tags) se llama solo para las filas visibles;
+    clave(dato) identifica la fila (por defecto la primera columna, el id).
+    """
+    
+    def __init__(self, datos, convertir, clave=None):
+        self.datos = datos
+        self.convertir = convertir
+        self.clave = clave or (lambda dato: dato[0])
+        self._indices = None
+    
+    def __len__(self):
+        return len(self.datos)
+    
+    def rango(self, inicio, fin):
+        """[(clave, valores, tags)] de las filas inicio..fin-1"""
+        filas = []
+        for dato in self.datos[inicio:fin]:
+            valores, tags = self.convertir(dato)
+            filas.append((self.clave(dato), valores, tags))
+        return filas
+    
+    def indice(self, clave):
+        if self._indices is None:
+            self._indices = {self.clave(d): i for i, d in enumerate(self.datos)}
+        return self._indices.get(clave)
+    
+    def extender(self, datos):
+        """Agrega filas al final (la página siguiente de un listado)"""
+        inicio = len(self.datos)
+        self.datos.extend(datos)
+        if self._indices is not None:
+            for i, dato in enumerate(datos, inicio):
+                self._indices[self.clave(dato)] = i
+    
+    def reemplazar(self, clave, dato):
+        """Sustituye la fila con esa clave en su misma posición"""
+        i = self.indice(clave)
+        if i is None:
+            return False
+        self.datos[i] = dato
+        return True
+    
+    def quitar(self, clave):
+        i = self.indice(clave)
+        if i is None:
+            return False
+        del self.datos[i]
+        self._indices = None
+        return True
+
+
+class TablaVirtual:
+    """
+    Treeview que solo crea los items de las filas visibles.
+
+    - El Treeview tiene un item fijo por fila visible ("ranuras"); al
+      desplazarse se reescriben sus valores y tags con las filas del modelo
+    - La barra de desplazamiento se calcula sobre el total del modelo, no
+      sobre los items del Treeview
+    - La selección se guarda por clave, así que sobrevive al desplazamiento
+      y a las recargas; selection() e item() reciben y retornan claves como
+      un Treeview normal
+    - Al recargar, la primera fila visible sigue arriba si todavía existe y
+      solo se reescriben las ranuras cuyo contenido cambió
+    - al_final(): si se asigna, se llama cuando se muestran las últimas
+      MARGEN_FINAL filas (para pedir la página siguiente con extender())
+
+    Uso:
+        self.tabla = TablaVirtual(frame, columns=cols, show="headings", style="T.Treeview")
+        self.tabla.cargar(ModeloLista(datos, self.fila_insumo))
+    """
+    
+    PASO_RUEDA = 3
+    ALTO_FILA = 20
+    MARGEN_FINAL = 20
+    
+    def __init__(self, parent, **opciones):
+        self.tree = ttk.Treeview(parent, **opciones)
+        self.barra = ttk.Scrollbar(parent, orient="vertical", command=self.yview)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.barra.pack(side="right", fill="y")
+        self.carga = IndicadorCarga(self.tree)
+        self.al_final = None
+        
+        self.modelo = ModeloLista([], lambda dato: ((), ()))
+        self._primero = 0
+        self._visibles = int(self.tree.cget("height")) or 10
+        self._ranuras = []
+        self._pintadas = []
+        self._claves_visibles = []
+        self._seleccion = []
+        self._foco = None
+        self._eco = set()
+        
+        estilo = opciones.get("style", "Treeview")
+        try:
+            self._alto_fila = int(ttk.Style().lookup(estilo, "rowheight") or self.ALTO_FILA)
+        except (TypeError, ValueError):
+            self._alto_fila = self.ALTO_FILA
+        
+        self.tree.bind("<<TreeviewSelect>>", self._al_seleccionar)
+        self.tree.bind("<Configure>", self._al_redimensionar)
+        for secuencia in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(secuencia, self._al_girar_rueda)
+        for secuencia, delta in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-pagina"),
+                                 ("<Next>", "pagina"), ("<Home>", "inicio"), ("<End>", "fin")):
+            self.tree.bind(secuencia, lambda e, d=delta: self._mover_seleccion(d))
+    
+    # --- API tipo Treeview ---
+    
+    def heading(self, columna, **opciones):
+        return self.tree.heading(columna, **opciones)
+    
+    def column(self, columna, **opciones):
+        return self.tree.column(columna, **opciones)
+    
+    def tag_configure(self, tag, **opciones):
+        return self.tree.tag_configure(tag, **opciones)
+    
+    def bind(self, secuencia, funcion, add="+"):
+        return self.tree.bind(secuencia, funcion, add)
+    
+    def selection(self):
+        """Claves seleccionadas"""
+        return tuple(self._seleccion)
+    
+    def item(self, clave):
+        """{"values": ..., "tags": ...} de la fila con esa clave"""
+        i = self.modelo.indice(clave)
+        if i is None:
+            return {"values": "", "tags": ""}
+        _, valores, tags = self.modelo.rango(i, i + 1)[0]
+        return {"values": list(valores), "tags": list(tags)}
+    
+    def __len__(self):
+        return len(self.modelo)
+    
+    # --- Carga y desplazamiento ---
+    
+    def cargar(self, modelo):
+        """
+        Reemplaza todas las filas. Conserva la selección de las claves que
+        sigan en el modelo y la posición si la primera fila visible sigue
+        existiendo; si no, vuelve al inicio.
+        """
+        ancla = self._claves_visibles[0] if self._claves_visibles else None
+        self.modelo = modelo
+        
+        i = modelo.indice(ancla) if ancla is not None else None
+        self._primero = max(0, min(i, len(modelo) - self._visibles)) if i is not None else 0
+        self._seleccion = [c for c in self._seleccion if modelo.indice(c) is not None]
+        if self._foco not in self._seleccion:
+            self._foco = self._seleccion[0] if self._seleccion else None
+        self._pintar()
+    
+    def extender(self, datos):
+        """Agrega filas al final del modelo sin mover la vista"""
+        self.modelo.extender(datos)
+        self._pintar()
+    
+    def actualizar(self, clave, dato):
+        """Cambia una sola fila del modelo sin recargar; False si no está"""
+        if not self.modelo.reemplazar(clave, dato):
+            return False
+        if clave in self._claves_visibles:
+            self._pintar()
+        return True
+    
+    def quitar(self, clave):
+        """Elimina una sola fila del modelo sin recargar"""
+        if not self.modelo.quitar(clave):
+            return False
+        if clave in self._seleccion:
+            self._seleccion.remove(clave)
+        if self._foco == clave:
+            self._foco = None
+        self._primero = max(0, min(self._primero, len(self.modelo) - self._visibles))
+        self._pintar()
+        return True
+    
+    def yview(self, *args):
+        """Comando de la barra: ("moveto", fraccion) o ("scroll", n, "units"|"pages")"""
+        total = len(self.modelo)
+        if not args or not total:
+            return
+        if args[0] == "moveto":
+            primero = round(float(args[1]) * total)
+        elif args[0] == "scroll":
+            n = int(args[1])
+            if args[2] == "pages":
+                n *= max(1, self._visibles - 1)
+            primero = self._primero + n
+        else:
+            return
+        self.desplazar_a(primero)
+    
+    def desplazar_a(self, primero):
+        primero = max(0, min(primero, len(self.modelo) - self._visibles))
+        if primero != self._primero:
+            self._primero = primero
+            self._pintar()
+    
+    def see(self, clave):
+        """Desplaza lo mínimo para que la fila quede visible"""
+        i = self.modelo.indice(clave)
+        if i is not None:
+            self.desplazar_a(self._primero_para(i))
+    
+    def _primero_para(self, i):
+        """Primera fila visible para que i quede en pantalla moviéndose lo mínimo"""
+        if i < self._primero:
+            return i
+        if i >= self._primero + self._visibles:
+            return i - self._visibles + 1
+        return self._primero
+    
+    def _pintar(self):
+        filas = self.modelo.rango(self._primero, self._primero + self._visibles)
+        
+        while len(self._ranuras) < len(filas):
+            self._ranuras.append(self.tree.insert("", "end"))
+            self._pintadas.append(None)
+        while len(self._ranuras) > len(filas):
+            self.tree.delete(self._ranuras.pop())
+            self._pintadas.pop()
+        
+        self._claves_visibles = []
+        seleccionadas = []
+        for n, (ranura, (clave, valores, tags)) in enumerate(zip(self._ranuras, filas)):
+            contenido = (tuple(valores), tuple(tags))
+            if self._pintadas[n] != contenido:
+                self.tree.item(ranura, values=contenido[0], tags=contenido[1])
+                self._pintadas[n] = contenido
+            self._claves_visibles.append(clave)
+            if clave in self._seleccion:
+                seleccionadas.append(ranura)
+            if clave == self._foco:
+                self.tree.focus(ranura)
+        
+        # El cambio de selección genera un <<TreeviewSelect>> que no viene
+        # del usuario; _al_seleccionar lo reconoce y no toca self._seleccion
+        if set(seleccionadas) != set(self.tree.selection()):
+            self._eco = set(seleccionadas)
+            self.tree.selection_set(seleccionadas)
+        self._ajustar_barra()
+        
+        if self.al_final is not None and self._primero + self._visibles >= len(self.modelo) - self.MARGEN_FINAL:
+            self.al_final()
+    
+    def _ajustar_barra(self):
+        total = len(self.modelo)
+        if total <= self._visibles:
+            self.barra.set(0.0, 1.0)
+        else:
+            self.barra.set(self._primero / total, (self._primero + self._visibles) / total)
+    
+    def _calcular_visibles(self):
+        alto = self.tree.winfo_height()
+        encabezado = self._alto_fila
+        if self._ranuras:
+            caja = self.tree.bbox(self._ranuras[0])
+            if caja:
+                encabezado, self._alto_fila = caja[1], caja[3]
+        return max(1, (alto - encabezado) // self._alto_fila)
+    
+    # --- Eventos ---
+    
+    def _al_redimensionar(self, event=None):
+        visibles = self._calcular_visibles()
+        if visibles != self._visibles:
+            self._visibles = visibles
+            self._primero = max(0, min(self._primero, len(self.modelo) - visibles))
+            self._pintar()
+    
+    def _al_girar_rueda(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            n = -self.PASO_RUEDA
+        else:
+            n = self.PASO_RUEDA
+        self.yview("scroll", n, "units")
+        return "break"
+    
+    def _al_seleccionar(self, event=None):
+        actual = set(self.tree.selection())
+        if actual == self._eco:
+            return
+        self._eco = actual
+        posiciones = {ranura: i for i, ranura in enumerate(self._ranuras)}
+        self._seleccion = [self._claves_visibles[posiciones[r]]
+                           for r in self.tree.selection() if r in posiciones]
+        if self._seleccion:
+            self._foco = self._seleccion[0]
+    
+    def _mover_seleccion(self, delta):
+        """Flechas, RePág/AvPág, Inicio y Fin sobre todo el modelo, no solo lo visible"""
+        total = len(self.modelo)
+        if not total:
+            return "break"
+        
+        actual = self.modelo.indice(self._foco) if self._foco is not None else None
+        if delta == "inicio":
+            i = 0
+        elif delta == "fin":
+            i = total - 1
+        elif actual is None:
+            i = self._primero
+        elif delta in ("pagina", "-pagina"):
+            paso = max(1, self._visibles - 1)
+            i = actual + (paso if delta == "pagina" else -paso)
+        else:
+            i = actual + delta
+        i = max(0, min(i, total - 1))
+        
+        clave = self.modelo.rango(i, i + 1)[0][0]
+        self._seleccion = [clave]
+        self._foco = clave
+        self._primero = self._primero_para(i)
+        self._pintar()
+        self.tree.event_generate("<<TreeviewSelect>>")
+        return "break"
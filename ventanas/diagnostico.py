@@ -0,0 +1,185 @@
+"""
+Módulo de Diagnóstico - CARUMA
+Consultas SQL con mayor tiempo acumulado y estado del pool de conexiones
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from estilos.colores import PaletaColores
+from estilos.fuentes import Fuentes
+from utils.auditor_consultas import AuditorPlanes
+from utils.cache import CacheCatalogo
+from utils.db_connection import Database
+from utils.escaner_alertas import EscanerAlertas
+from utils.instrumentacion import Instrumentacion
+from utils.posiciones import Posiciones
+from ventanas.componentes import ReconciliadorTabla
+from ventanas.formularios import GestorFormularios, GestorPantallas
+import ventanas.formularios as vf
+
+
+class VentanaDiagnostico:
+    """Ventana de diagnóstico de rendimiento"""
+    
+    # Las estadísticas cambian sin escribir en la base: se recarga siempre
+    TABLAS = None
+    
+    def __init__(self, parent):
+        self.parent = parent
+        self.mostrar()
+    
+    def mostrar(self):
+        GestorFormularios.limpiar_contenido()
+        vf.frame_contenido_actual = Posiciones.contenido(self.parent)
+        
+        self.frame_principal = tk.Frame(vf.frame_contenido_actual, bg=PaletaColores.COLOR_FONDO, padx=20, pady=15)
+        self.frame_principal.pack(fill="both", expand=True)
+        
+        self.crear_titulo()
+        self.crear_panel_pool()
+        self.crear_tabla()
+        self.cargar_datos()
+    
+    def crear_titulo(self):
+        frame = tk.Frame(self.frame_principal, bg=PaletaColores.COLOR_FONDO)
+        frame.pack(fill="x", pady=(0, 15))
+        tk.Label(frame, text="Diagnóstico", font=Fuentes.FUENTE_TITULOS,
+                 bg=PaletaColores.COLOR_FONDO, fg=PaletaColores.DORADO_CARUMA).pack(side="left")
+        
+        tk.Button(frame, text="Reiniciar", font=Fuentes.FUENTE_MENU,
+                  bg=PaletaColores.GRIS_CLARO, relief="flat", cursor="hand2",
+                  padx=10, command=self.reiniciar).pack(side="right", padx=(5, 0))
+        if AuditorPlanes.activo:
+            tk.Button(frame, text="Planes", font=Fuentes.FUENTE_MENU,
+                      bg=PaletaColores.GRIS_CLARO, relief="flat", cursor="hand2",
+                      padx=10, command=self.ver_planes).pack(side="right", padx=(5, 0))
+        tk.Button(frame, text="Actualizar", font=Fuentes.FUENTE_MENU,
+                  bg=PaletaColores.DORADO_CARUMA, relief="flat", cursor="hand2",
+                  padx=10, command=self.cargar_datos).pack(side="right")
+    
+    def crear_panel_pool(self):
+        """Líneas con las estadísticas del pool, el umbral de consultas lentas, la caché y el escáner"""
+        self.lbl_pool = tk.Label(self.frame_principal, text="", font=Fuentes.FUENTE_MENU,
+                                 bg=PaletaColores.COLOR_FONDO, fg=PaletaColores.GRIS_MEDIO, anchor="w")
+        self.lbl_pool.pack(fill="x")
+        
+        self.lbl_cache = tk.Label(self.frame_principal, text="", font=Fuentes.FUENTE_MENU,
+                                  bg=PaletaColores.COLOR_FONDO, fg=PaletaColores.GRIS_MEDIO, anchor="w")
+        self.lbl_cache.pack(fill="x")
+        
+        self.lbl_escaner = tk.Label(self.frame_principal, text="", font=Fuentes.FUENTE_MENU,
+                                    bg=PaletaColores.COLOR_FONDO, fg=PaletaColores.GRIS_MEDIO, anchor="w")
+        self.lbl_escaner.pack(fill="x", pady=(0, 10))
+    
+    def crear_tabla(self):
+        frame = tk.Frame(self.frame_principal, bg=PaletaColores.COLOR_FONDO)
+        frame.pack(fill="both", expand=True)
+        
+        cols = ("origen", "llamadas", "total", "promedio", "maximo", "filas", "consulta")
+        self.tabla = ttk.Treeview(frame, columns=cols, show="headings")
+        self.filas = ReconciliadorTabla(self.tabla)
+        
+        for c, texto, w, anchor in [("origen", "Origen", 200, "w"), ("llamadas", "Llamadas", 70, "center"),
+                                    ("total", "Total ms", 80, "center"), ("promedio", "Prom. ms", 75, "center"),
+                                    ("maximo", "Máx. ms", 75, "center"), ("filas", "Filas", 65, "center"),
+                                    ("consulta", "Consulta", 500, "w")]:
+            self.tabla.heading(c, text=texto)
+            self.tabla.column(c, width=w, anchor=anchor)
+        
+        sb = ttk.Scrollbar(frame, orient="vertical", command=self.tabla.yview)
+        self.tabla.configure(yscrollcommand=sb.set)
+        self.tabla.pack(side="left", fill="both", expand=True)
+        sb.pack(side="right", fill="y")
+        
+        self.tabla.tag_configure("lenta", background="#FFE0B2")
+        self.tabla.tag_configure("error", background="#FFCDD2")
+        self.tabla.bind("<Double-1>", self.ver_consulta)
+    
+    def al_mostrar(self):
+        """Al volver a la pantalla (GestorPantallas)"""
+        self.cargar_datos()
+    
+    def cargar_datos(self):
+        pool = Database.estadisticas_pool()
+        self.lbl_pool.config(text=(
+            f"Pool: {pool.get('en_uso', 0)} en uso / {pool.get('libres', 0)} libres "
+            f"(máx. {pool.get('max_conexiones', 0)})  |  Préstamos: {pool.get('prestamos', 0)}  |  "
+            f"Esperas: {pool.get('esperas', 0)}  |  Consultas lentas: ≥ {Instrumentacion.umbral_lenta_ms} ms"
+        ))
+        
+        cache = CacheCatalogo.estadisticas()
+        self.lbl_cache.config(text=(
+            f"Caché de catálogos: {cache['entradas']}/{cache['max_entradas']} listados  |  "
+            f"Aciertos: {cache['aciertos']}  |  Fallos: {cache['fallos']} "
+            f"({cache['tasa_aciertos']:.0%} aciertos)  |  Invalidaciones: {cache['invalidaciones']}  |  "
+            f"Desalojos: {cache['desalojos']}"
+        ))
+        
+        escaner = EscanerAlertas.estadisticas()
+        ultimo = escaner["ultimo"] or {"revisadas": 0, "registradas": 0, "pendientes": 0, "segundos": 0.0}
+        self.lbl_escaner.config(text=(
+            f"Escáner de alertas: {escaner['escaneos']} escaneos  |  "
+            f"Prom. {escaner['promedio_ms']:.1f} ms / máx. {escaner['max_ms']:.1f} ms  |  "
+            f"Registradas: {escaner['registradas']} ({escaner['revisadas']} umbrales revisados)  |  "
+            f"Purgadas: {escaner['purgadas']}  |  "
+            f"Último: {ultimo['registradas']} nuevas, {ultimo['pendientes']} pendientes, "
+            f"{ultimo['segundos'] * 1000:.1f} ms"
+        ))
+        
+        # Clave estable por consulta para que la selección sobreviva a Actualizar
+        self.consultas = {}
+        filas = []
+        for c in Instrumentacion.top_consultas(50):
+            clave = f"{c['origen']}|{c['huella']}"
+            self.consultas[clave] = c
+            tags = ()
+            if c["errores"]:
+                tags = ("error",)
+            elif c["max_ms"] >= Instrumentacion.umbral_lenta_ms:
+                tags = ("lenta",)
+            filas.append((clave, (
+                c["origen"], c["llamadas"], f"{c['total_ms']:.1f}", f"{c['promedio_ms']:.2f}",
+                f"{c['max_ms']:.1f}", c["filas"], c["huella"]
+            ), tags))
+        self.filas.reconciliar(filas)
+    
+    def ver_consulta(self, event=None):
+        sel = self.tabla.selection()
+        if sel:
+            c = self.consultas[sel[0]]
+            messagebox.showinfo(c["origen"], c["huella"])
+    
+    def ver_planes(self):
+        """Reporte del auditor de planes de consulta"""
+        dlg = tk.Toplevel(self.parent)
+        dlg.title("Planes de Consulta")
+        dlg.geometry("900x600")
+        dlg.configure(bg=PaletaColores.COLOR_FONDO)
+        dlg.transient(self.parent)
+        
+        frame_texto = tk.Frame(dlg, bg=PaletaColores.COLOR_FONDO)
+        frame_texto.pack(fill="both", expand=True, padx=20, pady=15)
+        
+        texto = tk.Text(frame_texto, font=("Consolas", 10), wrap="none",
+                        relief="solid", bd=1, padx=10, pady=10)
+        sb = ttk.Scrollbar(frame_texto, orient="vertical", command=texto.yview)
+        texto.configure(yscrollcommand=sb.set)
+        texto.pack(side="left", fill="both", expand=True)
+        sb.pack(side="right", fill="y")
+        
+        texto.insert("1.0", AuditorPlanes.reporte())
+        texto.config(state="disabled")
+        
+        tk.Button(dlg, text="Cerrar", font=Fuentes.FUENTE_BOTONES,
+                  bg=PaletaColores.GRIS_MEDIO, fg=PaletaColores.BLANCO,
+                  relief="flat", padx=15, command=dlg.destroy).pack(pady=(0, 10))
+    
+    def reiniciar(self):
+        Instrumentacion.reiniciar()
+        CacheCatalogo.reiniciar()
+        EscanerAlertas.reiniciar()
+        self.cargar_datos()
+
+
+def abrir_ventana_diagnostico(parent):
+    return GestorPantallas.abrir("diagnostico", parent, VentanaDiagnostico)
@@ -3,7 +3,11 @@ Clase base para gestión de formularios
 """
 
 import tkinter as tk
+from collections import OrderedDict
+from datetime import date
+from tkinter import ttk
 from estilos.colores import PaletaColores
+from utils.cache import CacheCatalogo
 
 # Variable global para el frame de contenido actual
 frame_contenido_actual = None
@@ -12,10 +16,122 @@ class GestorFormularios:
     
     @staticmethod
     def limpiar_contenido():
-        """Limpia el contenido actual de la ventana"""
+        """Limpia el contenido actual de la ventana (las pantallas guardadas solo se ocultan)"""
         global frame_contenido_actual
         if frame_contenido_actual is not None:
-            frame_contenido_actual.destroy()
+            if GestorPantallas.es_guardada(frame_contenido_actual):
+                frame_contenido_actual.pack_forget()
+            else:
+                frame_contenido_actual.destroy()
+            frame_contenido_actual = None
+
+
+class GestorPantallas:
+    """
+    Mantiene vivas las pantallas ya construidas para no rehacerlas en cada
+    navegación.
+
+    - Al salir de una pantalla su frame solo se oculta (pack_forget)
+    - Al volver se vuelve a empacar; si cambió alguna de sus TABLAS (según
+      las versiones de CacheCatalogo) o cambió el día, se llama a su
+      al_mostrar() para recargar los datos. TABLAS = None recarga siempre
+    - Si se pasa del máximo de pantallas o del presupuesto de elementos
+      (widgets + filas de Treeview), se destruye la usada hace más tiempo
+
+    Uso:
+        def abrir_ventana_insumos(parent):
+            return GestorPantallas.abrir("insumos", parent, VentanaInsumos)
+    """
+    
+    MAX_PANTALLAS = 5
+    PRESUPUESTO_ELEMENTOS = 20000
+    
+    # nombre -> {"instancia", "frame", "firma", "costo"}
+    _pantallas = OrderedDict()
+    
+    @classmethod
+    def abrir(cls, nombre, parent, clase):
+        global frame_contenido_actual
+        pantalla = cls._pantallas.get(nombre)
+        if pantalla is not None and not pantalla["frame"].winfo_exists():
+            del cls._pantallas[nombre]
+            pantalla = None
+        
+        if pantalla is None:
+            # La firma se toma antes de leer para no perder un cambio a media carga
+            firma = cls._firma(clase)
+            instancia = clase(parent)
+            pantalla = {"instancia": instancia, "frame": frame_contenido_actual, "firma": firma}
+            cls._pantallas[nombre] = pantalla
+        else:
+            instancia = pantalla["instancia"]
+            if pantalla["frame"] is not frame_contenido_actual:
+                GestorFormularios.limpiar_contenido()
+                pantalla["frame"].pack(fill="both", expand=True)
+                frame_contenido_actual = pantalla["frame"]
+            
+            firma = cls._firma(clase)
+            if firma is None or firma != pantalla["firma"]:
+                pantalla["firma"] = firma
+                if hasattr(instancia, "al_mostrar"):
+                    instancia.al_mostrar()
+        
+        cls._pantallas.move_to_end(nombre)
+        pantalla["costo"] = cls._contar_elementos(pantalla["frame"])
+        cls._desalojar()
+        return instancia
+    
+    @classmethod
+    def es_guardada(cls, frame):
+        return any(p["frame"] is frame for p in cls._pantallas.values())
+    
+    @classmethod
+    def olvidar(cls, nombre=None):
+        """Destruye una pantalla guardada (o todas) para que se reconstruya al abrirla"""
+        nombres = [nombre] if nombre else list(cls._pantallas)
+        for n in nombres:
+            pantalla = cls._pantallas.pop(n, None)
+            if pantalla is not None and pantalla["frame"].winfo_exists():
+                pantalla["frame"].destroy()
+    
+    @classmethod
+    def estadisticas(cls):
+        return {
+            "pantallas": list(cls._pantallas),
+            "elementos": sum(p.get("costo", 0) for p in cls._pantallas.values())
+        }
+    
+    @staticmethod
+    def _firma(clase):
+        tablas = getattr(clase, "TABLAS", ())
+        if tablas is None:
+            return None
+        return (CacheCatalogo.version(*tablas), date.today())
+    
+    @staticmethod
+    def _contar_elementos(widget):
+        """Widgets del árbol más las filas de los Treeview"""
+        total = 0
+        pendientes = [widget]
+        while pendientes:
+            w = pendientes.pop()
+            total += 1
+            if isinstance(w, ttk.Treeview):
+                total += len(w.get_children())
+            pendientes.extend(w.winfo_children())
+        return total
+    
+    @classmethod
+    def _desalojar(cls):
+        """Destruye las menos usadas mientras se exceda el límite (nunca la visible)"""
+        while len(cls._pantallas) > 1:
+            costo = sum(p.get("costo", 0) for p in cls._pantallas.values())
+            if len(cls._pantallas) <= cls.MAX_PANTALLAS and costo <= cls.PRESUPUESTO_ELEMENTOS:
+                break
+            nombre, pantalla = next(iter(cls._pantallas.items()))
+            if pantalla["frame"] is frame_contenido_actual:
+                break
+            cls.olvidar(nombre)
     
     @staticmethod
     def crear_boton(parent, texto, comando, ancho=20):
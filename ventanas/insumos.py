@@ -5,18 +5,31 @@ CRUD completo para insumos con control de inventario
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from estilos.colores import PaletaColores
 from estilos.fuentes import Fuentes
+from utils.busqueda import Busqueda
+from utils.cache import CacheCatalogo
 from utils.db_connection import Database
+from utils.ejecutor import EjecutorConsultas
+from utils.movimientos import Movimientos
 from utils.posiciones import Posiciones
-from ventanas.formularios import GestorFormularios
+from ventanas.categorias import CategoriasCRUD
+from ventanas.componentes import BusquedaDiferida, ModeloLista, TablaVirtual
+from ventanas.formularios import GestorFormularios, GestorPantallas
 import ventanas.formularios as vf
 
 
 class InsumosCRUD:
     """Operaciones CRUD de insumos"""
     
+    # Tipo de movimiento (utils/movimientos.py) según la operación de ajuste
+    OPERACIONES = {
+        'add': 'entrega',
+        'subtract': 'consumo',
+        'set': 'ajuste'
+    }
+    
     @staticmethod
     def obtener_todos():
         try:
@@ -25,13 +38,31 @@ class InsumosCRUD:
                     i.piezas, i.contenido_por_pieza, i.unidad_contenido,
                     i.fecha_caducidad, i.alerta_piezas, i.id_categoria
                 FROM insumos i LEFT JOIN categorias c ON i.id_categoria = c.id
-                ORDER BY i.nombre
+                ORDER BY i.nombre COLLATE NOCASE
             """
-            return Database.ejecutar_query(query)
+            return CacheCatalogo.obtener("insumos.todos", ("insumos", "categorias"),
+                                         lambda: Database.ejecutar_query(query))
         except Exception as e:
             print(f"Error: {e}")
             return []
     
+    @staticmethod
+    def obtener_fila(id_insumo):
+        """Una fila con las mismas columnas que obtener_todos (para refrescar la tabla)"""
+        try:
+            query = """
+                SELECT i.id, i.nombre, COALESCE(c.nombre, 'Sin categoría') as categoria,
+                    i.piezas, i.contenido_por_pieza, i.unidad_contenido,
+                    i.fecha_caducidad, i.alerta_piezas, i.id_categoria
+                FROM insumos i LEFT JOIN categorias c ON i.id_categoria = c.id
+                WHERE i.id = ?
+            """
+            resultado = Database.ejecutar_query(query, (id_insumo,))
+            return resultado[0] if resultado else None
+        except Exception as e:
+            print(f"Error: {e}")
+            return None
+    
     @staticmethod
     def obtener_por_id(id_insumo):
         try:
@@ -58,6 +89,26 @@ class InsumosCRUD:
                 return False, "Ya existe un insumo con ese nombre"
             return False, f"Error: {e}"
     
+    @staticmethod
+    def crear_lote(insumos):
+        """
+        Crea muchos insumos en una sola transacción.
+        insumos: lista de tuplas (nombre, id_categoria, piezas, contenido, unidad, fecha_cad, alerta)
+        """
+        try:
+            query = """INSERT INTO insumos (nombre, id_categoria, piezas, contenido_por_pieza,
+                       unidad_contenido, fecha_caducidad, alerta_piezas)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)"""
+            filas = [(nombre.strip(), id_categoria or None, piezas, contenido or None,
+                      unidad or None, fecha_cad or None, alerta)
+                     for nombre, id_categoria, piezas, contenido, unidad, fecha_cad, alerta in insumos]
+            r = Database.ejecutar_lote(query, filas)
+            return True, f"{r['filas']} insumos creados ({r['filas_por_segundo']:.0f} filas/s)"
+        except Exception as e:
+            if "unique" in str(e).lower():
+                return False, "Hay insumos repetidos o que ya existen; no se creó ninguno"
+            return False, f"Error: {e}"
+    
     @staticmethod
     def actualizar(id_insumo, nombre, id_categoria, piezas, contenido, unidad, fecha_cad, alerta):
         try:
@@ -76,11 +127,13 @@ class InsumosCRUD:
     @staticmethod
     def eliminar(id_insumo):
         try:
-            check = Database.ejecutar_query("SELECT COUNT(*) FROM servicio_insumo WHERE id_insumo=?", (id_insumo,))
-            if check and check[0][0] > 0:
-                return False, "El insumo está asociado a servicios"
-            Database.ejecutar_comando("DELETE FROM alertas WHERE id_insumo=?", (id_insumo,))
-            Database.ejecutar_comando("DELETE FROM insumos WHERE id=?", (id_insumo,))
+            # Verificación y borrados en una sola transacción (un solo COMMIT)
+            with Database.transaction():
+                check = Database.ejecutar_query("SELECT COUNT(*) FROM servicio_insumo WHERE id_insumo=?", (id_insumo,))
+                if check and check[0][0] > 0:
+                    return False, "El insumo está asociado a servicios"
+                Database.ejecutar_comando("DELETE FROM alertas WHERE id_insumo=?", (id_insumo,))
+                Database.ejecutar_comando("DELETE FROM insumos WHERE id=?", (id_insumo,))
             return True, "Insumo eliminado exitosamente"
         except Exception as e:
             return False, f"Error: {e}"
@@ -88,11 +141,24 @@ class InsumosCRUD:
     @staticmethod
     def buscar(termino):
         try:
+            expresion = Busqueda.expresion(termino)
+            if expresion and Busqueda.disponible("insumos_fts"):
+                # Prefijos sin acentos sobre nombre y categoría; pesa más el nombre
+                query = """SELECT i.id, i.nombre, COALESCE(c.nombre, 'Sin categoría'),
+                           i.piezas, i.contenido_por_pieza, i.unidad_contenido,
+                           i.fecha_caducidad, i.alerta_piezas, i.id_categoria
+                           FROM insumos_fts
+                           JOIN insumos i ON i.id = insumos_fts.rowid
+                           LEFT JOIN categorias c ON i.id_categoria = c.id
+                           WHERE insumos_fts MATCH ?
+                           ORDER BY bm25(insumos_fts, 10.0, 1.0), i.nombre COLLATE NOCASE"""
+                return Database.ejecutar_query(query, (expresion,))
+            
             query = """SELECT i.id, i.nombre, COALESCE(c.nombre, 'Sin categoría'),
                        i.piezas, i.contenido_por_pieza, i.unidad_contenido,
                        i.fecha_caducidad, i.alerta_piezas, i.id_categoria
                        FROM insumos i LEFT JOIN categorias c ON i.id_categoria = c.id
-                       WHERE i.nombre LIKE ? COLLATE NOCASE OR c.nombre LIKE ? COLLATE NOCASE ORDER BY i.nombre"""
+                       WHERE i.nombre LIKE ? COLLATE NOCASE OR c.nombre LIKE ? COLLATE NOCASE ORDER BY i.nombre COLLATE NOCASE"""
             return Database.ejecutar_query(query, (f"%{termino}%", f"%{termino}%"))
         except:
             return []
@@ -106,7 +172,7 @@ class InsumosCRUD:
                        i.piezas, i.contenido_por_pieza, i.unidad_contenido,
                        i.fecha_caducidad, i.alerta_piezas, i.id_categoria
                        FROM insumos i LEFT JOIN categorias c ON i.id_categoria = c.id
-                       WHERE i.id_categoria = ? ORDER BY i.nombre"""
+                       WHERE i.id_categoria = ? ORDER BY i.nombre COLLATE NOCASE"""
             return Database.ejecutar_query(query, (id_cat,))
         except:
             return []
@@ -125,31 +191,42 @@ class InsumosCRUD:
             return []
     
     @staticmethod
-    def obtener_por_caducar(dias=7):
+    def obtener_por_caducar(dias=7, hoy=None):
         try:
+            # Día local, como alerta_contadores (date('now') es UTC)
+            hoy = hoy or date.today()
             query = """SELECT i.id, i.nombre, COALESCE(c.nombre, 'Sin categoría') as categoria,
                    i.piezas, i.contenido_por_pieza, i.unidad_contenido,
                    i.fecha_caducidad, i.alerta_piezas, i.id_categoria
                    FROM insumos i LEFT JOIN categorias c ON i.id_categoria = c.id
                    WHERE i.fecha_caducidad IS NOT NULL 
-                   AND i.fecha_caducidad <= date('now', '+' || ? || ' days')
-                   AND i.fecha_caducidad >= date('now') 
+                   AND i.fecha_caducidad <= ?
+                   AND i.fecha_caducidad >= ? 
                    ORDER BY i.fecha_caducidad""" 
-            return Database.ejecutar_query(query, (dias,))
+            return Database.ejecutar_query(query, ((hoy + timedelta(days=dias)).isoformat(), hoy.isoformat()))
         except:
             return []
     
     @staticmethod
-    def actualizar_piezas(id_insumo, cantidad, op='set'):
+    def actualizar_piezas(id_insumo, cantidad, op='set', nota=None):
+        """op: 'add', 'subtract', 'set' o directamente un tipo de movimiento ('merma'...)"""
         try:
-            if op == 'add':
-                q = "UPDATE insumos SET piezas = piezas + ? WHERE id = ?"
-            elif op == 'subtract':
-                q = "UPDATE insumos SET piezas = GREATEST(0, piezas - ?) WHERE id = ?"
-            else:
-                q = "UPDATE insumos SET piezas = ? WHERE id = ?"
-            Database.ejecutar_comando(q, (cantidad, id_insumo))
-            return True, "Stock actualizado"
+            tipo = InsumosCRUD.OPERACIONES.get(op, op)
+            piezas = Movimientos.registrar(id_insumo, tipo, cantidad, nota)
+            return True, f"Stock actualizado: {piezas} piezas"
+        except Exception as e:
+            return False, f"Error: {e}"
+    
+    @staticmethod
+    def actualizar_piezas_lote(cambios, op='add'):
+        """
+        Aplica muchos ajustes de stock en una sola transacción (un movimiento por cambio).
+        cambios: lista de tuplas (id_insumo, cantidad)
+        """
+        try:
+            tipo = InsumosCRUD.OPERACIONES.get(op, op)
+            r = Movimientos.registrar_lote([(id_insumo, tipo, cantidad) for id_insumo, cantidad in cambios])
+            return True, f"Stock actualizado en {r['filas']} insumos ({r['filas_por_segundo']:.0f} filas/s)"
         except Exception as e:
             return False, f"Error: {e}"
 
@@ -157,6 +234,12 @@ class InsumosCRUD:
 class VentanaInsumos:
     """Ventana de gestión de insumos"""
     
+    # Al volver a la pantalla se recarga si cambió alguna (GestorPantallas)
+    TABLAS = ("insumos", "categorias")
+    
+    # Consultas de la tabla en EjecutorConsultas: la última cancela a la anterior
+    CLAVE_TABLA = "insumos.tabla"
+    
     UNIDADES = ["kg", "g", "L", "ml", "pza", "paq", "caja", "bolsa", "lata", "botella"]
     
     def __init__(self, parent):
@@ -183,7 +266,7 @@ class VentanaInsumos:
     
     def cargar_categorias(self):
         try:
-            self.categorias = Database.ejecutar_query("SELECT id, nombre FROM categorias ORDER BY nombre")
+            self.categorias = CategoriasCRUD.obtener_todas()
         except:
             self.categorias = []
     
@@ -204,7 +287,10 @@ class VentanaInsumos:
         tk.Label(f1, text="🔍", bg=PaletaColores.COLOR_FONDO).pack(side="left")
         self.ent_buscar = tk.Entry(f1, font=Fuentes.FUENTE_TEXTO, width=18, relief="solid", bd=1)
         self.ent_buscar.pack(side="left", padx=(3, 10))
-        self.ent_buscar.bind("<KeyRelease>", self.buscar)
+        self.busqueda = BusquedaDiferida(self.ent_buscar, InsumosCRUD.buscar,
+                                         self.cargar_insumos, InsumosCRUD.obtener_todos,
+                                         clave=self.CLAVE_TABLA)
+        self.ent_buscar.bind("<Return>", self.buscar)
         
         tk.Label(f1, text="Categoría:", bg=PaletaColores.COLOR_FONDO).pack(side="left")
         self.cmb_filtro = ttk.Combobox(f1, state="readonly", width=18)
@@ -262,18 +348,14 @@ class VentanaInsumos:
         style.map("T.Treeview", background=[("selected", PaletaColores.DORADO_CLARO)])
         
         cols = ("id", "nombre", "categoria", "piezas", "contenido", "unidad", "caducidad", "alerta")
-        self.tabla = ttk.Treeview(frame, columns=cols, show="headings", style="T.Treeview")
+        self.tabla = TablaVirtual(frame, columns=cols, show="headings", style="T.Treeview")
+        self.busqueda.indicador = self.tabla.carga
         
         for c, w in [("id", 45), ("nombre", 170), ("categoria", 110), ("piezas", 55),
                      ("contenido", 65), ("unidad", 55), ("caducidad", 85), ("alerta", 50)]:
             self.tabla.heading(c, text=c.capitalize())
             self.tabla.column(c, width=w, anchor="center" if c != "nombre" and c != "categoria" else "w")
         
-        sb = ttk.Scrollbar(frame, orient="vertical", command=self.tabla.yview)
-        self.tabla.configure(yscrollcommand=sb.set)
-        self.tabla.pack(side="left", fill="both", expand=True)
-        sb.pack(side="right", fill="y")
-        
         self.tabla.bind("<<TreeviewSelect>>", self.on_select)
         self.tabla.bind("<Double-1>", lambda e: self.form_editar())
         self.tabla.tag_configure("stock_bajo", background="#FFCCCC")
@@ -341,68 +423,84 @@ class VentanaInsumos:
         self.cmb_cat.current(0)
     
     def cargar_insumos(self, datos=None):
-    # Limpiar tabla
-        for i in self.tabla.get_children():
-            self.tabla.delete(i)
-        
         if datos is None:
-            datos = InsumosCRUD.obtener_todos()
+            self.consultar(InsumosCRUD.obtener_todos)
+            return
         
-        hoy = date.today()
-
-        for ins in datos:
-            # ins es una tupla, así que usamos índices
-            pzas = ins[3]
-            contenido = ins[4]
-            unidad = ins[5]
-            fec = ins[6]
-            alerta = ins[7]
-
-            tags = []
-
-            # --- STOCK BAJO ---
-            if alerta and pzas is not None and pzas <= alerta:
-                tags.append("stock_bajo")
-
-            # --- POR CADUCAR ---
-            fec_str = ""
-            if fec:
-                try:
-                    if isinstance(fec, str):
-                        fec = datetime.strptime(fec, "%Y-%m-%d").date()
-
-                    dias = (fec - hoy).days
-                    if 0 <= dias <= 7:
-                        tags.append("por_caducar")
-
-                    fec_str = fec.strftime("%Y-%m-%d")
-                except:
-                    fec_str = fec
-
-            # Insertar fila final
-            self.tabla.insert(
-                "",
-                "end",
-                values=(
-                    ins[0],   # id
-                    ins[1],   # nombre
-                    ins[2],   # categoria
-                    pzas,
-                    contenido or "",
-                    unidad or "",
-                    fec_str,
-                    alerta
-                ),
-                tags=tags
-            )
-
-        # Actualizar contador y botones
-        self.lbl_contador.config(text=f"{len(datos)} insumo{'s' if len(datos)!=1 else ''}")
-        self.insumo_sel = None
-        self.btn_editar.config(state="disabled")
-        self.btn_eliminar.config(state="disabled")
-        self.btn_stock.config(state="disabled")
-
+        # Solo se formatean las filas que llegan a verse
+        self.hoy = date.today()
+        self.tabla.cargar(ModeloLista(datos, self.fila_insumo))
+        
+        # Actualizar contador y botones (la selección sobrevive si la fila sigue)
+        self.actualizar_contador()
+        self.on_select(None)
+    
+    def consultar(self, consulta, despues=None):
+        """Corre consulta() en segundo plano y carga el resultado; despues(datos) al terminar"""
+        def mostrar(datos):
+            self.cargar_insumos(datos)
+            if despues is not None:
+                despues(datos)
+        EjecutorConsultas.submit(consulta, mostrar, clave=self.CLAVE_TABLA, indicador=self.tabla.carga)
+    
+    def actualizar_fila(self, id_insumo):
+        """Refresca solo la fila del insumo indicado"""
+        fila = InsumosCRUD.obtener_fila(id_insumo)
+        if fila is None or not self.tabla.actualizar(id_insumo, fila):
+            self.cargar_insumos()
+            return
+        self.on_select(None)
+    
+    def quitar_fila(self, id_insumo):
+        self.tabla.quitar(id_insumo)
+        self.actualizar_contador()
+        self.on_select(None)
+    
+    def actualizar_contador(self):
+        n = len(self.tabla)
+        self.lbl_contador.config(text=f"{n} insumo{'s' if n!=1 else ''}")
+    
+    def fila_insumo(self, ins):
+        """(valores, tags) de una fila de obtener_todos/buscar"""
+        # ins es una tupla, así que usamos índices
+        pzas = ins[3]
+        contenido = ins[4]
+        unidad = ins[5]
+        fec = ins[6]
+        alerta = ins[7]
+        
+        tags = []
+        
+        # --- STOCK BAJO ---
+        if alerta and pzas is not None and pzas <= alerta:
+            tags.append("stock_bajo")
+        
+        # --- POR CADUCAR ---
+        fec_str = ""
+        if fec:
+            try:
+                if isinstance(fec, str):
+                    fec = datetime.strptime(fec, "%Y-%m-%d").date()
+                
+                dias = (fec - self.hoy).days
+                if 0 <= dias <= 7:
+                    tags.append("por_caducar")
+                
+                fec_str = fec.strftime("%Y-%m-%d")
+            except:
+                fec_str = fec
+        
+        valores = (
+            ins[0],   # id
+            ins[1],   # nombre
+            ins[2],   # categoria
+            pzas,
+            contenido or "",
+            unidad or "",
+            fec_str,
+            alerta
+        )
+        return valores, tags
     
     def on_select(self, e):
         sel = self.tabla.selection()
@@ -412,6 +510,11 @@ class VentanaInsumos:
             self.btn_editar.config(state="normal")
             self.btn_eliminar.config(state="normal")
             self.btn_stock.config(state="normal")
+        else:
+            self.insumo_sel = None
+            self.btn_editar.config(state="disabled")
+            self.btn_eliminar.config(state="disabled")
+            self.btn_stock.config(state="disabled")
     
     def form_nuevo(self):
         self.editando = False
@@ -533,8 +636,12 @@ class VentanaInsumos:
         
         if ok:
             messagebox.showinfo("Éxito", msg)
+            id_editado = self.id_editando if self.editando else None
             self.ocultar_form()
-            self.cargar_insumos()
+            if id_editado is not None:
+                self.actualizar_fila(id_editado)
+            else:
+                self.cargar_insumos()
         else:
             messagebox.showerror("Error", msg)
     
@@ -545,32 +652,47 @@ class VentanaInsumos:
             ok, msg = InsumosCRUD.eliminar(self.insumo_sel["id"])
             if ok:
                 messagebox.showinfo("Éxito", msg)
-                self.cargar_insumos()
+                self.quitar_fila(self.insumo_sel["id"])
             else:
                 messagebox.showerror("Error", msg)
     
     def buscar(self, e=None):
-        t = self.ent_buscar.get().strip()
-        self.cargar_insumos(InsumosCRUD.buscar(t) if t else None)
+        self.busqueda.buscar_ahora()
+    
+    def al_mostrar(self):
+        """Recarga conservando la búsqueda o el filtro de categoría"""
+        idx = self.cmb_filtro.current()
+        id_filtro = self.categorias[idx - 1][0] if idx > 0 else None
+        
+        self.actualizar_combo_cat()
+        self.actualizar_combo_filtro()
+        
+        ids = [c[0] for c in self.categorias]
+        if id_filtro in ids and not self.ent_buscar.get().strip():
+            self.cmb_filtro.current(ids.index(id_filtro) + 1)
+            self.filtrar_categoria()
+        else:
+            self.busqueda.buscar_ahora()
     
     def filtrar_categoria(self, e=None):
         idx = self.cmb_filtro.current()
         if idx == 0:
             self.cargar_insumos()
         else:
-            self.cargar_insumos(InsumosCRUD.filtrar_por_categoria(self.categorias[idx-1][0]))
+            id_cat = self.categorias[idx-1][0]
+            self.consultar(lambda: InsumosCRUD.filtrar_por_categoria(id_cat))
     
     def ver_stock_bajo(self):
-        d = InsumosCRUD.obtener_stock_bajo()
-        self.cargar_insumos(d)
-        if not d:
-            messagebox.showinfo("Info", "No hay insumos con stock bajo")
+        def avisar(datos):
+            if not datos:
+                messagebox.showinfo("Info", "No hay insumos con stock bajo")
+        self.consultar(InsumosCRUD.obtener_stock_bajo, avisar)
     
     def ver_por_caducar(self):
-        d = InsumosCRUD.obtener_por_caducar(7)
-        self.cargar_insumos(d)
-        if not d:
-            messagebox.showinfo("Info", "No hay insumos por caducar")
+        def avisar(datos):
+            if not datos:
+                messagebox.showinfo("Info", "No hay insumos por caducar")
+        self.consultar(lambda: InsumosCRUD.obtener_por_caducar(7), avisar)
     
     def ajustar_stock(self):
         if not self.insumo_sel:
@@ -578,13 +700,13 @@ class VentanaInsumos:
         
         dlg = tk.Toplevel(self.parent)
         dlg.title("Ajustar Stock")
-        dlg.geometry("380x170")
+        dlg.geometry("460x170")
         dlg.configure(bg=PaletaColores.COLOR_FONDO)
         dlg.resizable(False, False)
         dlg.transient(self.parent)
         dlg.grab_set()
         
-        x = self.parent.winfo_x() + self.parent.winfo_width()//2 - 190
+        x = self.parent.winfo_x() + self.parent.winfo_width()//2 - 230
         y = self.parent.winfo_y() + self.parent.winfo_height()//2 - 85
         dlg.geometry(f"+{x}+{y}")
         
@@ -615,7 +737,7 @@ class VentanaInsumos:
             ok, msg = InsumosCRUD.actualizar_piezas(self.insumo_sel["id"], c, op)
             if ok:
                 dlg.destroy()
-                self.cargar_insumos()
+                self.actualizar_fila(self.insumo_sel["id"])
                 messagebox.showinfo("Éxito", msg)
             else:
                 messagebox.showerror("Error", msg)
@@ -624,9 +746,11 @@ class VentanaInsumos:
                   fg=PaletaColores.BLANCO, relief="flat", padx=10, command=lambda: hacer('add')).pack(side="left", padx=3)
         tk.Button(fb, text="Restar", font=Fuentes.FUENTE_BOTONES, bg=PaletaColores.COLOR_ERROR,
                   fg=PaletaColores.BLANCO, relief="flat", padx=10, command=lambda: hacer('subtract')).pack(side="left", padx=3)
+        tk.Button(fb, text="Merma", font=Fuentes.FUENTE_BOTONES, bg=PaletaColores.COLOR_ALERTA,
+                  fg=PaletaColores.NEGRO_CARUMA, relief="flat", padx=10, command=lambda: hacer('merma')).pack(side="left", padx=3)
         tk.Button(fb, text="Establecer", font=Fuentes.FUENTE_BOTONES, bg=PaletaColores.COLOR_INFO,
                   fg=PaletaColores.BLANCO, relief="flat", padx=10, command=lambda: hacer('set')).pack(side="left", padx=3)
 
 
 def abrir_ventana_insumos(parent):
-    return VentanaInsumos(parent)
\ No newline at end of file
+    return GestorPantallas.abrir("insumos", parent, VentanaInsumos)
\ No newline at end of file
@@ -9,8 +9,11 @@ from datetime import date, timedelta
 from estilos.colores import PaletaColores
 from estilos.fuentes import Fuentes
 from utils.db_connection import Database
+from utils.ejecutor import EjecutorConsultas
+from utils.estado_alertas import EstadoAlertas
 from utils.posiciones import Posiciones
-from ventanas.formularios import GestorFormularios
+from ventanas.componentes import IndicadorCarga, ModeloLista, TablaVirtual
+from ventanas.formularios import GestorFormularios, GestorPantallas
 import ventanas.formularios as vf
 
 
@@ -19,22 +22,12 @@ class InventarioCRUD:
     
     @staticmethod
     def obtener_resumen():
-        """Obtiene estadísticas generales del inventario"""
+        """Obtiene estadísticas generales del inventario (contadores de alerta_contadores)"""
         try:
-            query = """
-                SELECT 
-                    COUNT(*) as total_insumos,
-                    COALESCE(SUM(piezas), 0) as total_piezas,
-                    COUNT(CASE WHEN piezas <= alerta_piezas AND alerta_piezas > 0 THEN 1 END) as stock_bajo,
-                    COUNT(CASE WHEN fecha_caducidad IS NOT NULL 
-                        AND fecha_caducidad <= date('now', '+7 days')
-                        AND fecha_caducidad >= date('now') THEN 1 END) as por_caducar,
-                    COUNT(CASE WHEN fecha_caducidad IS NOT NULL 
-                        AND fecha_caducidad < date('now') THEN 1 END) as caducados
-                FROM insumos
-            """
-            resultado = Database.ejecutar_query(query)
-            return resultado[0] if resultado else (0, 0, 0, 0, 0)
+            k = EstadoAlertas.obtener_contadores()
+            if not k:
+                return (0, 0, 0, 0, 0)
+            return (k['total_insumos'], k['total_piezas'], k['stock_bajo'], k['por_caducar'], k['caducados'])
         except Exception as e:
             print(f"Error: {e}")
             return (0, 0, 0, 0, 0)
@@ -59,24 +52,26 @@ class InventarioCRUD:
             return []
     
     @staticmethod
-    def obtener_inventario_completo(filtro=None, orden="nombre"):
+    def obtener_inventario_completo(filtro=None, orden="nombre", hoy=None):
         """Obtiene el inventario completo con filtros"""
         try:
             where_clause = ""
-            params = []
+            # Mismo día local que alerta_contadores (las tarjetas), no date('now') en UTC
+            hoy = hoy or date.today()
+            params = {"hoy": hoy.isoformat(), "limite": (hoy + timedelta(days=7)).isoformat()}
             
             if filtro == "stock_bajo":
                 where_clause = "WHERE i.piezas <= i.alerta_piezas AND i.alerta_piezas > 0"
             elif filtro == "por_caducar":
-                where_clause = "WHERE i.fecha_caducidad IS NOT NULL AND i.fecha_caducidad <= date('now', '+7 days') AND i.fecha_caducidad >= date('now')"
+                where_clause = "WHERE i.fecha_caducidad IS NOT NULL AND i.fecha_caducidad <= :limite AND i.fecha_caducidad >= :hoy"
             elif filtro == "caducados":
-                where_clause = "WHERE i.fecha_caducidad IS NOT NULL AND i.fecha_caducidad < date('now')"
+                where_clause = "WHERE i.fecha_caducidad IS NOT NULL AND i.fecha_caducidad < :hoy"
             elif filtro == "sin_stock":
                 where_clause = "WHERE i.piezas = 0"
             
-            orden_clause = "ORDER BY i.nombre"
+            orden_clause = "ORDER BY i.nombre COLLATE NOCASE"
             if orden == "categoria":
-                orden_clause = "ORDER BY c.nombre, i.nombre"
+                orden_clause = "ORDER BY c.nombre, i.nombre COLLATE NOCASE"
             elif orden == "piezas_asc":
                 orden_clause = "ORDER BY i.piezas ASC"
             elif orden == "piezas_desc":
@@ -95,9 +90,9 @@ class InventarioCRUD:
                     i.fecha_caducidad,
                     i.alerta_piezas,
                     CASE 
-                        WHEN i.fecha_caducidad < date('now') THEN 'CADUCADO'
+                        WHEN i.fecha_caducidad < :hoy THEN 'CADUCADO'
                         WHEN i.piezas <= i.alerta_piezas AND i.alerta_piezas > 0 THEN 'STOCK BAJO'
-                        WHEN i.fecha_caducidad <= date('now', '+7 days') THEN 'POR CADUCAR'
+                        WHEN i.fecha_caducidad <= :limite THEN 'POR CADUCAR'
                         ELSE 'OK'
                     END as estado
                 FROM insumos i
@@ -105,23 +100,23 @@ class InventarioCRUD:
                 {where_clause}
                 {orden_clause}
             """
-            return Database.ejecutar_query(query)
+            return Database.ejecutar_query(query, params)
         except Exception as e:
             print(f"Error: {e}")
             return []
     
     @staticmethod
     def obtener_valor_inventario():
-        """Calcula estadísticas de contenido total"""
+        """Calcula estadísticas de contenido total (en la unidad base: kg y g suman juntos)"""
         try:
             query = """
                 SELECT 
-                    unidad_contenido,
-                    SUM(piezas * COALESCE(contenido_por_pieza, 1)) as total
+                    unidad_base,
+                    SUM(piezas * contenido_base) as total
                 FROM insumos
-                WHERE unidad_contenido IS NOT NULL
-                GROUP BY unidad_contenido
-                ORDER BY unidad_contenido
+                WHERE unidad_base IS NOT NULL
+                GROUP BY unidad_base
+                ORDER BY unidad_base
             """
             return Database.ejecutar_query(query)
         except:
@@ -150,6 +145,9 @@ class InventarioCRUD:
 class VentanaInventario:
     """Ventana de gestión de inventario"""
     
+    # Al volver a la pantalla se recarga si cambió alguna o cambió el día (GestorPantallas)
+    TABLAS = ("insumos", "categorias")
+    
     def __init__(self, parent):
         self.parent = parent
         self.filtro_actual = None
@@ -188,6 +186,7 @@ class VentanaInventario:
         # Contenedor de tarjetas
         self.frame_tarjetas = tk.Frame(frame_resumen, bg=PaletaColores.COLOR_FONDO)
         self.frame_tarjetas.pack(fill="x")
+        self.carga_resumen = IndicadorCarga(self.frame_tarjetas)
         
         # Las tarjetas se crearán dinámicamente
         self.tarjetas = {}
@@ -274,7 +273,7 @@ class VentanaInventario:
         style.map("Inv.Treeview", background=[("selected", PaletaColores.DORADO_CLARO)])
         
         cols = ("id", "nombre", "categoria", "piezas", "contenido", "unidad", "caducidad", "estado")
-        self.tabla = ttk.Treeview(frame_tabla, columns=cols, show="headings", style="Inv.Treeview")
+        self.tabla = TablaVirtual(frame_tabla, columns=cols, show="headings", style="Inv.Treeview")
         
         self.tabla.heading("id", text="ID")
         self.tabla.heading("nombre", text="Nombre")
@@ -294,12 +293,6 @@ class VentanaInventario:
         self.tabla.column("caducidad", width=85, anchor="center")
         self.tabla.column("estado", width=90, anchor="center")
         
-        # Scrollbar
-        sb = ttk.Scrollbar(frame_tabla, orient="vertical", command=self.tabla.yview)
-        self.tabla.configure(yscrollcommand=sb.set)
-        self.tabla.pack(side="left", fill="both", expand=True)
-        sb.pack(side="right", fill="y")
-        
         # Tags para colores
         self.tabla.tag_configure("ok", background="#E8F5E9")
         self.tabla.tag_configure("stock_bajo", background="#FFCDD2")
@@ -309,77 +302,90 @@ class VentanaInventario:
         # Doble clic para ir a editar
         self.tabla.bind("<Double-1>", self.ir_a_insumo)
     
+    def al_mostrar(self):
+        """Al volver a la pantalla (GestorPantallas)"""
+        self.cargar_datos()
+    
     def cargar_datos(self):
         """Carga todos los datos del inventario"""
         self.cargar_resumen()
         self.cargar_inventario()
     
-    def cargar_resumen(self):
+    def cargar_resumen(self, resumen=None):
         """Carga las tarjetas de resumen"""
+        if resumen is None:
+            EjecutorConsultas.submit(InventarioCRUD.obtener_resumen, self.cargar_resumen,
+                                     clave="inventario.resumen", indicador=self.carga_resumen)
+            return
+        
         # Limpiar tarjetas anteriores
         for widget in self.frame_tarjetas.winfo_children():
             widget.destroy()
         
-        resumen = InventarioCRUD.obtener_resumen()
         total_insumos, total_piezas, stock_bajo, por_caducar, caducados = resumen
         
         # Crear tarjetas
         tarjetas_config = [
-            ("Total Insumos", total_insumos, PaletaColores.GRIS_CLARO, PaletaColores.NEGRO_CARUMA, None),
-            ("Total Piezas", total_piezas, PaletaColores.COLOR_INFO, PaletaColores.BLANCO, None),
-            ("Stock Bajo", stock_bajo, PaletaColores.COLOR_ERROR, PaletaColores.BLANCO, lambda: self.aplicar_filtro("stock_bajo")),
-            ("Por Caducar", por_caducar, PaletaColores.COLOR_ALERTA, PaletaColores.NEGRO_CARUMA, lambda: self.aplicar_filtro("por_caducar")),
-            ("Caducados", caducados, "#9C27B0", PaletaColores.BLANCO, lambda: self.aplicar_filtro("caducados")),
+            ("Total Insumos", total_insumos, PaletaColores.GRIS_CLARO, PaletaColores.NEGRO_CARUMA, "", None),
+            ("Total Piezas", total_piezas, PaletaColores.COLOR_INFO, PaletaColores.BLANCO, "", None),
+            ("Stock Bajo", stock_bajo, PaletaColores.COLOR_ERROR, PaletaColores.BLANCO, "", lambda: self.aplicar_filtro("stock_bajo")),
+            ("Por Caducar", por_caducar, PaletaColores.COLOR_ALERTA, PaletaColores.NEGRO_CARUMA, "", lambda: self.aplicar_filtro("por_caducar")),
+            ("Caducados", caducados, "#9C27B0", PaletaColores.BLANCO, "", lambda: self.aplicar_filtro("caducados")),
         ]
         
-        for titulo, valor, bg, fg, icono, cmd in tarjetas_config: 
+        for titulo, valor, bg, fg, icono, cmd in tarjetas_config:
             frame, lbl = self.crear_tarjeta(self.frame_tarjetas, titulo, valor, bg, fg, icono, cmd)
             frame.pack(side="left", padx=(0, 10), fill="y")
             self.tarjetas[titulo] = lbl
     
-    def cargar_inventario(self):
+    def cargar_inventario(self, datos=None):
         """Carga la tabla de inventario"""
-        for item in self.tabla.get_children():
-            self.tabla.delete(item)
-        
-        datos = InventarioCRUD.obtener_inventario_completo(self.filtro_actual, self.orden_actual)
-        
-        for inv in datos:
-            # Determinar tag según estado - acceso por nombre de columna
-            estado = inv['estado']
-            if estado == "CADUCADO":
-                tag = "caducado"
-            elif estado == "STOCK BAJO":
-                tag = "stock_bajo"
-            elif estado == "POR CADUCAR":
-                tag = "por_caducar"
-            else:
-                tag = "ok"
-            
-            # Formatear fecha
-            fecha = inv['fecha_caducidad']
-            if fecha:
-                if isinstance(fecha, str):
-                    fecha_str = fecha
-                else:
-                    fecha_str = fecha.strftime("%Y-%m-%d")
-            else:
-                fecha_str = ""
-            
-            self.tabla.insert("", "end", values=(
-                inv['id'],
-                inv['nombre'],
-                inv['categoria'],
-                inv['piezas'] or 0,
-                inv['contenido_por_pieza'] or "",
-                inv['unidad_contenido'] or "",
-                fecha_str,
-                estado
-            ), tags=(tag,))
+        if datos is None:
+            filtro, orden = self.filtro_actual, self.orden_actual
+            EjecutorConsultas.submit(lambda: InventarioCRUD.obtener_inventario_completo(filtro, orden),
+                                     self.cargar_inventario,
+                                     clave="inventario.tabla", indicador=self.tabla.carga)
+            return
+        
+        self.tabla.cargar(ModeloLista(datos, self.fila_inventario))
         
         self.lbl_contador.config(text=f"{len(datos)} insumo{'s' if len(datos)!=1 else ''}")
         self.actualizar_botones_filtro()
     
+    def fila_inventario(self, inv):
+        """(valores, tags) de una fila del inventario"""
+        # Determinar tag según estado - acceso por nombre de columna
+        estado = inv['estado']
+        if estado == "CADUCADO":
+            tag = "caducado"
+        elif estado == "STOCK BAJO":
+            tag = "stock_bajo"
+        elif estado == "POR CADUCAR":
+            tag = "por_caducar"
+        else:
+            tag = "ok"
+        
+        # Formatear fecha
+        fecha = inv['fecha_caducidad']
+        if fecha:
+            if isinstance(fecha, str):
+                fecha_str = fecha
+            else:
+                fecha_str = fecha.strftime("%Y-%m-%d")
+        else:
+            fecha_str = ""
+        
+        return (
+            inv['id'],
+            inv['nombre'],
+            inv['categoria'],
+            inv['piezas'] or 0,
+            inv['contenido_por_pieza'] or "",
+            inv['unidad_contenido'] or "",
+            fecha_str,
+            estado
+        ), (tag,)
+    
     def aplicar_filtro(self, filtro):
         """Aplica un filtro al inventario"""
         self.filtro_actual = filtro
@@ -468,4 +474,4 @@ class VentanaInventarioDetalle:
 
 
 def abrir_ventana_inventario(parent):
-    return VentanaInventario(parent)
\ No newline at end of file
+    return GestorPantallas.abrir("inventario", parent, VentanaInventario)
\ No newline at end of file
@@ -0,0 +1,242 @@
+"""
+Módulo de Planeación de Eventos - CARUMA
+Reservas de servicios por fecha contra el stock actual: faltantes y lista de compras
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import date, timedelta
+from estilos.colores import PaletaColores
+from estilos.fuentes import Fuentes
+from utils.ejecutor import EjecutorConsultas
+from utils.planeacion import PlaneacionEventos
+from utils.posiciones import Posiciones
+from ventanas.componentes import IndicadorCarga, ModeloLista, TablaVirtual
+from ventanas.formularios import GestorFormularios, GestorPantallas
+from ventanas.servicios import ServiciosCRUD
+import ventanas.formularios as vf
+
+
+class VentanaPlaneacion:
+    """Ventana de planeación de eventos"""
+    
+    # Al volver a la pantalla se recalcula si cambió el stock o alguna receta (GestorPantallas)
+    TABLAS = ("servicios", "servicio_insumo", "insumos")
+    
+    def __init__(self, parent):
+        self.parent = parent
+        self.servicios = []
+        self.reservas = []
+        self.mostrar()
+    
+    def mostrar(self):
+        GestorFormularios.limpiar_contenido()
+        vf.frame_contenido_actual = Posiciones.contenido(self.parent)
+        
+        self.frame_principal = tk.Frame(vf.frame_contenido_actual, bg=PaletaColores.COLOR_FONDO, padx=20, pady=15)
+        self.frame_principal.pack(fill="both", expand=True)
+        
+        self.crear_titulo()
+        self.crear_panel_reservas()
+        self.crear_panel_resultados()
+        self.cargar_servicios()
+    
+    def crear_titulo(self):
+        frame = tk.Frame(self.frame_principal, bg=PaletaColores.COLOR_FONDO)
+        frame.pack(fill="x", pady=(0, 15))
+        
+        tk.Label(frame, text="Planeación de Eventos", font=Fuentes.FUENTE_TITULOS,
+                 bg=PaletaColores.COLOR_FONDO, fg=PaletaColores.DORADO_CARUMA).pack(side="left")
+        
+        tk.Button(frame, text="Calcular", font=Fuentes.FUENTE_MENU,
+                  bg=PaletaColores.DORADO_CARUMA, relief="flat", cursor="hand2",
+                  padx=10, command=self.calcular).pack(side="right", padx=5)
+    
+    def crear_panel_reservas(self):
+        """Panel izquierdo: servicios reservados por fecha"""
+        frame = tk.LabelFrame(
+            self.frame_principal, text=" Reservas ", font=Fuentes.FUENTE_TEXTO_GRANDE,
+            bg=PaletaColores.COLOR_FONDO, fg=PaletaColores.DORADO_CARUMA, padx=10, pady=10)
+        frame.pack(side="left", fill="both", expand=True, padx=(0, 10))
+        
+        frame_campos = tk.Frame(frame, bg=PaletaColores.COLOR_FONDO)
+        frame_campos.pack(fill="x", pady=(0, 10))
+        
+        tk.Label(frame_campos, text="Servicio:", bg=PaletaColores.COLOR_FONDO).grid(row=0, column=0, sticky="e", padx=5, pady=3)
+        self.cmb_servicio = ttk.Combobox(frame_campos, state="readonly", width=28)
+        self.cmb_servicio.grid(row=0, column=1, columnspan=3, sticky="w", pady=3)
+        
+        tk.Label(frame_campos, text="Cantidad:", bg=PaletaColores.COLOR_FONDO).grid(row=1, column=0, sticky="e", padx=5, pady=3)
+        self.ent_cantidad = tk.Entry(frame_campos, width=8, relief="solid", bd=1)
+        self.ent_cantidad.grid(row=1, column=1, sticky="w", pady=3)
+        
+        tk.Label(frame_campos, text="Fecha (AAAA-MM-DD):", bg=PaletaColores.COLOR_FONDO).grid(row=1, column=2, sticky="e", padx=5, pady=3)
+        self.ent_fecha = tk.Entry(frame_campos, width=12, relief="solid", bd=1)
+        self.ent_fecha.grid(row=1, column=3, sticky="w", pady=3)
+        self.ent_fecha.insert(0, (date.today() + timedelta(days=7)).isoformat())
+        
+        frame_btns = tk.Frame(frame, bg=PaletaColores.COLOR_FONDO)
+        frame_btns.pack(fill="x", pady=(0, 10))
+        
+        tk.Button(frame_btns, text="Agregar", font=Fuentes.FUENTE_MENU,
+                  bg=PaletaColores.COLOR_EXITO, fg=PaletaColores.BLANCO, relief="flat",
+                  cursor="hand2", padx=10, command=self.agregar_reserva).pack(side="left", padx=2)
+        tk.Button(frame_btns, text="Quitar", font=Fuentes.FUENTE_MENU,
+                  bg=PaletaColores.COLOR_ERROR, fg=PaletaColores.BLANCO, relief="flat",
+                  cursor="hand2", padx=10, command=self.quitar_reserva).pack(side="left", padx=2)
+        
+        self.lbl_reservas = tk.Label(frame_btns, text="", font=Fuentes.FUENTE_MENU,
+                                      bg=PaletaColores.COLOR_FONDO, fg=PaletaColores.GRIS_MEDIO)
+        self.lbl_reservas.pack(side="right")
+        
+        frame_tabla = tk.Frame(frame, bg=PaletaColores.COLOR_FONDO)
+        frame_tabla.pack(fill="both", expand=True)
+        
+        cols = ("fecha", "servicio", "cantidad")
+        self.tabla_reservas = TablaVirtual(frame_tabla, columns=cols, show="headings", height=12)
+        
+        self.tabla_reservas.heading("fecha", text="Fecha")
+        self.tabla_reservas.heading("servicio", text="Servicio")
+        self.tabla_reservas.heading("cantidad", text="Cantidad")
+        
+        self.tabla_reservas.column("fecha", width=90, anchor="center")
+        self.tabla_reservas.column("servicio", width=200, anchor="w")
+        self.tabla_reservas.column("cantidad", width=70, anchor="center")
+    
+    def crear_panel_resultados(self):
+        """Panel derecho: faltantes por fecha y lista de compras"""
+        frame = tk.Frame(self.frame_principal, bg=PaletaColores.COLOR_FONDO)
+        frame.pack(side="right", fill="both", expand=True)
+        
+        self.lbl_resumen = tk.Label(frame, text="Agregue reservas y presione Calcular",
+                                     font=Fuentes.FUENTE_TEXTO, bg=PaletaColores.COLOR_FONDO,
+                                     fg=PaletaColores.GRIS_MEDIO, justify="left", anchor="w")
+        self.lbl_resumen.pack(fill="x", pady=(0, 10))
+        
+        self.notebook = ttk.Notebook(frame)
+        self.notebook.pack(fill="both", expand=True)
+        self.carga = IndicadorCarga(self.notebook)
+        
+        tab_faltantes = tk.Frame(self.notebook, bg=PaletaColores.COLOR_FONDO)
+        self.notebook.add(tab_faltantes, text="Faltantes")
+        
+        cols = ("fecha", "insumo", "necesarias", "utilizables", "faltan", "motivo")
+        self.tabla_faltantes = TablaVirtual(tab_faltantes, columns=cols, show="headings", height=12)
+        
+        self.tabla_faltantes.heading("fecha", text="Fecha")
+        self.tabla_faltantes.heading("insumo", text="Insumo")
+        self.tabla_faltantes.heading("necesarias", text="Necesarias")
+        self.tabla_faltantes.heading("utilizables", text="Utilizables")
+        self.tabla_faltantes.heading("faltan", text="Faltan")
+        self.tabla_faltantes.heading("motivo", text="Motivo")
+        
+        self.tabla_faltantes.column("fecha", width=90, anchor="center")
+        self.tabla_faltantes.column("insumo", width=180, anchor="w")
+        self.tabla_faltantes.column("necesarias", width=80, anchor="center")
+        self.tabla_faltantes.column("utilizables", width=80, anchor="center")
+        self.tabla_faltantes.column("faltan", width=60, anchor="center")
+        self.tabla_faltantes.column("motivo", width=90, anchor="center")
+        
+        self.tabla_faltantes.tag_configure("caduca", background="#FFCDD2")
+        self.tabla_faltantes.tag_configure("stock", background="#FFE0B2")
+        
+        tab_compras = tk.Frame(self.notebook, bg=PaletaColores.COLOR_FONDO)
+        self.notebook.add(tab_compras, text="Lista de Compras")
+        
+        cols = ("insumo", "piezas", "antes_de")
+        self.tabla_compras = TablaVirtual(tab_compras, columns=cols, show="headings", height=12)
+        
+        self.tabla_compras.heading("insumo", text="Insumo")
+        self.tabla_compras.heading("piezas", text="Piezas")
+        self.tabla_compras.heading("antes_de", text="Para el")
+        
+        self.tabla_compras.column("insumo", width=220, anchor="w")
+        self.tabla_compras.column("piezas", width=70, anchor="center")
+        self.tabla_compras.column("antes_de", width=90, anchor="center")
+    
+    def al_mostrar(self):
+        """Al volver a la pantalla (GestorPantallas)"""
+        self.cargar_servicios()
+        if self.reservas:
+            self.calcular()
+    
+    def cargar_servicios(self, datos=None):
+        if datos is None:
+            EjecutorConsultas.submit(ServiciosCRUD.obtener_todos, self.cargar_servicios,
+                                     clave="planeacion.servicios", indicador=self.tabla_reservas.carga)
+            return
+        
+        self.servicios = [(s[0], s[1]) for s in datos]
+        self.cmb_servicio['values'] = [nombre for id_servicio, nombre in self.servicios]
+    
+    def pintar_reservas(self):
+        self.reservas.sort(key=lambda r: (r[2], r[1]))
+        self.tabla_reservas.cargar(ModeloLista(
+            self.reservas, lambda r: ((r[2].isoformat(), r[1], r[3]), ()), clave=lambda r: r[0]))
+        total = len(self.reservas)
+        self.lbl_reservas.config(text=f"{total} reserva{'s' if total != 1 else ''}")
+    
+    def agregar_reserva(self):
+        if self.cmb_servicio.current() < 0:
+            messagebox.showwarning("Error", "Seleccione un servicio")
+            return
+        try:
+            cantidad = int(self.ent_cantidad.get())
+            if cantidad <= 0: raise ValueError()
+        except:
+            messagebox.showwarning("Error", "Cantidad inválida")
+            return
+        try:
+            fecha = date.fromisoformat(self.ent_fecha.get().strip())
+        except ValueError:
+            messagebox.showwarning("Error", "Fecha inválida (use AAAA-MM-DD)")
+            return
+        
+        id_servicio, nombre = self.servicios[self.cmb_servicio.current()]
+        # (id de la reserva, nombre, fecha, cantidad, id_servicio)
+        siguiente = max((r[0] for r in self.reservas), default=0) + 1
+        self.reservas.append((siguiente, nombre, fecha, cantidad, id_servicio))
+        self.pintar_reservas()
+        self.ent_cantidad.delete(0, tk.END)
+        self.cmb_servicio.focus_set()
+    
+    def quitar_reserva(self):
+        seleccion = set(self.tabla_reservas.selection())
+        if not seleccion:
+            return
+        self.reservas = [r for r in self.reservas if r[0] not in seleccion]
+        self.pintar_reservas()
+    
+    def calcular(self, plan=None):
+        """Planea todas las reservas en segundo plano"""
+        if plan is None:
+            if not self.reservas:
+                messagebox.showwarning("Aviso", "No hay reservas")
+                return
+            reservas = [(r[4], r[3], r[2]) for r in self.reservas]
+            EjecutorConsultas.submit(lambda: PlaneacionEventos.planear(reservas), self.calcular,
+                                     al_error=lambda e: messagebox.showerror("Error", f"Error: {e}"),
+                                     clave="planeacion.plan", indicador=self.carga)
+            return
+        
+        self.tabla_faltantes.cargar(ModeloLista(
+            plan["faltantes"],
+            lambda f: ((f[0].isoformat(), f[2], f[3], f[4], f[5], "Caduca" if f[6] == "caduca" else "Stock"), (f[6],)),
+            clave=lambda f: (f[0], f[1])))
+        self.tabla_compras.cargar(ModeloLista(
+            plan["compras"], lambda c: ((c[1], c[2], c[3].isoformat()), ()), clave=lambda c: c[0]))
+        
+        if plan["faltantes"]:
+            texto = (f"{plan['eventos']} reservas: faltan insumos en {len(plan['faltantes'])} casos; "
+                     f"comprar {len(plan['compras'])} insumos")
+            color = PaletaColores.COLOR_ERROR
+        else:
+            texto = f"{plan['eventos']} reservas: el stock actual alcanza para todas"
+            color = PaletaColores.COLOR_EXITO
+        if plan["errores"]:
+            texto += f"\nSin conversión de unidades (no se contaron): {', '.join(plan['errores'])}"
+        self.lbl_resumen.config(text=texto, fg=color)
+
+
+def abrir_ventana_planeacion(parent):
+    return GestorPantallas.abrir("planeacion", parent, VentanaPlaneacion)
@@ -7,9 +7,15 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from estilos.colores import PaletaColores
 from estilos.fuentes import Fuentes
+from utils.busqueda import Busqueda
+from utils.cache import CacheCatalogo
+from utils.capacidad import Capacidad
+from utils.consumo import Consumo
 from utils.db_connection import Database
+from utils.ejecutor import EjecutorConsultas
 from utils.posiciones import Posiciones
-from ventanas.formularios import GestorFormularios
+from ventanas.componentes import BusquedaDiferida, ReconciliadorTabla
+from ventanas.formularios import GestorFormularios, GestorPantallas
 import ventanas.formularios as vf
 
 
@@ -19,12 +25,10 @@ class ServiciosCRUD:
     @staticmethod
     def obtener_todos():
         try:
-            query = """
-                SELECT s.id, s.nombre,
-                    (SELECT COUNT(*) FROM servicio_insumo si WHERE si.id_servicio = s.id) as num_insumos
-                FROM servicios s ORDER BY s.nombre
-            """
-            return Database.ejecutar_query(query)
+            query = "SELECT s.id, s.nombre, s.num_insumos FROM servicios s ORDER BY s.nombre"
+            # num_insumos lo escriben los triggers de servicio_insumo (CacheCatalogo.EFECTOS_TRIGGERS)
+            return CacheCatalogo.obtener("servicios.todos", ("servicios",),
+                                         lambda: Database.ejecutar_query(query))
         except Exception as e:
             print(f"Error: {e}")
             return []
@@ -74,9 +78,19 @@ class ServiciosCRUD:
     @staticmethod
     def buscar(termino):
         try:
+            expresion = Busqueda.expresion(termino)
+            if expresion and Busqueda.disponible("servicios_fts"):
+                query = """
+                    SELECT s.id, s.nombre, s.num_insumos
+                    FROM servicios_fts
+                    JOIN servicios s ON s.id = servicios_fts.rowid
+                    WHERE servicios_fts MATCH ?
+                    ORDER BY bm25(servicios_fts), s.nombre
+                """
+                return Database.ejecutar_query(query, (expresion,))
+            
             query = """
-                SELECT s.id, s.nombre,
-                    (SELECT COUNT(*) FROM servicio_insumo si WHERE si.id_servicio = s.id) as num_insumos
+                SELECT s.id, s.nombre, s.num_insumos
                 FROM servicios s 
                 WHERE s.nombre LIKE ? COLLATE NOCASE 
                 ORDER BY s.nombre
@@ -85,6 +99,51 @@ class ServiciosCRUD:
         except Exception as e:
             print("Error búsqueda:", e)
             return []
+    
+    @staticmethod
+    def verificar_contadores():
+        """
+        Servicios cuyo num_insumos no coincide con su receta.
+        Retorna [(id_servicio, num_insumos, real)] (vacío = correcto).
+        """
+        return Database.ejecutar_query("""
+            SELECT s.id, s.num_insumos, COUNT(si.id) AS real
+            FROM servicios s
+            LEFT JOIN servicio_insumo si ON si.id_servicio = s.id
+            GROUP BY s.id
+            HAVING s.num_insumos <> COUNT(si.id)
+        """)
+    
+    @staticmethod
+    def reparar_contadores():
+        """Corrige los num_insumos que no coinciden con la receta"""
+        try:
+            with Database.transaction():
+                diferencias = ServiciosCRUD.verificar_contadores()
+                if diferencias:
+                    Database.ejecutar_lote("UPDATE servicios SET num_insumos = ? WHERE id = ?",
+                                           [(real, id_servicio) for id_servicio, guardado, real in diferencias])
+            if not diferencias:
+                return True, "Contadores de insumos correctos"
+            return True, f"Se corrigieron {len(diferencias)} contadores de insumos"
+        except Exception as e:
+            return False, f"Error: {e}"
+    
+    @staticmethod
+    def registrar_realizados(realizados, nota=None):
+        """
+        Descuenta del stock los insumos de los servicios realizados (utils/consumo.py).
+        realizados: lista de tuplas (id_servicio, veces)
+        """
+        try:
+            r = Consumo.registrar(realizados, nota)
+            if not r["aplicado"]:
+                lineas = [f"- {nombre}: se necesitan {necesarias}, hay {stock}"
+                          for id_insumo, nombre, necesarias, stock in r["faltantes"]]
+                return False, "Stock insuficiente; no se descontó nada:\n" + "\n".join(lineas)
+            return True, f"Se descontaron {r['piezas']} piezas de {r['insumos']} insumos"
+        except Exception as e:
+            return False, f"Error: {e}"
 
 
 
@@ -113,7 +172,8 @@ class ServicioInsumoCRUD:
         """Obtiene todos los insumos disponibles para agregar"""
         try:
             query = "SELECT id, nombre, unidad_contenido FROM insumos ORDER BY nombre"
-            return Database.ejecutar_query(query)
+            return CacheCatalogo.obtener("insumos.disponibles", ("insumos",),
+                                         lambda: Database.ejecutar_query(query))
         except:
             return []
     
@@ -121,20 +181,21 @@ class ServicioInsumoCRUD:
     def agregar_insumo(id_servicio, id_insumo, piezas, contenido, unidad):
         """Agrega un insumo a un servicio"""
         try:
-            # Verificar si ya existe la relación
-            check = Database.ejecutar_query(
-                "SELECT id FROM servicio_insumo WHERE id_servicio=? AND id_insumo=?",
-                (id_servicio, id_insumo))
-            if check:
-                return False, "Este insumo ya está agregado al servicio"
-            
-            query = """
-                INSERT INTO servicio_insumo (id_servicio, id_insumo, piezas_por_servicio, 
-                                             contenido_por_servicio, unidad_contenido)
-                VALUES (?, ?, ?, ?, ?)
-            """
-            Database.ejecutar_comando(query, (id_servicio, id_insumo, piezas or None,
-                                            contenido or None, unidad or None))
+            with Database.transaction():
+                # Verificar si ya existe la relación
+                check = Database.ejecutar_query(
+                    "SELECT id FROM servicio_insumo WHERE id_servicio=? AND id_insumo=?",
+                    (id_servicio, id_insumo))
+                if check:
+                    return False, "Este insumo ya está agregado al servicio"
+                
+                query = """
+                    INSERT INTO servicio_insumo (id_servicio, id_insumo, piezas_por_servicio, 
+                                                 contenido_por_servicio, unidad_contenido)
+                    VALUES (?, ?, ?, ?, ?)
+                """
+                Database.ejecutar_comando(query, (id_servicio, id_insumo, piezas or None,
+                                                contenido or None, unidad or None))
             return True, "Insumo agregado al servicio"
         except Exception as e:
             return False, f"Error: {e}"
@@ -167,10 +228,20 @@ class ServicioInsumoCRUD:
 class VentanaServicios:
     """Ventana de gestión de servicios"""
     
+    # Al volver a la pantalla se recarga si cambió alguna (GestorPantallas)
+    TABLAS = ("servicios", "servicio_insumo", "insumos")
+    
+    # Consultas de cada tabla en EjecutorConsultas: la última cancela a la anterior
+    CLAVE_SERVICIOS = "servicios.tabla"
+    CLAVE_INSUMOS = "servicios.insumos"
+    CLAVE_CAPACIDAD = "servicios.capacidad"
+    
     def __init__(self, parent):
         self.parent = parent
         self.servicio_sel = None
         self.insumo_sel = None
+        self.servicios_mostrados = []
+        self.capacidad = {}
         self.editando = False
         self.id_editando = None
         self.mostrar()
@@ -208,7 +279,10 @@ class VentanaServicios:
         tk.Label(frame_tools, text='', bg=PaletaColores.COLOR_FONDO).pack(side="left")
         self.ent_buscar = tk.Entry(frame_tools, font=Fuentes.FUENTE_TEXTO, width=20, relief="solid", bd=1)
         self.ent_buscar.pack(side="left", padx=(3, 10))
-        self.ent_buscar.bind("<KeyRelease>", self.buscar)
+        self.busqueda = BusquedaDiferida(self.ent_buscar, ServiciosCRUD.buscar,
+                                         self.cargar_servicios, ServiciosCRUD.obtener_todos,
+                                         clave=self.CLAVE_SERVICIOS)
+        self.ent_buscar.bind("<Return>", self.buscar)
         
         self.btn_nuevo = tk.Button(frame_tools, text="Nuevo", font=Fuentes.FUENTE_MENU,
                                     bg=PaletaColores.DORADO_CARUMA, relief="flat", cursor="hand2",
@@ -226,6 +300,12 @@ class VentanaServicios:
                                        state="disabled", command=self.eliminar_servicio)
         self.btn_eliminar.pack(side="left", padx=2)
         
+        self.btn_realizado = tk.Button(frame_tools, text="Realizado", font=Fuentes.FUENTE_MENU,
+                                        bg=PaletaColores.COLOR_EXITO, fg=PaletaColores.BLANCO,
+                                        relief="flat", cursor="hand2", padx=8,
+                                        state="disabled", command=self.registrar_realizado)
+        self.btn_realizado.pack(side="left", padx=2)
+        
         # Contador
         self.lbl_contador = tk.Label(frame_tools, text="+", font=Fuentes.FUENTE_MENU,
                                       bg=PaletaColores.COLOR_FONDO, fg=PaletaColores.GRIS_MEDIO)
@@ -241,17 +321,21 @@ class VentanaServicios:
                         font=Fuentes.FUENTE_BOTONES, padding=5)
         style.map("Serv.Treeview", background=[("selected", PaletaColores.DORADO_CLARO)])
         
-        cols = ("id", "nombre", "insumos")
+        cols = ("id", "nombre", "insumos", "alcanza")
         self.tabla_serv = ttk.Treeview(frame_tabla, columns=cols, show="headings",
                                         style="Serv.Treeview", height=12)
+        self.filas_serv = ReconciliadorTabla(self.tabla_serv)
+        self.busqueda.indicador = self.filas_serv.carga
         
         self.tabla_serv.heading("id", text="ID")
         self.tabla_serv.heading("nombre", text="Nombre del Servicio")
         self.tabla_serv.heading("insumos", text="Insumos")
+        self.tabla_serv.heading("alcanza", text="Alcanza")
         
         self.tabla_serv.column("id", width=40, anchor="center")
         self.tabla_serv.column("nombre", width=200, anchor="w")
         self.tabla_serv.column("insumos", width=60, anchor="center")
+        self.tabla_serv.column("alcanza", width=60, anchor="center")
         
         sb = ttk.Scrollbar(frame_tabla, orient="vertical", command=self.tabla_serv.yview)
         self.tabla_serv.configure(yscrollcommand=sb.set)
@@ -325,6 +409,7 @@ class VentanaServicios:
         cols = ("id", "insumo", "piezas", "contenido", "unidad")
         self.tabla_ins = ttk.Treeview(frame_tabla_ins, columns=cols, show="headings",
                                        style="Serv.Treeview", height=12)
+        self.filas_ins = ReconciliadorTabla(self.tabla_ins)
         
         self.tabla_ins.heading("id", text="ID")
         self.tabla_ins.heading("insumo", text="Insumo")
@@ -346,45 +431,90 @@ class VentanaServicios:
         self.tabla_ins.bind("<<TreeviewSelect>>", self.on_select_insumo)
         self.tabla_ins.bind("<Double-1>", lambda e: self.editar_insumo_servicio())
     
+    def al_mostrar(self):
+        """Recarga respetando el texto de búsqueda y el servicio seleccionado"""
+        self.busqueda.buscar_ahora()
+    
     def cargar_servicios(self, datos=None):
-        for i in self.tabla_serv.get_children():
-            self.tabla_serv.delete(i)
-        
         if datos is None:
-            datos = ServiciosCRUD.obtener_todos()
+            EjecutorConsultas.submit(ServiciosCRUD.obtener_todos, self.cargar_servicios,
+                                     clave=self.CLAVE_SERVICIOS, indicador=self.filas_serv.carga)
+            return
         
-        for s in datos:
-            self.tabla_serv.insert("", "end", values=(s[0], s[1], s[2]))
+        self.servicios_mostrados = datos
+        self.pintar_servicios()
+        self.cargar_capacidad()
         
         self.lbl_contador.config(text=f"{len(datos)} servicio{'s' if len(datos)!=1 else ''}")
+        if self.tabla_serv.selection():
+            self.on_select_servicio(None)
+            return
         self.servicio_sel = None
         self.btn_editar.config(state="disabled")
         self.btn_eliminar.config(state="disabled")
+        self.btn_realizado.config(state="disabled")
         self.btn_agregar_ins.config(state="disabled")
         self.lbl_servicio_sel.config(text="Seleccione un servicio")
         self.limpiar_tabla_insumos()
     
+    def pintar_servicios(self):
+        """Solo cambia lo que difiere; la selección sigue si el servicio sigue"""
+        self.filas_serv.reconciliar([
+            (s[0], (s[0], s[1], s[2], self.texto_capacidad(s[0])), ())
+            for s in self.servicios_mostrados
+        ])
+    
+    def cargar_capacidad(self, capacidad=None):
+        """Cuántas veces alcanza el stock para cada servicio (utils/capacidad.py)"""
+        if capacidad is None:
+            EjecutorConsultas.submit(Capacidad.obtener, self.cargar_capacidad,
+                                     clave=self.CLAVE_CAPACIDAD, indicador=self.filas_serv.carga)
+            return
+        
+        self.capacidad = capacidad
+        self.pintar_servicios()
+        if self.servicio_sel:
+            self.mostrar_servicio_sel()
+    
+    def texto_capacidad(self, id_servicio):
+        alcanza = self.capacidad.get(id_servicio, Capacidad.SIN_DATOS)[0]
+        return "" if alcanza is None else alcanza
+    
+    def mostrar_servicio_sel(self):
+        """Nombre del servicio seleccionado y el insumo que limita cuántos se pueden hacer"""
+        alcanza, id_insumo, insumo = self.capacidad.get(self.servicio_sel["id"], Capacidad.SIN_DATOS)
+        texto = self.servicio_sel["nombre"]
+        if alcanza is not None:
+            texto += f"  -  alcanza para {alcanza} (limita: {insumo})"
+        self.lbl_servicio_sel.config(text=texto, fg=PaletaColores.DORADO_CARUMA)
+    
     def limpiar_tabla_insumos(self):
-        for i in self.tabla_ins.get_children():
-            self.tabla_ins.delete(i)
+        EjecutorConsultas.cancelar(self.CLAVE_INSUMOS)
+        self.filas_ins.limpiar()
         self.insumo_sel = None
         self.btn_editar_ins.config(state="disabled")
         self.btn_quitar_ins.config(state="disabled")
     
-    def cargar_insumos_servicio(self):
-        self.limpiar_tabla_insumos()
+    def cargar_insumos_servicio(self, insumos=None):
         if not self.servicio_sel:
+            self.limpiar_tabla_insumos()
+            return
+        
+        if insumos is None:
+            id_servicio = self.servicio_sel["id"]
+            EjecutorConsultas.submit(lambda: ServicioInsumoCRUD.obtener_insumos_servicio(id_servicio),
+                                     self.cargar_insumos_servicio,
+                                     clave=self.CLAVE_INSUMOS, indicador=self.filas_ins.carga)
             return
         
-        insumos = ServicioInsumoCRUD.obtener_insumos_servicio(self.servicio_sel["id"])
-        for ins in insumos:
-            self.tabla_ins.insert("", "end", values=(
-                ins[0],  # id relación
-                ins[2],  # nombre insumo
-                ins[3] or "",  # piezas
-                ins[4] or "",  # contenido
-                ins[5] or ""   # unidad
-            ))
+        self.filas_ins.reconciliar([(ins[0], (
+            ins[0],  # id relación
+            ins[2],  # nombre insumo
+            ins[3] or "",  # piezas
+            ins[4] or "",  # contenido
+            ins[5] or ""   # unidad
+        ), ()) for ins in insumos])
+        self.on_select_insumo(None)
     
     def on_select_servicio(self, e):
         sel = self.tabla_serv.selection()
@@ -393,13 +523,15 @@ class VentanaServicios:
             self.servicio_sel = {"id": v[0], "nombre": v[1]}
             self.btn_editar.config(state="normal")
             self.btn_eliminar.config(state="normal")
+            self.btn_realizado.config(state="normal")
             self.btn_agregar_ins.config(state="normal")
-            self.lbl_servicio_sel.config(text=f"{v[1]}", fg=PaletaColores.DORADO_CARUMA)
+            self.mostrar_servicio_sel()
             self.cargar_insumos_servicio()
         else:
             self.servicio_sel = None
             self.btn_editar.config(state="disabled")
             self.btn_eliminar.config(state="disabled")
+            self.btn_realizado.config(state="disabled")
             self.btn_agregar_ins.config(state="disabled")
     
     def on_select_insumo(self, e):
@@ -473,8 +605,7 @@ class VentanaServicios:
                 messagebox.showerror("Error", msg)
     
     def buscar(self, e=None):
-        t = self.ent_buscar.get().strip()
-        self.cargar_servicios(ServiciosCRUD.buscar(t) if t else None)
+        self.busqueda.buscar_ahora()
     
     def mostrar_agregar_insumo(self):
         """Muestra diálogo para agregar insumo al servicio"""
@@ -569,8 +700,7 @@ class VentanaServicios:
             
             if ok:
                 dlg.destroy()
-                self.cargar_insumos_servicio()
-                self.cargar_servicios()  # Actualizar contador
+                self.cargar_servicios()  # Actualiza el contador y los insumos del servicio
                 messagebox.showinfo("Éxito", msg)
             else:
                 messagebox.showerror("Error", msg)
@@ -663,6 +793,73 @@ class VentanaServicios:
                   bg=PaletaColores.GRIS_MEDIO, fg=PaletaColores.BLANCO,
                   relief="flat", padx=15, command=dlg.destroy).pack(side="left", padx=5)
     
+    def registrar_realizado(self):
+        """Registra cuántas veces se realizó cada servicio seleccionado y descuenta sus insumos"""
+        seleccion = [self.tabla_serv.item(i)["values"] for i in self.tabla_serv.selection()]
+        if not seleccion:
+            return
+        
+        dlg = tk.Toplevel(self.parent)
+        dlg.title("Registrar Servicio Realizado")
+        dlg.configure(bg=PaletaColores.COLOR_FONDO)
+        dlg.resizable(False, False)
+        dlg.transient(self.parent)
+        dlg.grab_set()
+        
+        tk.Label(dlg, text="Veces que se realizó cada servicio", font=Fuentes.FUENTE_TEXTO_GRANDE,
+                 bg=PaletaColores.COLOR_FONDO, fg=PaletaColores.DORADO_CARUMA).pack(pady=(15, 10), padx=20)
+        
+        frame_campos = tk.Frame(dlg, bg=PaletaColores.COLOR_FONDO)
+        frame_campos.pack(fill="x", padx=30, pady=5)
+        
+        entradas = []
+        for fila, (id_servicio, nombre, *_) in enumerate(seleccion):
+            tk.Label(frame_campos, text=f"{nombre}:", bg=PaletaColores.COLOR_FONDO).grid(row=fila, column=0, sticky="e", padx=5, pady=3)
+            ent = tk.Entry(frame_campos, width=8, relief="solid", bd=1)
+            ent.grid(row=fila, column=1, sticky="w", pady=3)
+            ent.insert(0, "1")
+            entradas.append((id_servicio, ent))
+        entradas[0][1].focus_set()
+        entradas[0][1].select_range(0, tk.END)
+        
+        frame_btns = tk.Frame(dlg, bg=PaletaColores.COLOR_FONDO)
+        frame_btns.pack(pady=15)
+        
+        def registrar():
+            realizados = []
+            for id_servicio, ent in entradas:
+                try:
+                    veces = int(ent.get() or 0)
+                    if veces < 0: raise ValueError()
+                except:
+                    messagebox.showwarning("Error", "Cantidad inválida", parent=dlg)
+                    return
+                if veces:
+                    realizados.append((id_servicio, veces))
+            if not realizados:
+                dlg.destroy()
+                return
+            
+            ok, msg = ServiciosCRUD.registrar_realizados(realizados)
+            if ok:
+                dlg.destroy()
+                self.cargar_capacidad()
+                messagebox.showinfo("Éxito", msg)
+            else:
+                messagebox.showerror("Error", msg, parent=dlg)
+        
+        tk.Button(frame_btns, text="Registrar", font=Fuentes.FUENTE_BOTONES,
+                  bg=PaletaColores.COLOR_EXITO, fg=PaletaColores.BLANCO,
+                  relief="flat", padx=15, command=registrar).pack(side="left", padx=5)
+        tk.Button(frame_btns, text="Cancelar", font=Fuentes.FUENTE_BOTONES,
+                  bg=PaletaColores.GRIS_MEDIO, fg=PaletaColores.BLANCO,
+                  relief="flat", padx=15, command=dlg.destroy).pack(side="left", padx=5)
+        
+        dlg.update_idletasks()
+        x = self.parent.winfo_x() + self.parent.winfo_width()//2 - dlg.winfo_width()//2
+        y = self.parent.winfo_y() + self.parent.winfo_height()//2 - dlg.winfo_height()//2
+        dlg.geometry(f"+{x}+{y}")
+    
     def quitar_insumo_servicio(self):
         """Quita un insumo del servicio"""
         if not self.insumo_sel:
@@ -671,12 +868,11 @@ class VentanaServicios:
         if messagebox.askyesno("Confirmar", f"¿Quitar '{self.insumo_sel['nombre']}' del servicio?"):
             ok, msg = ServicioInsumoCRUD.eliminar_insumo(self.insumo_sel["id"])
             if ok:
-                self.cargar_insumos_servicio()
-                self.cargar_servicios()  # Actualizar contador
+                self.cargar_servicios()  # Actualiza el contador y los insumos del servicio
                 messagebox.showinfo("Éxito", msg)
             else:
                 messagebox.showerror("Error", msg)
 
 
 def abrir_ventana_servicios(parent):
-    return VentanaServicios(parent)
\ No newline at end of file
+    return GestorPantallas.abrir("servicios", parent, VentanaServicios)
\ No newline at end of file